@@ -0,0 +1,428 @@
+import os
+import math
+import base64
+import struct
+import asyncio
+from collections import deque
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from . import metrics
+
+
+# ------------------------------
+# 🎚️ Upstream audio pipeline (frontend → OpenAI)
+# ------------------------------
+
+UPSTREAM_PACKET_MS = min(max(int(os.getenv("UPSTREAM_PACKET_MS", "60")), 20), 200)
+REALTIME_SAMPLE_RATE = 24000  # pcm16 mono expected by the Realtime API
+
+_APPEND_PREFIX = '{"type":"input_audio_buffer.append","audio":"'
+_APPEND_SUFFIX = '"}'
+
+
+class UpstreamAudioBatcher:
+    """
+    Gathers PCM16 frames from the client into time-based packets and sends
+    each packet upstream as one `input_audio_buffer.append` event.
+
+    A packet goes out once `packet_ms` of audio is buffered, when the timer
+    fires for a partially filled buffer, or on an explicit flush()
+    (`end_of_audio`). Each packet is base64-encoded exactly once.
+    """
+
+    def __init__(self, send, packet_ms: int = UPSTREAM_PACKET_MS,
+                 sample_rate: int = REALTIME_SAMPLE_RATE, channels: int = 1):
+        self._send = send  # async callable taking the serialized event
+        self.packet_ms = packet_ms
+        self.frame_bytes = 2 * channels
+        self.packet_bytes = max(
+            self.frame_bytes, sample_rate * self.frame_bytes * packet_ms // 1000 // self.frame_bytes * self.frame_bytes
+        )
+
+        self._buffer = bytearray()
+        self._lock = asyncio.Lock()
+        self._timer = None
+
+        self.frames_in = 0
+        self.packets_out = 0
+        self.bytes_out = 0
+
+    async def add(self, pcm: bytes):
+        self.frames_in += 1
+        async with self._lock:
+            self._buffer += pcm
+            while len(self._buffer) >= self.packet_bytes:
+                packet = bytes(self._buffer[:self.packet_bytes])
+                del self._buffer[:self.packet_bytes]
+                await self._send_packet(packet)
+
+        if self._buffer and (self._timer is None or self._timer.done()):
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def flush(self):
+        """Send whatever is buffered (whole samples only)."""
+        async with self._lock:
+            usable = len(self._buffer) - len(self._buffer) % self.frame_bytes
+            if usable:
+                packet = bytes(self._buffer[:usable])
+                del self._buffer[:usable]
+                await self._send_packet(packet)
+
+    async def close(self):
+        if self._timer is not None and not self._timer.done():
+            self._timer.cancel()
+        self._timer = None
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.packet_ms / 1000)
+        await self.flush()
+
+    async def _send_packet(self, packet: bytes):
+        # base64 output never needs JSON escaping, so skip json.dumps
+        await self._send(_APPEND_PREFIX + base64.b64encode(packet).decode("ascii") + _APPEND_SUFFIX)
+        self.packets_out += 1
+        self.bytes_out += len(packet)
+        metrics.UPSTREAM_AUDIO_PACKETS.inc()
+        metrics.UPSTREAM_AUDIO_BYTES.inc(len(packet))
+
+
+# ------------------------------
+# 🎛️ Input normalisation: any rate / channels / float32 → 24 kHz mono PCM16
+# ------------------------------
+
+UPSTREAM_NORMALISE = os.getenv("UPSTREAM_NORMALISE", "auto")  # auto | off
+
+_INT16_ENCODINGS = {"linear16", "pcm16", "int16", "s16le"}
+_FLOAT32_ENCODINGS = {"float32", "f32", "f32le", "pcm_f32le"}
+
+
+class PolyphaseResampler:
+    """
+    Streaming rational resampler (up by L, low-pass, down by M) computed as
+    a polyphase filter bank. Each chunk is processed in one vectorised
+    gather + dot product; filter history carries over between chunks.
+    """
+
+    def __init__(self, in_rate: int, out_rate: int, zero_crossings: int = 8,
+                 rolloff: float = 0.9, beta: float = 8.0):
+        g = math.gcd(in_rate, out_rate)
+        self.up, self.down = out_rate // g, in_rate // g
+
+        # Windowed-sinc prototype at the upsampled rate
+        cutoff = rolloff * 0.5 / max(self.up, self.down)
+        taps_per_phase = math.ceil(2 * zero_crossings * max(self.up, self.down) / self.up)
+        n = self.up * taps_per_phase
+        m = np.arange(n) - (n - 1) / 2
+        h = 2 * cutoff * np.sinc(2 * cutoff * m) * np.kaiser(n, beta) * self.up
+
+        # bank[p, j] = h[p + j·L], reversed so it lines up with input windows
+        self.taps = taps_per_phase
+        self._bank = h.reshape(taps_per_phase, self.up).T[:, ::-1].astype(np.float32)
+        self._history = np.zeros(taps_per_phase - 1, dtype=np.float32)
+        self._consumed = 0  # input samples seen so far
+        self._produced = 0  # output samples emitted so far
+
+    def process(self, x: np.ndarray) -> np.ndarray:
+        if x.size == 0:
+            return x
+        start_index = self._consumed
+        self._consumed += x.size
+        buffer = np.concatenate([self._history, x])
+        self._history = buffer[-(self.taps - 1):] if self.taps > 1 else buffer[:0]
+
+        # Outputs whose newest input sample is already available
+        end = (self._consumed * self.up - 1) // self.down + 1
+        out = np.arange(self._produced, end, dtype=np.int64)
+        self._produced = end
+        if out.size == 0:
+            return np.zeros(0, dtype=np.float32)
+
+        t = out * self.down
+        newest = t // self.up - start_index
+        phase = t % self.up
+        windows = sliding_window_view(buffer, self.taps)[newest]
+        return np.einsum("ij,ij->i", windows, self._bank[phase]).astype(np.float32)
+
+
+class AudioNormaliser:
+    """
+    Converts client audio (int16 or float32, any sample rate, interleaved
+    channels) into the 24 kHz mono PCM16 the Realtime session expects.
+    """
+
+    def __init__(self, encoding: str = "pcm16", sample_rate: int = REALTIME_SAMPLE_RATE, channels: int = 1):
+        encoding = (encoding or "pcm16").lower()
+        if encoding in _INT16_ENCODINGS:
+            self.dtype = np.dtype("<i2")
+        elif encoding in _FLOAT32_ENCODINGS:
+            self.dtype = np.dtype("<f4")
+        else:
+            raise ValueError(f"Unsupported audio encoding: {encoding}")
+
+        self.sample_rate = int(sample_rate)
+        self.channels = max(1, int(channels))
+        self.frame_bytes = self.dtype.itemsize * self.channels
+        self.passthrough = (
+            self.dtype.kind == "i" and self.sample_rate == REALTIME_SAMPLE_RATE and self.channels == 1
+        )
+        self._resampler = (
+            PolyphaseResampler(self.sample_rate, REALTIME_SAMPLE_RATE)
+            if self.sample_rate != REALTIME_SAMPLE_RATE else None
+        )
+        self._remainder = b""
+
+    def process(self, data: bytes) -> bytes:
+        if self.passthrough:
+            return data
+
+        # Only whole frames are converted; a split frame waits for the next chunk
+        data = self._remainder + data
+        usable = len(data) - len(data) % self.frame_bytes
+        self._remainder = data[usable:]
+        if not usable:
+            return b""
+
+        samples = np.frombuffer(data, dtype=self.dtype, count=usable // self.dtype.itemsize)
+        samples = samples.astype(np.float32)
+        if self.dtype.kind == "i":
+            samples /= 32768.0
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels).mean(axis=1)
+        if self._resampler is not None:
+            samples = self._resampler.process(samples)
+
+        return np.clip(np.rint(samples * 32767.0), -32768, 32767).astype("<i2").tobytes()
+
+
+def client_audio_format(cfg: dict):
+    """(sample_rate, channels) declared in `config`; ValueError unless both are positive integers."""
+    values = []
+    for name, default in (("sample_rate", REALTIME_SAMPLE_RATE), ("channels", 1)):
+        value = cfg.get(name, default)
+        whole = (
+            (isinstance(value, int) and not isinstance(value, bool))
+            or (isinstance(value, float) and value.is_integer())
+            or (isinstance(value, str) and value.strip().isdigit())
+        )
+        if not whole or int(value) <= 0:
+            raise ValueError(f"{name} must be a positive integer, got {value!r}")
+        values.append(int(value))
+    return tuple(values)
+
+
+def build_normaliser(cfg: dict):
+    """AudioNormaliser for the formats declared in `config`, or None when not needed."""
+    sample_rate, channels = client_audio_format(cfg)
+    if UPSTREAM_NORMALISE == "off":
+        return None
+    normaliser = AudioNormaliser(
+        encoding=cfg.get("encoding", "pcm16"),
+        sample_rate=sample_rate,
+        channels=channels,
+    )
+    return None if normaliser.passthrough else normaliser
+
+
+# ------------------------------
+# 🤫 Voice activity gate
+# ------------------------------
+# mode "off":    forward everything (default)
+# mode "detect": forward everything, only report speech_start / speech_end
+# mode "gate":   also drop silence, keeping a short pre-roll before speech and
+#                a hangover after it. The hangover should stay longer than the
+#                Realtime server VAD's silence_duration_ms (500 ms by default)
+#                so the model still hears the pause that ends a turn.
+
+UPSTREAM_VAD_MODE = os.getenv("UPSTREAM_VAD_MODE", "off")
+VAD_FRAME_MS = int(os.getenv("VAD_FRAME_MS", "20"))
+VAD_HANGOVER_MS = int(os.getenv("VAD_HANGOVER_MS", "700"))
+VAD_PREROLL_MS = int(os.getenv("VAD_PREROLL_MS", "200"))
+VAD_MARGIN_DB = float(os.getenv("VAD_MARGIN_DB", "10"))
+
+VAD_MODES = ("off", "detect", "gate")
+
+
+class VoiceActivityDetector:
+    """
+    Energy + zero-crossing voice activity detector for PCM16 mono audio.
+
+    Per-frame features are computed for a whole chunk at once; only the
+    small hangover state machine runs frame by frame. The noise floor adapts
+    during silence, so the threshold follows the caller's room.
+    """
+
+    def __init__(self, mode: str = UPSTREAM_VAD_MODE, sample_rate: int = REALTIME_SAMPLE_RATE,
+                 frame_ms: int = VAD_FRAME_MS, hangover_ms: int = VAD_HANGOVER_MS,
+                 preroll_ms: int = VAD_PREROLL_MS, margin_db: float = VAD_MARGIN_DB,
+                 onset_frames: int = 2, min_speech_db: float = -50.0):
+        if mode not in VAD_MODES:
+            raise ValueError(f"Unsupported VAD mode: {mode}")
+        self.mode = mode
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.frame_bytes = self.frame_samples * 2
+        self.hangover_frames = max(1, hangover_ms // frame_ms)
+        self.preroll = deque(maxlen=max(0, preroll_ms // frame_ms))
+        self.margin_db = margin_db
+        self.onset_frames = onset_frames
+        self.min_speech_db = min_speech_db
+
+        self.noise_floor_db = None  # seeded from the first frame
+        self.speaking = False
+        self._speech_run = 0
+        self._silence_run = 0
+        self._remainder = b""
+
+        self.frames_total = 0
+        self.frames_dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def _features(self, frames: np.ndarray):
+        x = frames.astype(np.float32) / 32768.0
+        energy_db = 10 * np.log10(np.mean(x * x, axis=1) + 1e-10)
+        signs = np.signbit(x)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+        return energy_db, zcr
+
+    def process(self, pcm: bytes):
+        """
+        Returns (audio_to_forward, events) where events is a list of
+        "speech_start" / "speech_end" strings in the order they happened.
+        """
+        if not self.enabled:
+            return pcm, []
+
+        data = self._remainder + pcm
+        usable = len(data) - len(data) % self.frame_bytes
+        self._remainder = data[usable:]
+        if not usable:
+            return b"", []
+
+        frames = np.frombuffer(data, dtype="<i2", count=usable // 2).reshape(-1, self.frame_samples)
+        energy_db, zcr = self._features(frames)
+        self.frames_total += len(frames)
+        dropped_before = self.frames_dropped
+
+        out, events = [], []
+        for i in range(len(frames)):
+            if self.noise_floor_db is None:
+                self.noise_floor_db = float(energy_db[i])
+            threshold = max(self.noise_floor_db + self.margin_db, self.min_speech_db)
+            # Quiet fricatives ("s", "f") have high ZCR but little energy
+            is_speech = energy_db[i] > threshold or (
+                zcr[i] > 0.3 and energy_db[i] > threshold - self.margin_db / 2
+            )
+            frame = data[i * self.frame_bytes:(i + 1) * self.frame_bytes]
+
+            if is_speech:
+                self._speech_run += 1
+                self._silence_run = 0
+            else:
+                self._speech_run = 0
+                self._silence_run += 1
+
+            # The floor drops quickly to quieter frames, follows silence, and
+            # only creeps up during speech so a louder room cannot lock it out
+            rate = 0.5 if energy_db[i] < self.noise_floor_db else (0.002 if is_speech else 0.05)
+            self.noise_floor_db += rate * (float(energy_db[i]) - self.noise_floor_db)
+
+            if not self.speaking:
+                if self._speech_run >= self.onset_frames:
+                    self.speaking = True
+                    events.append("speech_start")
+                    out.extend(self.preroll)
+                    self.preroll.clear()
+                    out.append(frame)
+                elif self.mode == "gate":
+                    if len(self.preroll) == self.preroll.maxlen:
+                        self.frames_dropped += 1
+                    if self.preroll.maxlen:
+                        self.preroll.append(frame)
+                    else:
+                        self.frames_dropped += 1
+                else:
+                    out.append(frame)
+            else:
+                out.append(frame)
+                if self._silence_run >= self.hangover_frames:
+                    self.speaking = False
+                    events.append("speech_end")
+
+        if self.frames_dropped > dropped_before:
+            metrics.VAD_FRAMES_DROPPED.inc(self.frames_dropped - dropped_before)
+        return b"".join(out), events
+
+
+def build_vad(cfg: dict, sample_rate: int = REALTIME_SAMPLE_RATE):
+    """VoiceActivityDetector for the `vad` block of the client config (env defaults otherwise)."""
+    vad_cfg = cfg.get("vad") or {}
+    if isinstance(vad_cfg, str):
+        vad_cfg = {"mode": vad_cfg}
+    return VoiceActivityDetector(mode=vad_cfg.get("mode", UPSTREAM_VAD_MODE), sample_rate=sample_rate)
+
+
+# ------------------------------
+# 🔊 Downstream TTS framing (OpenAI → frontend)
+# ------------------------------
+# Negotiated through config / config_ack. With "binary_v1" every audio
+# chunk is a single binary WebSocket frame:
+#
+#   byte 0     protocol version (1)
+#   byte 1     message type (1 = audio chunk, 2 = end of response audio)
+#   bytes 2-3  response index, uint16 big-endian, per session
+#   bytes 4-7  chunk sequence number within the response, uint32 big-endian
+#   bytes 8-   PCM16 payload (empty for type 2)
+#
+# Clients that do not ask for it keep the JSON-wrapped
+# tts_start / <bytes> / tts_end sequence.
+
+AUDIO_FRAMING_JSON = "json"
+AUDIO_FRAMING_BINARY_V1 = "binary_v1"
+SUPPORTED_AUDIO_FRAMINGS = (AUDIO_FRAMING_BINARY_V1, AUDIO_FRAMING_JSON)
+
+FRAME_VERSION = 1
+FRAME_AUDIO_CHUNK = 1
+FRAME_AUDIO_END = 2
+FRAME_HEADER = struct.Struct("!BBHI")
+
+
+def negotiate_audio_framing(cfg: dict) -> str:
+    """Pick the best framing the client offered in its config message."""
+    offered = cfg.get("audio_framing") or []
+    if isinstance(offered, str):
+        offered = [offered]
+    for framing in SUPPORTED_AUDIO_FRAMINGS:
+        if framing in offered:
+            return framing
+    return AUDIO_FRAMING_JSON
+
+
+class DownstreamAudioFramer:
+    """Turns Realtime audio deltas into client frames for one session."""
+
+    def __init__(self, framing: str = AUDIO_FRAMING_JSON):
+        self.framing = framing
+        self._response_ids = {}
+        self._sequence = {}
+        self._next_index = 0
+
+    def _response_index(self, response_id) -> int:
+        if response_id not in self._response_ids:
+            self._response_ids[response_id] = self._next_index
+            self._next_index = (self._next_index + 1) % 0x10000
+        return self._response_ids[response_id]
+
+    def audio_chunk(self, response_id, pcm: bytes) -> bytes:
+        index = self._response_index(response_id)
+        seq = self._sequence.get(index, 0)
+        self._sequence[index] = seq + 1
+        return FRAME_HEADER.pack(FRAME_VERSION, FRAME_AUDIO_CHUNK, index, seq & 0xFFFFFFFF) + pcm
+
+    def audio_end(self, response_id) -> bytes:
+        index = self._response_index(response_id)
+        seq = self._sequence.pop(index, 0)
+        self._response_ids.pop(response_id, None)
+        return FRAME_HEADER.pack(FRAME_VERSION, FRAME_AUDIO_END, index, seq & 0xFFFFFFFF)
@@ -0,0 +1,276 @@
+import io
+import os
+import csv
+import json
+import codecs
+import asyncio
+import tempfile
+
+import numpy as np
+from fastapi.responses import StreamingResponse
+
+from . import loan_math
+from . import metrics
+from .logs import get_logger
+
+log = get_logger("bulk")
+
+
+# ------------------------------
+# 📦 Streaming bulk eligibility scoring
+# ------------------------------
+# Lead files (CSV with a header row, or JSONL) are read from the request
+# body as it arrives, scored BULK_CHUNK_ROWS at a time with the vectorised
+# loan math and streamed back as they are produced. Results the client has
+# not read yet wait in a temporary file, so memory stays flat however large
+# the upload is and whether or not the client reads while it uploads.
+#
+# Input columns: monthly_salary, loan_amount, loan_tenure_years, and
+# optionally id, date_of_birth (DD-MM-YYYY, enables the age + tenure rule)
+# and interest_rate (% per year, default loan_math.DEFAULT_ANNUAL_RATE).
+# CSV records must fit on one line.
+
+BULK_CHUNK_ROWS = int(os.getenv("BULK_CHUNK_ROWS", "5000"))
+
+OUTPUT_COLUMNS = (
+    "row", "id", "eligible", "emi_amount", "max_eligible_amount",
+    "total_payable", "total_interest", "interest_rate", "reason",
+)
+
+
+async def _lines(chunks):
+    """Decode a byte stream into lines without holding more than one chunk."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    tail = ""
+    async for chunk in chunks:
+        text = tail + decoder.decode(chunk)
+        lines = text.split("\n")
+        tail = lines.pop()
+        for line in lines:
+            yield line.rstrip("\r")
+    tail += decoder.decode(b"", final=True)
+    if tail.strip():
+        yield tail.rstrip("\r")
+
+
+async def read_records(chunks, fmt: str, chunk_rows: int = BULK_CHUNK_ROWS):
+    """Yield lists of up to `chunk_rows` records (dicts, or an error string per bad line)."""
+    header = None
+    batch = []
+    async for line in _lines(chunks):
+        if not line.strip():
+            continue
+        if fmt == "csv":
+            if header is None:
+                header = [name.strip().lower() for name in next(csv.reader([line]))]
+                continue
+            record = dict(zip(header, next(csv.reader([line]))))
+        else:
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    record = "record is not a JSON object"
+            except ValueError as e:
+                record = f"invalid JSON: {e}"
+        batch.append(record)
+        if len(batch) >= chunk_rows:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _number(record: dict, name: str, limit: float, default=None) -> float:
+    value = record.get(name)
+    if value is None or (isinstance(value, str) and not value.strip()):
+        if default is not None:
+            return default
+        raise ValueError(f"missing {name}")
+    value = float(str(value).replace(",", ""))
+    if not np.isfinite(value) or value < 0:
+        raise ValueError(f"invalid {name}")
+    if value > limit:
+        raise ValueError(f"{name} must be at most {limit:g}")
+    return value
+
+
+def score_records(records: list, first_row: int = 1) -> list:
+    """Score one chunk; the loan math runs once over the whole chunk."""
+    n = len(records)
+    salary = np.full(n, np.nan)
+    amount = np.full(n, np.nan)
+    tenure = np.full(n, np.nan)
+    rate = np.full(n, loan_math.DEFAULT_ANNUAL_RATE)
+    age = np.full(n, np.nan)
+    errors = [None] * n
+
+    for i, record in enumerate(records):
+        if isinstance(record, str):
+            errors[i] = record
+            continue
+        try:
+            salary[i] = _number(record, "monthly_salary", loan_math.MAX_AMOUNT)
+            amount[i] = _number(record, "loan_amount", loan_math.MAX_AMOUNT)
+            tenure[i] = _number(record, "loan_tenure_years", loan_math.MAX_TENURE_YEARS)
+            rate[i] = _number(record, "interest_rate", loan_math.MAX_ANNUAL_RATE,
+                              default=loan_math.DEFAULT_ANNUAL_RATE)
+            if not (salary[i] > 0 and amount[i] > 0 and tenure[i] > 0):
+                raise ValueError("salary, amount and tenure must be positive")
+            if loan_math.tenure_months(tenure[i]) < 1:
+                raise ValueError("loan_tenure_years must be at least one month")
+            if record.get("date_of_birth"):
+                years = loan_math.age_from_dob(record["date_of_birth"])
+                if years is None:
+                    raise ValueError("date_of_birth must be DD-MM-YYYY")
+                age[i] = years
+        except ValueError as e:
+            errors[i] = str(e)
+
+    summary = loan_math.loan_summary(amount, rate, tenure)
+    max_eligible = loan_math.max_eligible_amount(salary)
+    within_cap = amount <= max_eligible
+    age_ok = np.isnan(age) | (age + tenure <= loan_math.MAX_AGE_AT_MATURITY)
+    eligible = within_cap & age_ok
+
+    emi = np.rint(summary["emi"])
+    total_payable = np.rint(summary["total_payable"])
+    total_interest = np.rint(summary["total_interest"])
+    max_eligible = np.rint(max_eligible)
+    # Last line of defence: a row whose figures cannot be written is invalid, not fatal
+    priced = np.isfinite(emi) & np.isfinite(total_payable) & np.isfinite(total_interest) & np.isfinite(max_eligible)
+    for i in np.flatnonzero(~priced):
+        if errors[i] is None:
+            errors[i] = "figures out of range"
+
+    results = []
+    for i, record in enumerate(records):
+        row = {
+            "row": first_row + i,
+            "id": record.get("id") if isinstance(record, dict) else None,
+        }
+        if errors[i] is not None:
+            row.update(eligible=False, emi_amount=None, max_eligible_amount=None, total_payable=None,
+                       total_interest=None, interest_rate=None, reason=f"Invalid row: {errors[i]}")
+        else:
+            ok = bool(eligible[i])
+            if ok:
+                reason = "Eligible"
+            elif not within_cap[i]:
+                reason = f"Loan amount exceeds maximum eligible amount of ₹{max_eligible[i]:,.0f}"
+            else:
+                reason = f"Age + tenure exceeds {loan_math.MAX_AGE_AT_MATURITY} years"
+            # Same shape as calculate_loan_details: repayment figures only when eligible
+            row.update(
+                eligible=ok,
+                emi_amount=int(emi[i]) if ok else None,
+                max_eligible_amount=int(max_eligible[i]),
+                total_payable=int(total_payable[i]) if ok else None,
+                total_interest=int(total_interest[i]) if ok else None,
+                interest_rate=float(rate[i]),
+                reason=reason,
+            )
+        results.append(row)
+    return results
+
+
+def _format(rows: list, fmt: str, header: bool) -> str:
+    if fmt == "jsonl":
+        return "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    if header:
+        writer.writerow(OUTPUT_COLUMNS)
+    for row in rows:
+        writer.writerow(["" if row[c] is None else row[c] for c in OUTPUT_COLUMNS])
+    return out.getvalue()
+
+
+class _Spool:
+    """
+    Results waiting for the client, kept in a temporary file. Most HTTP
+    clients send the whole upload before reading the response, so scoring
+    must not wait for the client to read; the file absorbs the difference
+    and memory stays flat either way.
+    """
+
+    def __init__(self):
+        self._file = tempfile.TemporaryFile()
+        self._written = 0
+        self._read = 0
+        self._changed = asyncio.Event()
+        self.done = False
+
+    def write(self, data: bytes):
+        self._file.seek(self._written)
+        self._file.write(data)
+        self._written += len(data)
+        self._changed.set()
+
+    def finish(self):
+        self.done = True
+        self._changed.set()
+
+    async def read(self, size: int = 1 << 20):
+        """Next piece of output; b"" once everything was read and the producer finished."""
+        while self._read == self._written and not self.done:
+            self._changed.clear()
+            await self._changed.wait()
+        self._file.seek(self._read)
+        data = self._file.read(min(size, self._written - self._read))
+        self._read += len(data)
+        return data
+
+    def close(self):
+        self._file.close()
+
+
+async def _score_into(spool: _Spool, chunks, input_format: str, output_format: str, chunk_rows: int):
+    scored = invalid = 0
+    next_row = 1
+    try:
+        if output_format == "csv":
+            spool.write(_format([], "csv", header=True).encode())
+        async for records in read_records(chunks, input_format, chunk_rows):
+            # Keeps the event loop free while a large chunk is scored
+            rows = await asyncio.to_thread(score_records, records, next_row)
+            next_row += len(rows)
+            bad = sum(1 for row in rows if row["interest_rate"] is None)
+            invalid += bad
+            scored += len(rows) - bad
+            metrics.BULK_ROWS.inc(len(rows) - bad, outcome="scored")
+            metrics.BULK_ROWS.inc(bad, outcome="invalid")
+            spool.write(_format(rows, output_format, header=False).encode())
+    finally:
+        spool.finish()
+        log.info("bulk scoring finished", rows=scored + invalid, invalid=invalid)
+
+
+class ScoringResponse(StreamingResponse):
+    """
+    Streams results while the upload is still being scored. The stock
+    StreamingResponse listens for a disconnect on the receive channel
+    (ASGI < 2.4), which would swallow the upload; here the scorer owns the
+    request body and request.stream() reports a client that went away.
+    """
+
+    def __init__(self, chunks, input_format: str, output_format: str, chunk_rows: int = BULK_CHUNK_ROWS, **kwargs):
+        self._spool = _Spool()
+        self._job = (chunks, input_format, output_format, chunk_rows)
+        super().__init__(self._drain(), **kwargs)
+
+    async def _drain(self):
+        while True:
+            data = await self._spool.read()
+            if not data:
+                return
+            yield data
+
+    async def __call__(self, scope, receive, send):
+        scorer = asyncio.create_task(_score_into(self._spool, *self._job))
+        try:
+            await self.stream_response(send)
+            await scorer  # re-raises a failure that ended the stream early
+        finally:
+            scorer.cancel()
+            await asyncio.gather(scorer, return_exceptions=True)
+            self._spool.close()
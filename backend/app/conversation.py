@@ -0,0 +1,107 @@
+import os
+
+
+# ------------------------------
+# 🧠 Incremental conversation buffer
+# ------------------------------
+# Turns are stored once and only ever appended to. Assistant transcript
+# deltas are kept as parts and joined lazily, each turn keeps a running
+# token estimate, and the extraction context is cut from the end of the
+# buffer under a token budget, so building it costs O(window) rather than
+# O(whole call) per turn.
+
+EXTRACTION_CONTEXT_TOKENS = int(os.getenv("EXTRACTION_CONTEXT_TOKENS", "1500"))
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap tokenizer-free estimate (~4 characters per token for English)."""
+    return (len(text) + 3) // 4
+
+
+class ConversationBuffer:
+    def __init__(self, turns=None):
+        self._roles = []
+        self._parts = []   # list of text fragments per turn
+        self._text = []    # joined text cache per turn (None when stale)
+        self._tokens = []  # running token estimate per rendered line
+        if turns:
+            self.extend(turns)
+
+    def __len__(self):
+        return len(self._roles)
+
+    def __bool__(self):
+        return bool(self._roles)
+
+    def add_turn(self, role: str, text: str):
+        self._roles.append(role)
+        self._parts.append([text])
+        self._text.append(text)
+        self._tokens.append(estimate_tokens(f"{role}: {text}\n"))
+
+    def append_text(self, role: str, text: str):
+        """Extend the last turn when it has the same role (streamed deltas), else start a new one."""
+        if not self._roles or self._roles[-1] != role:
+            self.add_turn(role, text)
+            return
+        self._parts[-1].append(" " + text)
+        self._text[-1] = None
+        self._tokens[-1] += estimate_tokens(" " + text)
+
+    def set_text(self, i: int, text: str):
+        """Replace the text of turn `i` (e.g. a placeholder once its transcript arrives)."""
+        self._parts[i] = [text]
+        self._text[i] = text
+        self._tokens[i] = estimate_tokens(f"{self._roles[i]}: {text}\n")
+
+    def extend(self, turns):
+        for turn in turns:
+            self.add_turn(turn["role"], turn["text"])
+
+    def role(self, i: int) -> str:
+        return self._roles[i]
+
+    def text(self, i: int) -> str:
+        if self._text[i] is None:
+            joined = "".join(self._parts[i])
+            self._parts[i] = [joined]
+            self._text[i] = joined
+        return self._text[i]
+
+    def to_list(self) -> list:
+        return [{"role": self._roles[i], "text": self.text(i)} for i in range(len(self))]
+
+    def read_since(self, cursor: dict) -> list:
+        """
+        Turns (or the tail of a growing turn) added since `cursor`
+        ({"turn", "offset"}), advancing the cursor to the end.
+        """
+        segment = []
+        for i in range(cursor["turn"], len(self)):
+            text = self.text(i)
+            if i == cursor["turn"]:
+                text = text[cursor["offset"]:]
+            segment.append({"role": self._roles[i], "text": text})
+        if self._roles:
+            cursor["turn"] = len(self) - 1
+            cursor["offset"] = len(self.text(-1))
+        return segment
+
+    def window_start(self, since_turn: int, budget_tokens: int) -> int:
+        """
+        First turn of the extraction window: every turn from `since_turn`
+        on (never skip unseen text), plus as many earlier turns as still
+        fit in `budget_tokens`.
+        """
+        start = len(self)
+        used = 0
+        while start > 0:
+            cost = self._tokens[start - 1]
+            if start - 1 < since_turn and used + cost > budget_tokens:
+                break
+            used += cost
+            start -= 1
+        return start
+
+    def render(self, start: int = 0) -> str:
+        return "\n".join(f"{self._roles[i]}: {self.text(i)}" for i in range(start, len(self)))
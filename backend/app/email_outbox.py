@@ -0,0 +1,378 @@
+import os
+import time
+import uuid
+import random
+import sqlite3
+import asyncio
+import smtplib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from email.mime.text import MIMEText
+
+from . import metrics
+from .logs import get_logger
+
+log = get_logger("email")
+
+
+# ------------------------------
+# 📧 SMTP outbox
+# ------------------------------
+# Reports are queued instead of sent inline. A small pool of workers each
+# keeps one authenticated SMTP connection open and reuses it across messages
+# (draining a burst in a single batch), reconnects when the server drops it,
+# and retries transient failures with jittered exponential backoff. Pending
+# messages are kept in SQLite (EMAIL_OUTBOX_PATH) so a restart resumes them.
+# Blocking smtplib calls run on the outbox's own threads, never the default
+# to_thread pool.
+#
+# For local testing point it at the SMTP stand-in in bench/ (or aiosmtpd):
+#   python -m bench.mock_smtp --port 1025
+#   SMTP_HOST=127.0.0.1 SMTP_PORT=1025 SMTP_SECURITY=none
+
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "465"))
+SMTP_SECURITY = os.getenv("SMTP_SECURITY", "ssl")  # ssl | starttls | none
+SMTP_USERNAME = os.getenv("SMTP_USERNAME", os.getenv("GMAIL_ADDRESS"))
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", os.getenv("GMAIL_APP_PASSWORD"))
+SMTP_FROM = os.getenv("SMTP_FROM", SMTP_USERNAME or "")
+SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", "15"))
+SMTP_IDLE_SECONDS = float(os.getenv("SMTP_IDLE_SECONDS", "60"))
+
+EMAIL_WORKERS = int(os.getenv("EMAIL_WORKERS", "2"))
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "20"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "5"))
+EMAIL_RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", "2"))
+EMAIL_RETRY_MAX_SECONDS = float(os.getenv("EMAIL_RETRY_MAX_SECONDS", "300"))
+EMAIL_OUTBOX_PATH = os.getenv("EMAIL_OUTBOX_PATH", "email_outbox.db")  # "" = memory only
+
+
+class EmailJob:
+    __slots__ = ("id", "to", "subject", "body", "attempts", "on_status")
+
+    def __init__(self, to: str, subject: str, body: str, job_id: str = None, attempts: int = 0, on_status=None):
+        self.id = job_id or uuid.uuid4().hex
+        self.to = to
+        self.subject = subject
+        self.body = body
+        self.attempts = attempts
+        self.on_status = on_status  # async (status, job) -> None; not persisted
+
+    def as_message(self) -> str:
+        msg = MIMEText(self.body, "plain")
+        msg["Subject"] = self.subject
+        msg["From"] = SMTP_FROM
+        msg["To"] = self.to
+        return msg.as_string()
+
+
+def _is_permanent(exc: Exception) -> bool:
+    """5xx replies about the message itself will not succeed on retry."""
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in exc.recipients.values())
+    if isinstance(exc, smtplib.SMTPAuthenticationError):
+        return False  # credentials may be rotated; let it retry
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return exc.smtp_code >= 500
+    return False
+
+
+class SMTPConnection:
+    """One long-lived SMTP connection. Only ever used by one worker at a time."""
+
+    def __init__(self, host=None, port=None, security=None, username=None, password=None):
+        self.host = host or SMTP_HOST
+        self.port = port or SMTP_PORT
+        self.security = security or SMTP_SECURITY
+        self.username = SMTP_USERNAME if username is None else username
+        self.password = SMTP_PASSWORD if password is None else password
+        self._smtp = None
+        self._last_used = 0.0
+        self.connects = 0
+
+    def _connect(self):
+        if self.security == "ssl":
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=SMTP_TIMEOUT_SECONDS)
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT_SECONDS)
+        try:
+            if self.security == "starttls":
+                smtp.starttls()
+            if self.username and self.password:
+                smtp.login(self.username, self.password)
+        except BaseException:
+            smtp.close()
+            raise
+        self._smtp = smtp
+        self.connects += 1
+        log.debug("SMTP connected", host=self.host, port=self.port)
+
+    def _ensure(self):
+        if self._smtp is not None and time.monotonic() - self._last_used > SMTP_IDLE_SECONDS:
+            # Servers drop idle sessions; probe before reusing a quiet one
+            try:
+                self._smtp.noop()
+            except (smtplib.SMTPException, OSError):
+                self.close()
+        if self._smtp is None:
+            self._connect()
+
+    def send_batch(self, jobs):
+        """
+        Send each job over the shared connection. Returns a list of
+        (error_or_None, seconds) in job order. A dropped connection is
+        re-opened once per batch; a second drop fails the remainder. A
+        rejected login fails the remainder straight away, since every job
+        would hit it again.
+        """
+        results = []
+        reconnected = False
+        for job in jobs:
+            start = time.perf_counter()
+            while True:
+                try:
+                    self._ensure()
+                    self._smtp.sendmail(SMTP_FROM, [job.to], job.as_message())
+                    self._last_used = time.monotonic()
+                    results.append((None, time.perf_counter() - start))
+                    break
+                except smtplib.SMTPAuthenticationError as e:
+                    log.error("SMTP login rejected", host=self.host, code=e.smtp_code)
+                    elapsed = time.perf_counter() - start
+                    results.extend((e, elapsed) for _ in range(len(jobs) - len(results)))
+                    return results
+                except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError) as e:
+                    error = e
+                except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused) as e:
+                    # The session is still usable after a per-message refusal
+                    # (checked before OSError: SMTPException subclasses it)
+                    results.append((e, time.perf_counter() - start))
+                    break
+                except OSError as e:
+                    error = e
+                self.close()
+                if reconnected:
+                    results.append((error, time.perf_counter() - start))
+                    break
+                reconnected = True
+        return results
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+
+
+class _OutboxStore:
+    """SQLite-backed record of undelivered jobs; writes run on one dedicated thread."""
+
+    def __init__(self, path: str):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="email-outbox")
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            " id TEXT PRIMARY KEY, to_addr TEXT, subject TEXT, body TEXT,"
+            " attempts INTEGER, created_at REAL)"
+        )
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _execute(self, sql: str, params: tuple):
+        with self._lock:
+            self._db.execute(sql, params)
+
+    async def add(self, job: EmailJob):
+        await self._run(
+            self._execute,
+            "INSERT OR REPLACE INTO outbox VALUES (?, ?, ?, ?, ?, ?)",
+            (job.id, job.to, job.subject, job.body, job.attempts, time.time()),
+        )
+
+    async def update_attempts(self, job: EmailJob):
+        await self._run(self._execute, "UPDATE outbox SET attempts = ? WHERE id = ?", (job.attempts, job.id))
+
+    async def remove(self, job: EmailJob):
+        await self._run(self._execute, "DELETE FROM outbox WHERE id = ?", (job.id,))
+
+    def _pending_sync(self):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, to_addr, subject, body, attempts FROM outbox ORDER BY created_at"
+            ).fetchall()
+        return [EmailJob(to, subject, body, job_id=job_id, attempts=attempts)
+                for job_id, to, subject, body, attempts in rows]
+
+    async def pending(self):
+        return await self._run(self._pending_sync)
+
+    def _close_sync(self):
+        with self._lock:
+            self._db.close()
+
+    async def close(self):
+        await self._run(self._close_sync)
+        self._executor.shutdown(wait=False)
+
+
+class EmailOutbox:
+    def __init__(
+        self,
+        workers: int = EMAIL_WORKERS,
+        batch_size: int = EMAIL_BATCH_SIZE,
+        max_attempts: int = EMAIL_MAX_ATTEMPTS,
+        retry_base: float = EMAIL_RETRY_BASE_SECONDS,
+        retry_max: float = EMAIL_RETRY_MAX_SECONDS,
+        path: str = EMAIL_OUTBOX_PATH,
+        connection_factory=SMTPConnection,
+    ):
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.path = path
+        self._connection_factory = connection_factory
+
+        self._queue = None
+        self._store = None
+        self._executor = None
+        self._connections = []
+        self._tasks = []
+        self._retry_handles = set()
+
+    @property
+    def started(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self):
+        if self.started:
+            return
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="smtp")
+        if self.path:
+            self._store = _OutboxStore(self.path)
+            resumed = await self._store.pending()
+            for job in resumed:
+                self._queue.put_nowait(job)
+            if resumed:
+                log.info("resuming queued emails", count=len(resumed))
+        metrics.EMAIL_OUTBOX_DEPTH.set(self._queue.qsize())
+        for i in range(self.workers):
+            conn = self._connection_factory()
+            self._connections.append(conn)
+            self._tasks.append(asyncio.create_task(self._worker(conn)))
+        log.info("email outbox ready", workers=self.workers, durable=bool(self.path))
+
+    async def enqueue(self, to: str, subject: str, body: str, on_status=None) -> EmailJob:
+        """Queue one email; `on_status(status, job)` hears queued/retrying/sent/failed."""
+        if not self.started:
+            await self.start()
+        job = EmailJob(to, subject, body, on_status=on_status)
+        if self._store is not None:
+            await self._store.add(job)
+        self._queue.put_nowait(job)
+        metrics.EMAIL_OUTBOX_DEPTH.set(self._queue.qsize())
+        await self._notify(job, "queued")
+        return job
+
+    async def _notify(self, job: EmailJob, status: str):
+        if job.on_status is None:
+            return
+        try:
+            await job.on_status(status, job)
+        except Exception as e:
+            # The session that asked for the email may already be gone
+            log.debug("email status listener failed", status=status, error=str(e))
+
+    async def _worker(self, conn: SMTPConnection):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            metrics.EMAIL_OUTBOX_DEPTH.set(self._queue.qsize())
+            try:
+                with metrics.track_task("email"):
+                    results = await loop.run_in_executor(self._executor, conn.send_batch, batch)
+                for job, (error, seconds) in zip(batch, results):
+                    await self._finish(job, error, seconds)
+            except Exception as e:
+                # Keep the worker alive; durable jobs are still in the store
+                # and go out again after a restart
+                log.exception("email worker error", batch=len(batch), error=str(e))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _finish(self, job: EmailJob, error, seconds: float):
+        job.attempts += 1
+        if error is None:
+            metrics.SMTP_LATENCY.observe(seconds)
+            metrics.EMAILS.inc(status="sent")
+            if self._store is not None:
+                await self._store.remove(job)
+            log.info("email sent", to=job.to, attempts=job.attempts)
+            await self._notify(job, "sent")
+            return
+
+        if _is_permanent(error) or job.attempts >= self.max_attempts:
+            metrics.EMAILS.inc(status="failed")
+            if self._store is not None:
+                await self._store.remove(job)
+            log.warning("email failed", to=job.to, attempts=job.attempts, error=str(error))
+            await self._notify(job, "failed")
+            return
+
+        delay = min(self.retry_max, self.retry_base * 2 ** (job.attempts - 1)) * random.uniform(0.5, 1.0)
+        metrics.EMAILS.inc(status="retrying")
+        if self._store is not None:
+            await self._store.update_attempts(job)
+        log.warning("email retry scheduled", to=job.to, attempts=job.attempts,
+                    delay_s=round(delay, 2), error=str(error))
+        self._schedule_retry(job, delay)
+        await self._notify(job, "retrying")
+
+    def _schedule_retry(self, job: EmailJob, delay: float):
+        def requeue():
+            self._retry_handles.discard(handle)
+            self._queue.put_nowait(job)
+            metrics.EMAIL_OUTBOX_DEPTH.set(self._queue.qsize())
+
+        handle = asyncio.get_running_loop().call_later(delay, requeue)
+        self._retry_handles.add(handle)
+
+    async def stop(self, drain_timeout: float = 5.0):
+        """Give queued mail a moment to go out, then close connections."""
+        if not self.started:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            log.warning("email outbox stopped with mail pending", pending=self._queue.qsize())
+        for handle in self._retry_handles:
+            handle.cancel()
+        self._retry_handles.clear()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        loop = asyncio.get_running_loop()
+        for conn in self._connections:
+            await loop.run_in_executor(self._executor, conn.close)
+        self._connections = []
+        self._executor.shutdown(wait=False)
+        if self._store is not None:
+            await self._store.close()
+            self._store = None
+        log.info("email outbox closed")
+
+
+email_outbox = EmailOutbox()
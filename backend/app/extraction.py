@@ -0,0 +1,397 @@
+import os
+import copy
+import json
+import time
+import asyncio
+
+from .http_client import get_http_session, request_timeout
+from .conversation import estimate_tokens
+from .result_cache import extraction_cache, content_key, normalise_conversation
+from .rate_limiter import (
+    llm_limiter, retry_after_seconds, backoff_delay, LLM_MAX_RETRIES, PRIORITY_EXTRACTION
+)
+from .logs import get_logger
+from . import metrics
+
+log = get_logger("extraction")
+
+
+# ------------------------------
+# 🎯 Field extraction engine
+# ------------------------------
+# One structured-output chat completion per turn returns every field value
+# together with its confirmation status. The same result feeds the
+# `field_extracted` messages and the `field_pending` / `field_confirmed` flow.
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_CHAT_URL = os.getenv("OPENAI_CHAT_URL", "https://api.openai.com/v1/chat/completions")
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
+
+# Field name -> JSON schema type of its value
+FIELD_TYPES = {
+    "first_name": "string",
+    "date_of_birth": "string",
+    "monthly_salary": "integer",
+    "phone_number": "string",
+    "email_address": "string",
+    "loan_amount": "integer",
+    "loan_tenure_years": "integer",
+}
+FIELD_NAMES = list(FIELD_TYPES) + ["email_consent"]
+
+
+def _field_schema(value_type: str) -> dict:
+    return {
+        "type": "object",
+        "properties": {
+            "value": {"type": [value_type, "null"]},
+            "confirmed": {"type": "boolean"},
+        },
+        "required": ["value", "confirmed"],
+        "additionalProperties": False,
+    }
+
+
+EXTRACTION_SCHEMA = {
+    "name": "loan_fields",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            **{name: _field_schema(t) for name, t in FIELD_TYPES.items()},
+            "email_consent": {"type": "boolean"},
+        },
+        "required": FIELD_NAMES,
+        "additionalProperties": False,
+    },
+}
+
+EXTRACTION_INSTRUCTIONS = """
+You extract loan application fields from a voice conversation between a user and a home loan assistant.
+
+For each field return its latest value and whether it is confirmed:
+- first_name
+- date_of_birth (DD-MM-YYYY)
+- monthly_salary (integer, INR)
+- phone_number
+- email_address
+- loan_amount (integer, INR)
+- loan_tenure_years (integer, years)
+
+Rules:
+- If a field is not mentioned, its value is null and confirmed is false.
+- If the user corrected a value, return the corrected one.
+- confirmed is true only when the user explicitly agreed that the value is right
+  (for example the assistant read it back and the user said yes), otherwise false.
+- email_consent is true only if the user explicitly agreed to receive the loan report by email.
+- Amounts are spoken the Indian way: "30 lakh" is 3000000, "1.2 crore" is 12000000, "75k" is 75000.
+- Phone numbers and email addresses are often spelled out ("nine eight four...", "at gmail dot com");
+  return them written normally.
+- "Known so far" lists what earlier, no longer shown parts of the call established. Keep those values
+  and statuses unless the conversation corrects or confirms them.
+
+The next messages are worked examples. Each example gives "Known so far" (possibly empty) and the
+conversation, followed by the correct answer.
+""".strip()
+
+# Worked examples: (known so far, conversation, {field: (value, confirmed)}, email_consent)
+_EXAMPLES = [
+    (
+        "",
+        "assistant: Hello! May I know your name?\n"
+        "user: Hi, I'm Ravi. I earn about 85 thousand a month and I'm looking for a loan of 40 lakh.\n"
+        "assistant: Thanks Ravi. Just to confirm, your monthly salary is ₹85,000?\n"
+        "user: Yes, that's right.",
+        {"first_name": ("Ravi", False), "monthly_salary": (85000, True), "loan_amount": (4000000, False)},
+        False,
+    ),
+    (
+        "- first_name: \"Ravi\" (unconfirmed)\n- monthly_salary: 85000 (confirmed)\n- loan_amount: 4000000 (unconfirmed)",
+        "assistant: Over how many years would you like to repay the ₹40 lakh?\n"
+        "user: Twenty years. Actually, make the loan 35 lakh, not 40.\n"
+        "assistant: Got it, ₹35 lakh over 20 years. Is that correct?\n"
+        "user: Yes.",
+        {
+            "first_name": ("Ravi", False), "monthly_salary": (85000, True),
+            "loan_amount": (3500000, True), "loan_tenure_years": (20, True),
+        },
+        False,
+    ),
+    (
+        "",
+        "user: My date of birth is fourth March nineteen ninety.\n"
+        "assistant: Thank you. And your phone number?\n"
+        "user: nine eight four five, zero one two, three four five.\n"
+        "assistant: I have 98450 12345. Is that right?\n"
+        "user: No, the last digits are three four six.",
+        {"date_of_birth": ("04-03-1990", False), "phone_number": ("9845012346", False)},
+        False,
+    ),
+    (
+        "- first_name: \"Meera\" (confirmed)\n- loan_amount: 12000000 (confirmed)",
+        "assistant: Shall I email you the loan report?\n"
+        "user: Sure, send it to meera dot k at gmail dot com.\n"
+        "assistant: That's meera.k@gmail.com, correct?\n"
+        "user: Correct.",
+        {
+            "first_name": ("Meera", True), "loan_amount": (12000000, True),
+            "email_address": ("meera.k@gmail.com", True),
+        },
+        True,
+    ),
+]
+
+
+def _known_message(known: str) -> dict:
+    return {"role": "user", "content": f"Known so far:\n{known or '(nothing yet)'}"}
+
+
+def _conversation_message(conversation: str) -> dict:
+    return {"role": "user", "content": f"Conversation:\n\"\"\"{conversation}\"\"\""}
+
+
+def _example_answer(values: dict, email_consent: bool) -> str:
+    answer = {}
+    for name in FIELD_TYPES:
+        value, confirmed = values.get(name, (None, False))
+        answer[name] = {"value": value, "confirmed": confirmed}
+    answer["email_consent"] = email_consent
+    return json.dumps(answer, ensure_ascii=False)
+
+
+# ------------------------------
+# Cacheable prompt prefix
+# ------------------------------
+# Providers cache a prompt prefix that is byte-identical between requests
+# (OpenAI: automatically, from 1024 tokens). Every extraction therefore
+# starts with the same messages (instructions, then the worked examples)
+# and only the per-call part follows, always in the same order: "Known so
+# far", then the conversation window. The response schema is also part of
+# the prefix. The examples make it long enough to be cached, and they
+# help with spoken amounts and corrections. Nothing in EXTRACTION_PREFIX may
+# depend on the call.
+def _build_prefix() -> list:
+    messages = [{"role": "system", "content": EXTRACTION_INSTRUCTIONS}]
+    for known, conversation, values, email_consent in _EXAMPLES:
+        messages += [
+            _known_message(known),
+            _conversation_message(conversation),
+            {"role": "assistant", "content": _example_answer(values, email_consent)},
+        ]
+    return messages
+
+
+EXTRACTION_PREFIX = _build_prefix()
+
+# Bump whenever EXTRACTION_PREFIX or EXTRACTION_SCHEMA changes, so cached
+# results of the old prompt are not reused
+EXTRACTION_PROMPT_VERSION = "2"
+
+# Routes requests sharing the prefix to the same provider cache
+EXTRACTION_PROMPT_CACHE_KEY = f"loan-extraction-v{EXTRACTION_PROMPT_VERSION}"
+EXTRACTION_PREFIX_TOKENS = sum(estimate_tokens(m["content"]) for m in EXTRACTION_PREFIX)
+
+
+def extraction_cache_key(conversation: str, known: str = "") -> str:
+    """Content address of one extraction input."""
+    return content_key(
+        EXTRACTION_PROMPT_VERSION, LLM_MODEL, normalise_conversation(conversation), normalise_conversation(known)
+    )
+
+
+def empty_extraction() -> dict:
+    """Result used when nothing could be extracted."""
+    return {
+        "fields": {name: None for name in FIELD_NAMES},
+        "confirmed": {},
+    }
+
+
+def known_fields_summary(session_state: dict) -> str:
+    """Compact record of already-extracted fields, sent instead of the old transcript."""
+    fields = session_state.get("fields", {})
+    confirmed = session_state.get("confirmed_fields", {})
+    lines = []
+    for name in FIELD_NAMES:
+        value = fields.get(name)
+        if value is None:
+            continue
+        status = "confirmed" if confirmed.get(name) == value else "unconfirmed"
+        lines.append(f"- {name}: {json.dumps(value, ensure_ascii=False)} ({status})")
+    return "\n".join(lines)
+
+
+def _parse_extraction(content: str) -> dict:
+    parsed = json.loads(content)
+    fields, confirmed = {}, {}
+    for name in FIELD_TYPES:
+        info = parsed.get(name) or {}
+        fields[name] = info.get("value")
+        if fields[name] is not None:
+            confirmed[name] = bool(info.get("confirmed", False))
+    fields["email_consent"] = bool(parsed.get("email_consent", False))
+    return {"fields": fields, "confirmed": confirmed}
+
+
+def merge_fields(session_state: dict, values: dict, version: int) -> dict:
+    """
+    Merge newly extracted values into the session's known fields.
+
+    Each field remembers the conversation version it was last set at, so a
+    slower LLM result never overwrites a value the fast path found in a newer
+    segment. None means "not mentioned" and never clears a known value.
+    Returns the fields whose value changed.
+    """
+    known = session_state.setdefault("fields", {})
+    versions = session_state.setdefault("field_versions", {})
+    changed = {}
+    for field, value in values.items():
+        if value is None or version < versions.get(field, 0):
+            continue
+        versions[field] = version
+        if known.get(field) != value:
+            known[field] = value
+            changed[field] = value
+    return changed
+
+
+def record_prompt_usage(helper: str, usage: dict):
+    """Count prompt tokens and the part of them served from the provider's prompt cache."""
+    prompt_tokens = usage.get("prompt_tokens")
+    if prompt_tokens is None:
+        return
+    cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+    metrics.LLM_PROMPT_TOKENS.inc(prompt_tokens, helper=helper)
+    metrics.LLM_CACHED_TOKENS.inc(cached, helper=helper)
+    log.debug("prompt usage", helper=helper, prompt_tokens=prompt_tokens, cached_tokens=cached)
+
+
+async def extract_user_fields(
+    conversation: str, known: str = "", priority: int = PRIORITY_EXTRACTION, timeout: float = None
+):
+    """
+    Extract field values and their confirmation status in one call.
+    `conversation` is the recent window and `known` the known_fields_summary()
+    of everything before it. The call waits its turn in the shared rate
+    limiter at `priority`; `timeout` replaces LLM_HTTP_TOTAL_TIMEOUT, the
+    connect and read timeouts always apply.
+
+    Returns {"fields": {name: value}, "confirmed": {name: bool}} where
+    `confirmed` only lists fields that currently have a value. Results
+    are cached by extraction_cache_key(); failures never are. On failure
+    (including running out of retries on 429s) the result also carries
+    "failed": True and must not be treated as "nothing was said".
+    """
+    log.debug("extract_user_fields started", chars=len(conversation), known_chars=len(known))
+
+    cache_key = extraction_cache_key(conversation, known)
+    cached = extraction_cache.get(cache_key)
+    if cached is not None:
+        log.debug("extract_user_fields cache hit", key=cache_key[:12])
+        return copy.deepcopy(cached)
+
+    call_messages = [_known_message(known), _conversation_message(conversation)]
+
+    headers = {
+        "Authorization": f"Bearer {OPENAI_API_KEY}",
+        "Content-Type": "application/json",
+    }
+    body = {
+        "model": LLM_MODEL,
+        "messages": EXTRACTION_PREFIX + call_messages,
+        "response_format": {"type": "json_schema", "json_schema": EXTRACTION_SCHEMA},
+        "temperature": 0.0,
+        "max_tokens": 400,
+        "prompt_cache_key": EXTRACTION_PROMPT_CACHE_KEY,
+    }
+    estimated = (
+        EXTRACTION_PREFIX_TOKENS + sum(estimate_tokens(m["content"]) for m in call_messages) + body["max_tokens"]
+    )
+
+    session = get_http_session()
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            await llm_limiter.acquire(estimated, priority)
+            async with session.post(
+                OPENAI_CHAT_URL, headers=headers, json=body, timeout=request_timeout(timeout)
+            ) as resp:
+                if resp.status == 429 or resp.status >= 500:
+                    outcome = "rate_limited" if resp.status == 429 else f"http_{resp.status}"
+                    text = await resp.text()
+                    if resp.status == 429:
+                        metrics.LLM_RATE_LIMITED.inc(helper="extract_user_fields")
+                    if attempt == LLM_MAX_RETRIES:
+                        raise RuntimeError(f"OpenAI error {resp.status} after {attempt + 1} attempts: {text}")
+                    retry_after = retry_after_seconds(resp.headers)
+                    delay = backoff_delay(attempt, retry_after)
+                    metrics.LLM_RETRIES.inc(helper="extract_user_fields")
+                    log.warning("extract_user_fields retrying", status=resp.status, attempt=attempt + 1, delay=round(delay, 2))
+                    if resp.status == 429:
+                        # Everyone is over the limit, not just this call
+                        llm_limiter.pause(retry_after if retry_after is not None else delay)
+                    await asyncio.sleep(delay)
+                    continue
+
+                if resp.status != 200:
+                    outcome = f"http_{resp.status}"
+                    text = await resp.text()
+                    raise RuntimeError(f"OpenAI error {resp.status}: {text}")
+
+                data = await resp.json()
+                usage = data.get("usage") or {}
+                llm_limiter.reconcile(estimated, usage.get("total_tokens"))
+                record_prompt_usage("extract_user_fields", usage)
+                message = data["choices"][0]["message"]
+                if message.get("refusal"):
+                    raise RuntimeError(f"Extraction refused: {message['refusal']}")
+
+                result = _parse_extraction(message["content"])
+                outcome = "ok"
+                extraction_cache.put(cache_key, copy.deepcopy(result))
+                extracted_count = sum(1 for v in result["fields"].values() if v not in [None, False])
+                log.info("extract_user_fields complete", extracted=extracted_count, total=len(FIELD_NAMES))
+                log.debug("extract_user_fields result", result=result)
+                return result
+
+    except Exception as e:
+        if isinstance(e, asyncio.TimeoutError):
+            outcome = "timeout"
+        log.exception("extract_user_fields failed", error=str(e))
+        return {**empty_extraction(), "failed": True}
+
+    finally:
+        metrics.LLM_LATENCY.observe(time.perf_counter() - started, helper="extract_user_fields")
+        metrics.LLM_REQUESTS.inc(helper="extract_user_fields", outcome=outcome)
+
+
+async def handle_field_confirmation(extraction: dict, websocket, session_state: dict):
+    """
+    Move extracted values between pending and confirmed and notify the UI
+    about every value or status that changed since the last turn.
+    """
+    pending = session_state.setdefault("pending_fields", {})
+    confirmed_fields = session_state.setdefault("confirmed_fields", {})
+
+    for field, is_confirmed in extraction["confirmed"].items():
+        value = extraction["fields"].get(field)
+        if not value:
+            continue
+
+        if is_confirmed:
+            if confirmed_fields.get(field) == value:
+                continue
+            confirmed_fields[field] = value
+            pending.pop(field, None)
+            log.info("field confirmed", field=field)
+            await websocket.send_json({"type": "field_confirmed", "field": field, "value": value})
+        else:
+            if pending.get(field) == value or confirmed_fields.get(field) == value:
+                continue
+            pending[field] = value
+            confirmed_fields.pop(field, None)
+            log.info("field pending", field=field)
+            await websocket.send_json({"type": "field_pending", "field": field, "value": value})
+
+    return session_state
@@ -0,0 +1,136 @@
+import os
+import asyncio
+
+from .logs import get_logger
+
+log = get_logger("extraction")
+
+
+# ------------------------------
+# ⏱️ Per-session extraction scheduler
+# ------------------------------
+# Every `response.done` bumps the conversation version and calls trigger().
+# Triggers that land inside the debounce window are coalesced, at most one
+# extraction runs at a time, and a run that finishes after a newer one has
+# already published is not allowed to send its (stale) results.
+
+EXTRACTION_DEBOUNCE_SECONDS = int(os.getenv("EXTRACTION_DEBOUNCE_MS", "400")) / 1000
+EXTRACTION_MAX_DELAY_SECONDS = int(os.getenv("EXTRACTION_MAX_DELAY_MS", "2000")) / 1000
+EXTRACTION_CANCEL_SUPERSEDED = os.getenv("EXTRACTION_CANCEL_SUPERSEDED", "0") == "1"
+
+
+class ExtractionScheduler:
+    """
+    Single-flight, debounced runner for one session's field extraction.
+
+    `run` is an async callable taking the conversation version it should
+    extract for. It must snapshot the conversation when it starts and call
+    `claim(version)` before publishing anything to the client.
+    """
+
+    def __init__(
+        self,
+        run,
+        debounce: float = EXTRACTION_DEBOUNCE_SECONDS,
+        max_delay: float = EXTRACTION_MAX_DELAY_SECONDS,
+        cancel_superseded: bool = EXTRACTION_CANCEL_SUPERSEDED,
+        initial_version: int = 0,
+        spawn=None,
+    ):
+        self._run = run
+        # Lets a session supervisor own the worker and run tasks
+        self._spawn = spawn or (lambda coro, kind: asyncio.create_task(coro))
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.cancel_superseded = cancel_superseded
+
+        # A resumed session continues from its stored version so per-field
+        # versions recorded before the reconnect still compare correctly
+        self.version = initial_version            # latest conversation version requested
+        self.running_version = 0                  # version of the in-flight run (0 = idle)
+        self.published_version = initial_version  # newest version whose results reached the client
+        self.superseded_runs = 0
+
+        self._wakeup = asyncio.Event()
+        self._worker = None
+        self._current = None
+        self._closed = False
+
+    def trigger(self, schedule: bool = True) -> int:
+        """
+        Record a new conversation version and, unless `schedule` is False
+        (the fast path already resolved the segment), schedule an extraction.
+        """
+        if self._closed:
+            return self.version
+        self.version += 1
+        if not schedule:
+            return self.version
+        self._wakeup.set()
+
+        if self._worker is None:
+            self._worker = self._spawn(self._loop(), "extraction_scheduler")
+
+        # A newer transcript makes the in-flight run obsolete
+        if self.cancel_superseded and self._current is not None and not self._current.done():
+            self._current.cancel()
+
+        return self.version
+
+    def claim(self, version: int) -> bool:
+        """
+        Return True if results for `version` may be published. Keeps
+        `field_extracted` / `loan_calculations` monotonic per session.
+        """
+        if version < self.published_version or version < self.running_version:
+            self.superseded_runs += 1
+            return False
+        self.published_version = version
+        return True
+
+    async def _wait_quiet(self):
+        # Wait until no trigger arrived for `debounce` seconds, but never
+        # longer than `max_delay` after the first one.
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_delay
+        while True:
+            self._wakeup.clear()
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), min(self.debounce, remaining))
+            except asyncio.TimeoutError:
+                return
+
+    async def _loop(self):
+        while not self._closed:
+            await self._wakeup.wait()
+            await self._wait_quiet()
+
+            version = self.version
+            self.running_version = version
+            self._current = self._spawn(self._run(version), "extraction")
+            # asyncio.wait does not propagate the child's cancellation, so a
+            # superseded run cancelled in trigger() does not stop the loop.
+            await asyncio.wait({self._current})
+
+            if self._current.cancelled():
+                self.superseded_runs += 1
+                log.info("extraction superseded", version=version, latest=self.version)
+            elif self._current.exception() is not None:
+                log.error("extraction failed", version=version, error=repr(self._current.exception()))
+
+            self._current = None
+            self.running_version = 0
+
+    async def close(self):
+        """Cancel the in-flight run and stop scheduling further ones."""
+        self._closed = True
+        tasks = [t for t in (self._current, self._worker) if t is not None and not t.done()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._current = None
+        self._worker = None
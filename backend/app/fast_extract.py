@@ -0,0 +1,208 @@
+import re
+from datetime import datetime
+
+from .result_cache import AUDIO_PLACEHOLDER
+
+
+# ------------------------------
+# ⚡ Local fast-path field extractor
+# ------------------------------
+# Compiled rules for the fields that can be parsed deterministically:
+# phone numbers, email addresses, DD-MM-YYYY dates and Indian amount phrasing
+# ("30 lakh", "1.2 crore", "75k"). It runs on each new transcript segment
+# before the LLM and reports whether the segment still needs the model.
+# Values only come from the user's own turns; a match in an assistant turn
+# is handed to the model instead.
+
+_EMAIL_RE = re.compile(r"\b[\w.+-]+@[\w-]+(?:\.[\w-]+)+\b")
+# "ardra at gmail dot com" → "ardra@gmail.com"
+_SPOKEN_EMAIL_RE = re.compile(
+    r"\b([\w.+-]+)\s+(?:at the rate(?: of)?|at)\s+([\w-]+)\s+dot\s+([a-z]{2,})(?:\s+dot\s+([a-z]{2,}))?\b",
+    re.IGNORECASE,
+)
+_PHONE_RE = re.compile(r"(?<![\d-])(?:\+?91[\s-]?)?([6-9](?:[\s-]?\d){9})(?![\d-])")
+_DATE_RE = re.compile(r"\b(\d{1,2})[-/.](\d{1,2})[-/.](\d{4})\b")
+_AMOUNT_RE = re.compile(
+    r"(?:₹|\brs\.?|\binr)?\s*(?<![\d.,])(\d{1,3}(?:,\d{2,3})+|\d+(?:\.\d+)?)\s*"
+    r"(lakhs?|lacs?|crores?|cr|k|thousand)?\b",
+    re.IGNORECASE,
+)
+_TENURE_RE = re.compile(r"\b(\d{1,2})\s*(?:years?|yrs?)\b(?!\s+old)", re.IGNORECASE)
+_NAME_RE = re.compile(r"\bmy name is\s+([A-Z][a-z]+)\b")
+
+_MULTIPLIERS = {
+    "lakh": 100_000, "lakhs": 100_000, "lac": 100_000, "lacs": 100_000,
+    "crore": 10_000_000, "crores": 10_000_000, "cr": 10_000_000,
+    "k": 1_000, "thousand": 1_000,
+}
+
+# Context words deciding which amount field a number belongs to
+_SALARY_CUE_RE = re.compile(r"\b(salary|income|earn\w*|take[- ]home|per month|monthly)\b", re.IGNORECASE)
+_LOAN_CUE_RE = re.compile(r"\b(loan|borrow\w*)\b", re.IGNORECASE)
+_TENURE_CUE_RE = re.compile(r"\b(tenure|term|repay\w*|loan)\b", re.IGNORECASE)
+_DOB_CUE_RE = re.compile(r"\b(birth\w*|born|dob|d\.o\.b)\b", re.IGNORECASE)
+# Amounts that are not a field value (repayment figures, eligibility limits)
+_OTHER_AMOUNT_CUE_RE = re.compile(r"\b(emis?|interest|payable|total|eligib\w*)\b", re.IGNORECASE)
+_CLAUSE_END_RE = re.compile(r"[.?!;]\s")
+# Yearly figures: the model converts those, the rules do not
+_ANNUAL_CUE_RE = re.compile(r"\b(per (?:year|annum)|a year|yearly|annual\w*|p\.a\.?|lpa)(?!\w)", re.IGNORECASE)
+
+# Mentions that mean the model should look at the segment after all
+_FIELD_CUES = {
+    "first_name": re.compile(r"\bname\b", re.IGNORECASE),
+    "date_of_birth": _DOB_CUE_RE,
+    "monthly_salary": _SALARY_CUE_RE,
+    "phone_number": re.compile(r"\b(phone|mobile|contact number)\b", re.IGNORECASE),
+    "email_address": re.compile(r"\be-?mail address\b", re.IGNORECASE),
+    "loan_amount": re.compile(r"\b(loan amount|borrow\w*|loan of)\b", re.IGNORECASE),
+    "loan_tenure_years": re.compile(r"\b(tenure|years?)\b", re.IGNORECASE),
+    "email_consent": re.compile(r"\b(report|send (?:it|this|the)|by e-?mail)\b", re.IGNORECASE),
+}
+_USER_CONFIRMATION_RE = re.compile(
+    r"\b(yes|yeah|yep|correct|right|confirm\w*|no|nope|wrong|actually|change)\b", re.IGNORECASE
+)
+_ASSISTANT_CONFIRMATION_RE = re.compile(
+    r"\b(confirmed|noted|got it|thanks? (?:you )?for confirming|updated)\b", re.IGNORECASE
+)
+_WINDOW = 60  # chars of context looked at before an amount
+_AFTER_WINDOW = 25  # chars after an amount checked for "per year" and the like
+
+
+def _parse_amount(number: str, unit: str):
+    value = float(number.replace(",", ""))
+    if unit:
+        value *= _MULTIPLIERS[unit.lower()]
+    return int(round(value))
+
+
+def _extract_dob(text: str):
+    """
+    Returns (dob, unsure). Only a date next to a birth cue is a date of
+    birth; any other date is left to the model.
+    """
+    unsure = False
+    for match in _DATE_RE.finditer(text):
+        day, month, year = match.groups()
+        try:
+            dob = datetime(int(year), int(month), int(day))
+        except ValueError:
+            continue
+        if dob.year <= 1900 or dob > datetime.now():
+            continue
+        context = text[max(0, match.start() - _WINDOW):match.end() + _AFTER_WINDOW]
+        if _DOB_CUE_RE.search(context):
+            return dob.strftime("%d-%m-%Y"), False
+        unsure = True
+    return None, unsure
+
+
+def _last_cue(cue_re, context: str) -> int:
+    found = list(cue_re.finditer(context))
+    return found[-1].start() if found else -1
+
+
+def _extract_amounts(text: str):
+    """
+    Returns (amounts, unsure): the amounts that belong to a field, and
+    whether an amount needs the model (a yearly salary, for example).
+    """
+    amounts = {}
+    unsure = False
+    for match in _AMOUNT_RE.finditer(text):
+        number, unit = match.group(1), match.group(2)
+        digits = number.replace(",", "").replace(".", "")
+        # Plain numbers need at least 4 digits to be an INR amount
+        if not unit and len(digits) < 4:
+            continue
+        context = text[max(0, match.start() - _WINDOW):match.start()]
+        salary_pos = _last_cue(_SALARY_CUE_RE, context)
+        loan_pos = _last_cue(_LOAN_CUE_RE, context)
+        if max(salary_pos, loan_pos) < 0:
+            continue
+        # An EMI, interest or eligibility figure is never a field value, even
+        # in "the total interest on the loan is ..."
+        clause = _CLAUSE_END_RE.split(context)[-1]
+        if _OTHER_AMOUNT_CUE_RE.search(clause):
+            continue
+        # The closest cue before the number wins
+        field = "monthly_salary" if salary_pos > loan_pos else "loan_amount"
+        after = text[match.end():match.end() + _AFTER_WINDOW]
+        if field == "monthly_salary" and (_ANNUAL_CUE_RE.search(context) or _ANNUAL_CUE_RE.search(after)):
+            unsure = True
+            continue
+        amounts[field] = _parse_amount(number, unit)
+    return amounts, unsure
+
+
+def _extract_tenure(text: str):
+    for match in _TENURE_RE.finditer(text):
+        context = text[max(0, match.start() - _WINDOW):match.start()]
+        years = int(match.group(1))
+        if _TENURE_CUE_RE.search(context) and 1 <= years <= 40:
+            return years
+    return None
+
+
+def fast_extract(turns: list):
+    """
+    Run the local rules over new transcript turns.
+
+    `turns` is a list of {"role", "text"} dicts. Returns (values, needs_llm):
+    `values` holds every field resolved locally and `needs_llm` is True when
+    the segment mentions fields or confirmations the rules cannot settle.
+    """
+    values = {}
+    needs_llm = False
+
+    for turn in turns:
+        text = turn["text"]
+        if not text or text == AUDIO_PLACEHOLDER:
+            continue
+        normalised = _SPOKEN_EMAIL_RE.sub(
+            lambda m: f"{m.group(1)}@{m.group(2)}.{m.group(3)}" + (f".{m.group(4)}" if m.group(4) else ""),
+            text,
+        )
+        found = {}
+
+        # Strip emails and dates first so their digits are not read as phones/amounts
+        email = _EMAIL_RE.search(normalised)
+        if email:
+            found["email_address"] = email.group(0).lower()
+        rest = _EMAIL_RE.sub(" ", normalised)
+
+        dob, unsure = _extract_dob(rest)
+        if dob:
+            found["date_of_birth"] = dob
+        rest = _DATE_RE.sub(" ", rest)
+
+        phone = _PHONE_RE.search(rest)
+        if phone:
+            found["phone_number"] = re.sub(r"\D", "", phone.group(1))
+            rest = _PHONE_RE.sub(" ", rest)
+
+        amounts, unsure_amount = _extract_amounts(rest)
+        found.update(amounts)
+        tenure = _extract_tenure(rest)
+        if tenure:
+            found["loan_tenure_years"] = tenure
+
+        name = _NAME_RE.search(rest)
+        if name:
+            found["first_name"] = name.group(1)
+
+        if turn["role"] == "user":
+            values.update(found)
+        elif found:
+            # The assistant reads details back (possibly wrong) and introduces
+            # itself ("my name is Asha"); only the model can tell what they are
+            unsure = True
+        needs_llm = needs_llm or unsure or unsure_amount
+
+        for field, cue in _FIELD_CUES.items():
+            if field not in values and cue.search(rest):
+                needs_llm = True
+        confirmation_re = _USER_CONFIRMATION_RE if turn["role"] == "user" else _ASSISTANT_CONFIRMATION_RE
+        if confirmation_re.search(rest):
+            needs_llm = True
+
+    return values, needs_llm
@@ -0,0 +1,82 @@
+import os
+import aiohttp
+
+from .logs import get_logger
+
+log = get_logger("http")
+
+
+# ------------------------------
+# 🌐 Shared HTTP client for the chat-completions side-calls
+# ------------------------------
+# One pooled aiohttp session for the whole process, opened and closed by the
+# FastAPI lifespan in main.py. Keeping it alive lets every LLM helper reuse
+# warm TCP/TLS connections to api.openai.com instead of handshaking per call.
+
+LLM_HTTP_TOTAL_TIMEOUT = float(os.getenv("LLM_HTTP_TOTAL_TIMEOUT", "20"))
+LLM_HTTP_CONNECT_TIMEOUT = float(os.getenv("LLM_HTTP_CONNECT_TIMEOUT", "5"))
+LLM_HTTP_READ_TIMEOUT = float(os.getenv("LLM_HTTP_READ_TIMEOUT", "15"))
+LLM_HTTP_POOL_LIMIT = int(os.getenv("LLM_HTTP_POOL_LIMIT", "200"))
+LLM_HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("LLM_HTTP_POOL_LIMIT_PER_HOST", "100"))
+LLM_HTTP_KEEPALIVE_SECONDS = float(os.getenv("LLM_HTTP_KEEPALIVE_SECONDS", "60"))
+LLM_HTTP_DNS_TTL_SECONDS = int(os.getenv("LLM_HTTP_DNS_TTL_SECONDS", "300"))
+
+_http_session = None
+
+
+def request_timeout(total: float = None) -> aiohttp.ClientTimeout:
+    """
+    The LLM_HTTP_* timeouts, optionally with a different total. A per-request
+    timeout replaces the session's instead of merging with it, so helpers
+    that need their own deadline build it here.
+    """
+    return aiohttp.ClientTimeout(
+        total=LLM_HTTP_TOTAL_TIMEOUT if total is None else total,
+        sock_connect=LLM_HTTP_CONNECT_TIMEOUT,
+        sock_read=LLM_HTTP_READ_TIMEOUT,
+    )
+
+
+def _build_session():
+    connector = aiohttp.TCPConnector(
+        limit=LLM_HTTP_POOL_LIMIT,
+        limit_per_host=LLM_HTTP_POOL_LIMIT_PER_HOST,
+        keepalive_timeout=LLM_HTTP_KEEPALIVE_SECONDS,
+        ttl_dns_cache=LLM_HTTP_DNS_TTL_SECONDS,
+        use_dns_cache=True,
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=request_timeout())
+
+
+async def start_http_session():
+    """Create the shared session (called from the app lifespan)."""
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        _http_session = _build_session()
+        log.info(
+            "HTTP pool ready",
+            limit=LLM_HTTP_POOL_LIMIT,
+            per_host=LLM_HTTP_POOL_LIMIT_PER_HOST,
+            keepalive_s=LLM_HTTP_KEEPALIVE_SECONDS,
+        )
+    return _http_session
+
+
+async def close_http_session():
+    """Close the shared session and release pooled sockets."""
+    global _http_session
+    if _http_session is not None and not _http_session.closed:
+        await _http_session.close()
+        log.info("HTTP pool closed")
+    _http_session = None
+
+
+def get_http_session():
+    """
+    Return the shared session. Falls back to creating it lazily so helpers
+    still work when the module is used outside the FastAPI lifespan.
+    """
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        _http_session = _build_session()
+    return _http_session
@@ -0,0 +1,123 @@
+import numpy as np
+
+
+# ------------------------------
+# 🧮 Vectorised loan math
+# ------------------------------
+# Every function broadcasts over arrays of principals, annual rates (percent)
+# and tenures (years), so one call prices a whole scenario grid.
+
+DEFAULT_ANNUAL_RATE = 9.0   # % per year
+SALARY_MULTIPLE = 5         # max loan = 5 × annual salary
+MAX_AGE_AT_MATURITY = 65    # age + tenure must not exceed this
+
+# Inputs callers accept; anything beyond is a typo, not a loan
+MAX_AMOUNT = 1e12           # ₹, loan amount or monthly salary
+MAX_ANNUAL_RATE = 100.0     # % per year
+MAX_TENURE_YEARS = 50
+
+
+def _monthly_terms(principal, annual_rate, tenure_years):
+    principal = np.asarray(principal, dtype=np.float64)
+    monthly_rate = np.asarray(annual_rate, dtype=np.float64) / 12 / 100
+    months = tenure_months(tenure_years)
+    return np.broadcast_arrays(principal, monthly_rate, months)
+
+
+def tenure_months(tenure_years):
+    """Tenure rounded to whole months, as priced; below 1 the EMI is undefined."""
+    return np.rint(np.asarray(tenure_years, dtype=np.float64) * 12)
+
+
+def _emi(p, r, n):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = np.power(1 + r, n)
+        result = np.where(r > 0, p * r * growth / (growth - 1), p / n)
+    return np.where(n > 0, result, np.nan)
+
+
+def emi(principal, annual_rate=DEFAULT_ANNUAL_RATE, tenure_years=20):
+    """EMI = P·R·(1+R)^N / ((1+R)^N − 1), with the zero-rate case as P/N."""
+    return _emi(*_monthly_terms(principal, annual_rate, tenure_years))
+
+
+def loan_summary(principal, annual_rate=DEFAULT_ANNUAL_RATE, tenure_years=20):
+    """EMI, total payable and total interest, broadcast over the inputs."""
+    p, r, n = _monthly_terms(principal, annual_rate, tenure_years)
+    monthly = _emi(p, r, n)
+    total_payable = monthly * n
+    return {
+        "emi": monthly,
+        "total_payable": total_payable,
+        "total_interest": total_payable - p,
+    }
+
+
+def amortisation_schedule(principal, annual_rate=DEFAULT_ANNUAL_RATE, tenure_years=20):
+    """
+    Month-by-month schedules for every broadcast input combination.
+
+    Returns arrays of shape `broadcast_shape + (max_months,)` for `interest`,
+    `principal` (repaid that month) and `balance` (after the payment).
+    Months past a loan's own tenure are 0.
+    """
+    p, r, n = _monthly_terms(principal, annual_rate, tenure_years)
+    monthly = _emi(p, r, n)
+    max_months = int(np.nanmax(n)) if n.size else 0
+    k = np.arange(1, max_months + 1, dtype=np.float64)
+
+    p_, r_, n_, e_ = (a[..., np.newaxis] for a in (p, r, n, monthly))
+    growth = np.power(1 + r_, k)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Closed form: B_k = P(1+R)^k − EMI·((1+R)^k − 1)/R  (B_k = P − k·EMI when R = 0)
+        balance = np.where(r_ > 0, p_ * growth - e_ * (growth - 1) / r_, p_ - k * e_)
+    balance = np.clip(balance, 0, None)
+    previous = np.concatenate([np.broadcast_to(p_, balance.shape[:-1] + (1,)), balance[..., :-1]], axis=-1)
+    interest = previous * r_
+    repaid = previous - balance
+
+    active = k <= n_
+    return {
+        "month": k.astype(np.int64),
+        "interest": np.where(active, interest, 0.0),
+        "principal": np.where(active, repaid, 0.0),
+        "balance": np.where(active, balance, 0.0),
+    }
+
+
+def max_eligible_amount(monthly_salary):
+    return np.asarray(monthly_salary, dtype=np.float64) * 12 * SALARY_MULTIPLE
+
+
+def scenario_grid(amounts, rates, tenures, monthly_salary=None, age_years=None):
+    """
+    Price every rate × tenure × amount combination in one pass.
+
+    Returned arrays have shape (len(rates), len(tenures), len(amounts)).
+    `eligible` applies the salary cap and, when the age is known, the
+    age + tenure ≤ 65 rule.
+    """
+    r = np.asarray(rates, dtype=np.float64)[:, None, None]
+    t = np.asarray(tenures, dtype=np.float64)[None, :, None]
+    a = np.asarray(amounts, dtype=np.float64)[None, None, :]
+
+    grid = loan_summary(a, r, t)
+    eligible = np.ones(grid["emi"].shape, dtype=bool)
+    if monthly_salary is not None:
+        eligible &= a <= max_eligible_amount(monthly_salary)
+    if age_years is not None:
+        eligible &= (age_years + t) <= MAX_AGE_AT_MATURITY
+    grid["eligible"] = eligible
+    return grid
+
+
+def age_from_dob(date_of_birth: str, today=None):
+    """Whole years since a DD-MM-YYYY date of birth, or None if unparseable."""
+    from datetime import date, datetime
+
+    try:
+        dob = datetime.strptime(str(date_of_birth), "%d-%m-%Y").date()
+    except ValueError:
+        return None
+    today = today or date.today()
+    return today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
@@ -0,0 +1,96 @@
+import os
+import json
+import time
+import logging
+
+
+# ------------------------------
+# 🪵 Structured, leveled logging
+# ------------------------------
+# LOG_LEVEL picks the level (INFO by default; per-event relay logs are DEBUG)
+# and LOG_FORMAT=json switches from `key=value` lines to one JSON object per
+# line. Fields are only formatted when the level is enabled, and every()
+# rate-limits noisy messages, reporting how many were suppressed.
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+
+
+class _Formatter(logging.Formatter):
+    def format(self, record):
+        fields = getattr(record, "fields", {})
+        if LOG_FORMAT == "json":
+            payload = {
+                "ts": round(record.created, 3),
+                "level": record.levelname.lower(),
+                "logger": record.name,
+                "msg": record.getMessage(),
+                **fields,
+            }
+            if record.exc_info:
+                payload["exc"] = self.formatException(record.exc_info)
+            return json.dumps(payload, default=str, ensure_ascii=False)
+
+        line = f"{self.formatTime(record)} {record.levelname:<7} {record.name}: {record.getMessage()}"
+        if fields:
+            line += " " + " ".join(f"{k}={v!r}" if isinstance(v, str) and " " in v else f"{k}={v}"
+                                   for k, v in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+_root = logging.getLogger("loan")
+if not _root.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(_Formatter())
+    _root.addHandler(_handler)
+    _root.setLevel(LOG_LEVEL)
+    _root.propagate = False
+
+
+class StructuredLogger:
+    """Thin wrapper so call sites read `log.info("email sent", to=addr)`."""
+
+    def __init__(self, name: str):
+        self._logger = logging.getLogger(f"loan.{name}")
+        self._last = {}
+        self._suppressed = {}
+
+    def _log(self, level, msg, fields, exc_info=False):
+        if self._logger.isEnabledFor(level):
+            self._logger.log(level, msg, extra={"fields": fields}, exc_info=exc_info)
+
+    def debug(self, msg, **fields):
+        self._log(logging.DEBUG, msg, fields)
+
+    def info(self, msg, **fields):
+        self._log(logging.INFO, msg, fields)
+
+    def warning(self, msg, **fields):
+        self._log(logging.WARNING, msg, fields)
+
+    def error(self, msg, **fields):
+        self._log(logging.ERROR, msg, fields)
+
+    def exception(self, msg, **fields):
+        self._log(logging.ERROR, msg, fields, exc_info=True)
+
+    def every(self, interval: float, level: int, msg, key=None, **fields):
+        """Log at most once per `interval` seconds for `key` (defaults to msg)."""
+        if not self._logger.isEnabledFor(level):
+            return
+        key = key or msg
+        now = time.monotonic()
+        if now - self._last.get(key, 0.0) < interval:
+            self._suppressed[key] = self._suppressed.get(key, 0) + 1
+            return
+        self._last[key] = now
+        suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            fields["suppressed"] = suppressed
+        self._log(level, msg, fields)
+
+
+def get_logger(name: str) -> StructuredLogger:
+    return StructuredLogger(name)
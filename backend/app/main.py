@@ -1,14 +1,15 @@
 import os
 import json
+import time
+import logging
+from typing import Annotated
 import base64
-import asyncio
-import aiohttp
+import numpy as np
 import websockets
-from fastapi import FastAPI, WebSocket
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, WebSocket, HTTPException, Response, Header, Query, Request
+from pydantic import AfterValidator, BaseModel, Field
 from fastapi.middleware.cors import CORSMiddleware
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from dotenv import load_dotenv
 
 
@@ -16,8 +17,67 @@ from dotenv import load_dotenv
 
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_REALTIME_URL = os.getenv(
+    "OPENAI_REALTIME_URL", "wss://api.openai.com/v1/realtime?model=gpt-4o-realtime-preview"
+)
+# Transcribes the user's audio so extraction sees what they said; "" disables it
+INPUT_TRANSCRIPTION_MODEL = os.getenv("INPUT_TRANSCRIPTION_MODEL", "whisper-1")
+
+# Local modules read their settings from the environment at import time,
+# so they are imported after load_dotenv().
+from .http_client import start_http_session, close_http_session
+from .logs import get_logger
+from . import metrics
+from . import tracing
+from .extraction_scheduler import ExtractionScheduler
+from .email_outbox import email_outbox
+from .outbound import OutboundQueue
+from .supervisor import SessionSupervisor
+from .realtime_pool import realtime_pool
+from .recorder import open_recorder
+from .session_store import session_store, new_session_id, valid_session_id, SessionSaver
+from .extraction import (
+    extract_user_fields, extraction_cache_key, handle_field_confirmation, merge_fields, known_fields_summary
+)
+from .result_cache import calculation_cache, content_key, AUDIO_PLACEHOLDER
+from .rate_limiter import PRIORITY_CONFIRMATION, PRIORITY_EXTRACTION
+from .conversation import ConversationBuffer, EXTRACTION_CONTEXT_TOKENS
+from .fast_extract import fast_extract
+from . import realtime_tools
+from . import loan_math
+from . import bulk_scoring
+from .audio_pipeline import (
+    UpstreamAudioBatcher,
+    DownstreamAudioFramer,
+    build_normaliser,
+    build_vad,
+    client_audio_format,
+    negotiate_audio_framing,
+    REALTIME_SAMPLE_RATE,
+    AUDIO_FRAMING_BINARY_V1,
+)
+
+log = get_logger("relay")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Shared keep-alive pool for every chat-completions side-call
+    await start_http_session()
+    # SMTP workers with persistent connections; resumes undelivered reports
+    await email_outbox.start()
+    # Configured upstream sessions ready before the first client connects
+    await realtime_pool.start(open_realtime_session)
+    try:
+        yield
+    finally:
+        await realtime_pool.stop()
+        await email_outbox.stop()
+        await session_store.close()
+        await close_http_session()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -27,268 +87,54 @@ app.add_middleware(
 )
 
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-LLM_MODEL = "gpt-4o-mini"  
-
-
-
-conversation_log = []  
-
-GMAIL_ADDRESS = os.getenv("GMAIL_ADDRESS")
-GMAIL_APP_PASSWORD = os.getenv("GMAIL_APP_PASSWORD") 
-
-
 @app.get("/")
 async def root():
     return {"message": "Backend running successfully on Render"}
 
-def send_email_report(to_email: str, subject: str, body: str):
-    """Send an email with EMI analysis to the user."""
-    msg = MIMEText(body, "plain")
-    msg["Subject"] = subject
-    msg["From"] = GMAIL_ADDRESS
-    msg["To"] = to_email
 
-    try:
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-            server.login(GMAIL_ADDRESS, GMAIL_APP_PASSWORD)
-            server.sendmail(GMAIL_ADDRESS, [to_email], msg.as_string())
-        print(f"✅ Email sent to {to_email}")
-        return True
-    except Exception as e:
-        print("⚠️ Email send failed:", e)
-        return False
-    
-
-
-async def handle_field_confirmation(conversation_segment: str, websocket, session_state: dict):
-    """
-    Detects new or corrected field values from a partial conversation segment
-    and manages pending/confirmed updates for UI.
-    """
-    print("🧩 HANDLE_FIELD_CONFIRMATION: Checking for field updates...")
-    
-    # Initialize state
-    if "pending_fields" not in session_state:
-        session_state["pending_fields"] = {}
-    if "confirmed_fields" not in session_state:
-        session_state["confirmed_fields"] = {}
-
-    # Step 1️⃣ — Ask model to detect latest mention + confirmation intent
-    prompt = f"""
-        From this conversation segment, identify if the user has either:
-        - Provided a new field value, or
-        - Corrected or confirmed an earlier one.
-
-        Extract only the fields and confirmation status.
-        Return JSON like:
-        {{
-          "updates": {{
-             "email_address": {{"value": "ardra777@gmail.com", "confirmed": true}},
-             "first_name": {{"value": "Ardra", "confirmed": false}}
-          }}
-        }}
-        If no updates, return {{ "updates": {{}} }}.
-
-        Conversation Segment:
-        \"\"\"{conversation_segment}\"\"\"
-    """
-
-    url = "https://api.openai.com/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-    }
-    body = {
-        "model": LLM_MODEL,
-        "messages": [
-            {"role": "system", "content": "You detect new or corrected fields and mark confirmed true/false. Return valid JSON only."},
-            {"role": "user", "content": prompt},
-        ],
-        "temperature": 0.0,
-        "max_tokens": 200,
-    }
-
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=headers, json=body) as resp:
-                data = await resp.json()
-                raw = data["choices"][0]["message"]["content"].strip()
-                print("📥 Raw response:", raw)
-
-                # Parse JSON safely
-                try:
-                    updates = json.loads(raw).get("updates", {})
-                except:
-                    start, end = raw.find("{"), raw.rfind("}")
-                    updates = json.loads(raw[start:end+1]).get("updates", {}) if start != -1 and end != -1 else {}
-
-                # Step 2️⃣ — Process updates
-                for field, info in updates.items():
-                    value = info.get("value")
-                    confirmed = info.get("confirmed", False)
-                    if not value:
-                        continue
-
-                    if confirmed:
-                        session_state["confirmed_fields"][field] = value
-                        print(f"✅ CONFIRMED: {field} = {value}")
-                        await websocket.send_json({
-                            "type": "field_confirmed",
-                            "field": field,
-                            "value": value
-                        })
-                    else:
-                        session_state["pending_fields"][field] = value
-                        print(f"🕓 PENDING: {field} = {value}")
-                        await websocket.send_json({
-                            "type": "field_pending",
-                            "field": field,
-                            "value": value
-                        })
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus scrape endpoint."""
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
 
-                return session_state
-    except Exception as e:
-        print(f"❌ HANDLE_FIELD_CONFIRMATION ERROR: {e}")
-        return session_state
 
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
 
 
+def require_admin(x_admin_token: str | None):
+    """Admin endpoints stay closed unless ADMIN_TOKEN is set and matches."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set ADMIN_TOKEN")
+    if x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=401, detail="Invalid admin token")
 
-async def extract_user_fields(conversation: str, timeout: int = 10):
-    print("🎯 EXTRACT_USER_FIELDS: Starting extraction process")
-    print(f"📥 Input conversation length: {len(conversation)} characters")
-    
-    # Add consent extraction logic to the instruction
-    prompt = f"""
-        You are a JSON extractor. From the short conversation below, extract the following fields:
-        - first_name
-        - date_of_birth (DD-MM-YYYY)
-        - monthly_salary (integer, INR)
-        - phone_number
-        - email_address
-        - loan_amount (integer, INR)
-        - loan_tenure_years (integer, years)
-        - email_consent (boolean: true if the user explicitly agrees to receive loan report by email, false otherwise)
-
-        Return ONLY a single valid JSON object with those keys.
-        If a field is not present, set its value to null.
-        For email_consent:
-          - true → if user says yes, agrees, or confirms they want the report sent to email.
-          - false → if user says no, declines, or does not mention it.
-
-        Example:
-        {{
-          "first_name": "Ardra",
-          "date_of_birth": "12-05-1996",
-          "monthly_salary": 75000,
-          "phone_number": "9876543210",
-          "email_address": "ardra@example.com",
-          "loan_amount": 3000000,
-          "loan_tenure_years": 20,
-          "email_consent": true
-        }}
-
-        Conversation:
-        \"\"\"{conversation}\"\"\"
-    """
-    
-    url = "https://api.openai.com/v1/chat/completions"
 
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-    }
+@app.get("/admin/traces")
+async def admin_traces(
+    format: str = "json",
+    trace_id: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=tracing.TRACE_BUFFER_SIZE)] = 100,
+    x_admin_token: Annotated[str | None, Header()] = None,
+):
+    """Recent per-turn latency timelines as JSON or Chrome trace events (format=chrome)."""
+    require_admin(x_admin_token)
+    if format not in ("json", "chrome"):
+        raise HTTPException(status_code=400, detail="format must be 'json' or 'chrome'")
 
-    body = {
-        "model": LLM_MODEL,
-        "messages": [
-            {"role": "system", "content": "You extract fields as requested. Return ONLY valid JSON, no other text."},
-            {"role": "user", "content": prompt}
-        ],
-        "temperature": 0.0,
-        "max_tokens": 300,
-    }
+    traces = tracing.recent_traces(trace_id, limit)
+    if format == "chrome":
+        return tracing.to_chrome_trace(traces)
+    return {"traces": tracing.to_json(traces)}
 
-    print("🔄 Making OpenAI API call for extraction...")
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.post(url, headers=headers, json=body, timeout=timeout) as resp:
-                print(f"📡 OpenAI API response status: {resp.status}")
-                
-                if resp.status != 200:
-                    text = await resp.text()
-                    print(f"❌ OpenAI API error: {resp.status} - {text}")
-                    raise RuntimeError(f"OpenAI error {resp.status}: {text}")
-
-                data = await resp.json()
-                print("✅ OpenAI API call successful")
-                
-                content = data["choices"][0]["message"]["content"].strip()
-                print(f"📄 Raw model response: '{content}'")
-
-                # Parse the LLM output as JSON
-                try:
-                    parsed = json.loads(content)
-                    print(f"📊 Successfully parsed JSON: {parsed}")
-                except json.JSONDecodeError as e:
-                    print(f"❌ JSON decode error: {e}")
-                    print(f"🔍 Trying to extract JSON from response...")
-                    
-                    start = content.find('{')
-                    end = content.rfind('}')
-                    if start != -1 and end != -1:
-                        json_text = content[start:end + 1]
-                        try:
-                            parsed = json.loads(json_text)
-                            print(f"✅ Successfully parsed extracted JSON: {parsed}")
-                        except:
-                            print("❌ Failed to parse extracted JSON")
-                            parsed = {}
-                    else:
-                        print("❌ No JSON found in response")
-                        parsed = {}
-
-                # Construct final structured output
-                result = {
-                    "first_name": parsed.get("first_name"),
-                    "date_of_birth": parsed.get("date_of_birth"),
-                    "monthly_salary": parsed.get("monthly_salary"),
-                    "phone_number": parsed.get("phone_number"),
-                    "email_address": parsed.get("email_address"),
-                    "loan_amount": parsed.get("loan_amount"),
-                    "loan_tenure_years": parsed.get("loan_tenure_years"),
-                    "email_consent": parsed.get("email_consent", False)  # Default false
-                }
-
-                # Count extracted fields
-                extracted_count = sum(1 for v in result.values() if v not in [None, False])
-                print(f"✅ EXTRACT_USER_FIELDS COMPLETE: {extracted_count}/{len(result)} fields extracted")
-                print(f"📋 Final result: {result}")
-                return result
 
-        except Exception as e:
-            print(f"❌ EXTRACT_USER_FIELDS ERROR: {e}")
-            import traceback
-            traceback.print_exc()
-            return {
-                "first_name": None,
-                "date_of_birth": None,
-                "monthly_salary": None,
-                "phone_number": None,
-                "email_address": None,
-                "loan_amount": None,
-                "loan_tenure_years": None,
-                "email_consent": False
-            }
+def format_inr(amount) -> str:
+    return "N/A" if amount is None else f"₹{amount:,}"
 
-        
 
 async def calculate_loan_details(user_data: dict):
     """
     Calculate EMI, eligibility based on extracted user data
     """
-    print("🧮 CALCULATE_LOAN_DETAILS: Starting calculations")
     
     monthly_salary = user_data.get("monthly_salary")
     loan_amount = user_data.get("loan_amount")
@@ -302,11 +148,17 @@ async def calculate_loan_details(user_data: dict):
             "max_eligible_amount": None,
             "reason": "Waiting for salary, loan amount, and tenure data"
         }
+
+    # Every turn recalculates; most turns do not change these inputs
+    cache_key = content_key(monthly_salary, loan_amount, loan_tenure_years, loan_math.DEFAULT_ANNUAL_RATE)
+    cached = calculation_cache.get(cache_key)
+    if cached is not None:
+        return dict(cached)
     
     try:
         # Your business logic calculations
         annual_salary = monthly_salary * 12
-        max_eligible = annual_salary * 5  # 5 times annual salary
+        max_eligible = annual_salary * loan_math.SALARY_MULTIPLE  # 5 times annual salary
         
         # Check eligibility
         eligible = loan_amount <= max_eligible
@@ -314,23 +166,19 @@ async def calculate_loan_details(user_data: dict):
         
         # EMI calculation (if eligible)
         if eligible:
-            interest_rate = 9.0  # 9% annual
-            monthly_rate = interest_rate / 12 / 100
-            months = loan_tenure_years * 12
-            
-            emi = (loan_amount * monthly_rate * (1 + monthly_rate) ** months) / \
-                  ((1 + monthly_rate) ** months - 1)
+            interest_rate = loan_math.DEFAULT_ANNUAL_RATE
+            summary = loan_math.loan_summary(loan_amount, interest_rate, loan_tenure_years)
             
             calculations = {
                 "eligible": True,
-                "emi_amount": round(emi),
+                "emi_amount": round(float(summary["emi"])),
                 "max_eligible_amount": max_eligible,
                 "loan_amount": loan_amount,
                 "loan_tenure_years": loan_tenure_years,
                 "monthly_salary": monthly_salary,
                 "interest_rate": interest_rate,
-                "total_payable": round(emi * months),
-                "total_interest": round((emi * months) - loan_amount),
+                "total_payable": round(float(summary["total_payable"])),
+                "total_interest": round(float(summary["total_interest"])),
                 "reason": reason
             }
         else:
@@ -341,17 +189,18 @@ async def calculate_loan_details(user_data: dict):
                 "loan_amount": loan_amount,
                 "loan_tenure_years": loan_tenure_years,
                 "monthly_salary": monthly_salary,
-                "interest_rate": 9.0,
+                "interest_rate": loan_math.DEFAULT_ANNUAL_RATE,
                 "total_payable": None,
                 "total_interest": None,
                 "reason": reason
             }
         
-        print(f"✅ CALCULATIONS COMPLETE: {calculations}")
+        log.debug("calculations complete", eligible=calculations["eligible"], emi=calculations["emi_amount"])
+        calculation_cache.put(cache_key, dict(calculations))
         return calculations
         
     except Exception as e:
-        print(f"❌ CALCULATION ERROR: {e}")
+        log.error("calculation error", error=str(e))
         return {
             "eligible": False,
             "emi_amount": None,
@@ -359,6 +208,117 @@ async def calculate_loan_details(user_data: dict):
             "reason": f"Calculation error: {str(e)}"
         }
 
+# ------------------------------
+# 📊 What-if scenario grid for advisors
+# ------------------------------
+MAX_SCENARIO_CELLS = int(os.getenv("MAX_SCENARIO_CELLS", "50000"))
+
+
+def _whole_months(tenure_years: float) -> float:
+    if loan_math.tenure_months(tenure_years) < 1:
+        raise ValueError("tenure must be at least one month")
+    return tenure_years
+
+
+def _date_of_birth(value: str | None) -> str | None:
+    if value is not None:
+        age = loan_math.age_from_dob(value)
+        if age is None:
+            raise ValueError("date_of_birth must be DD-MM-YYYY")
+        if age < 0:
+            raise ValueError("date_of_birth is in the future")
+    return value
+
+
+# Bounded so every priced cell is finite (see loan_math limits)
+Amount = Annotated[float, Field(ge=0, le=loan_math.MAX_AMOUNT)]
+Rate = Annotated[float, Field(ge=0, le=loan_math.MAX_ANNUAL_RATE)]
+Tenure = Annotated[float, Field(gt=0, le=40), AfterValidator(_whole_months)]
+
+
+class ScenarioRequest(BaseModel):
+    amounts: list[Amount] = Field(..., min_length=1, description="Loan principals in INR")
+    rates: list[Rate] = Field(default=[8.5, 9.0, 9.5], min_length=1, description="Annual rates in %")
+    tenures: list[Tenure] = Field(default=[10, 15, 20, 25, 30], min_length=1, description="Tenures in years")
+    monthly_salary: float | None = Field(default=None, gt=0, le=loan_math.MAX_AMOUNT)
+    # DD-MM-YYYY, enables the age + tenure rule
+    date_of_birth: Annotated[str | None, AfterValidator(_date_of_birth)] = None
+
+
+class ScheduleRequest(BaseModel):
+    amount: float = Field(..., gt=0, le=loan_math.MAX_AMOUNT)
+    rate: Rate = loan_math.DEFAULT_ANNUAL_RATE
+    tenure_years: Tenure
+
+
+@app.post("/loan/scenarios")
+async def loan_scenarios(req: ScenarioRequest):
+    """EMI / total payable / total interest / eligibility over a rate × tenure × amount grid."""
+    cells = len(req.rates) * len(req.tenures) * len(req.amounts)
+    if cells > MAX_SCENARIO_CELLS:
+        raise HTTPException(status_code=400, detail=f"Grid too large: {cells} cells (max {MAX_SCENARIO_CELLS})")
+
+    age = loan_math.age_from_dob(req.date_of_birth) if req.date_of_birth else None
+    grid = loan_math.scenario_grid(req.amounts, req.rates, req.tenures, req.monthly_salary, age)
+    return {
+        "axes": ["rate", "tenure_years", "amount"],
+        "rates": req.rates,
+        "tenures": req.tenures,
+        "amounts": req.amounts,
+        "max_eligible_amount": (
+            float(loan_math.max_eligible_amount(req.monthly_salary)) if req.monthly_salary is not None else None
+        ),
+        "age_years": age,
+        "emi": np.rint(grid["emi"]).tolist(),
+        "total_payable": np.rint(grid["total_payable"]).tolist(),
+        "total_interest": np.rint(grid["total_interest"]).tolist(),
+        "eligible": grid["eligible"].tolist(),
+    }
+
+
+@app.post("/loan/schedule")
+async def loan_schedule(req: ScheduleRequest):
+    """Month-by-month amortisation schedule for one loan."""
+    schedule = loan_math.amortisation_schedule(req.amount, req.rate, req.tenure_years)
+    summary = loan_math.loan_summary(req.amount, req.rate, req.tenure_years)
+    return {
+        "emi": round(float(summary["emi"]), 2),
+        "total_payable": round(float(summary["total_payable"]), 2),
+        "total_interest": round(float(summary["total_interest"]), 2),
+        "months": schedule["month"].tolist(),
+        "interest": np.round(schedule["interest"], 2).tolist(),
+        "principal": np.round(schedule["principal"], 2).tolist(),
+        "balance": np.round(schedule["balance"], 2).tolist(),
+    }
+
+
+BULK_MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "jsonl": "application/x-ndjson"}
+
+
+@app.post("/loan/score")
+async def loan_score(
+    request: Request,
+    format: str | None = None,
+    output: str | None = None,
+    x_admin_token: Annotated[str | None, Header()] = None,
+):
+    """
+    Score a CSV or JSONL lead file with the voice session's eligibility and
+    EMI rules, streaming one result row per input row. The input format
+    comes from `format` or the Content-Type; the output defaults to it.
+    """
+    require_admin(x_admin_token)
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "jsonl" if "json" in content_type else "csv"
+    output = output or format
+    if format not in BULK_MEDIA_TYPES or output not in BULK_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="format and output must be 'csv' or 'jsonl'")
+
+    log.info("bulk scoring started", input=format, output=output)
+    return bulk_scoring.ScoringResponse(request.stream(), format, output, media_type=BULK_MEDIA_TYPES[output])
+
+
 SYSTEM_PROMPT = """
 You are a friendly, voice-based home loan EMI calculator English assistant. 
 
@@ -378,17 +338,15 @@ Your role is to:
    Stricly don't proceed without confirming each field or without valid fields.
 
 
-3. Apply these validations:
+   As soon as the user confirms a value, call record_confirmed_field with it.
+
+3. Apply these validations by calling check_eligibility:
    - Loan amount should be <= 5 times the annual income (monthly salary * 12 * 5)
    - Age + tenure should be <= 65 years
 
 4. Once all inputs are valid:
-   - Calculate EMI using the formula:
-     EMI = [P × R × (1+R)^N] / [(1+R)^N − 1]
-       Where:
-       P = Loan amount
-       R = Monthly interest rate (9% annual = 9/12/100 = 0.0075 monthly)
-       N = Loan tenure in months (years × 12)
+   - Call calculate_emi (9% annual interest unless the user asks for another rate).
+   - Never calculate the EMI or any other figure yourself; only speak the numbers the tools return.
 
 5. Provide a clear and friendly explanation of the EMI result.
    Then, politely ask the user if they would like to receive this EMI analysis report by email
@@ -413,302 +371,671 @@ If the user only has general questions about EMI or loans, answer them conversat
 """
 
 
+def base_session_config() -> dict:
+    """Realtime session settings shared by every client."""
+    session = {
+        "model": "gpt-4o-realtime-preview",
+        "voice": "cedar",
+        "modalities": ["text", "audio"],
+        "input_audio_format": "pcm16",
+        "output_audio_format": "pcm16",
+        "instructions": SYSTEM_PROMPT.strip(),
+        # EMI, eligibility and confirmations are answered by the relay
+        "tools": realtime_tools.TOOLS,
+        "tool_choice": "auto",
+    }
+    if INPUT_TRANSCRIPTION_MODEL:
+        session["input_audio_transcription"] = {"model": INPUT_TRANSCRIPTION_MODEL}
+    return session
+
+
+async def open_realtime_session(warm: bool = False):
+    """
+    Connect to the Realtime API and send the shared session config. A warm
+    (pooled) connection also waits for session.updated, so a broken one
+    never reaches a client.
+    """
+    ws = await websockets.connect(
+        OPENAI_REALTIME_URL,
+        additional_headers={
+            "Authorization": f"Bearer {OPENAI_API_KEY}",
+            "OpenAI-Beta": "realtime=v1",
+        },
+    )
+    try:
+        await ws.send(json.dumps({"type": "session.update", "session": base_session_config()}))
+        while warm:
+            event = json.loads(await ws.recv())
+            if event.get("type") == "session.updated":
+                break
+            if event.get("type") == "error":
+                raise RuntimeError(f"session.update rejected: {event.get('error')}")
+    except BaseException:
+        await ws.close()
+        raise
+    return ws
+
+
+def resume_instructions(session_state: dict) -> str:
+    """Tell the model what a resumed session already collected."""
+    fields = session_state.get("fields", {})
+    if not fields:
+        return ""
+    confirmed = session_state.get("confirmed_fields", {})
+    lines = [
+        f"- {name}: {value} ({'confirmed' if name in confirmed else 'not yet confirmed'})"
+        for name, value in fields.items()
+    ]
+    return (
+        "\n\nThis conversation is resuming after a dropped connection. Do not introduce yourself again "
+        "or re-ask for confirmed details. Details collected so far:\n" + "\n".join(lines)
+    )
+
 
 @app.websocket("/realtime/ws/realtime")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
-    print("🟢 Frontend connected to /realtime/ws/realtime")
+    outbound = OutboundQueue(websocket)  # 📬 Single writer for everything sent to the client
+    supervisor = SessionSupervisor()     # 🧯 Owns every task of this connection
+    metrics.WS_SESSIONS_TOTAL.inc()
+    metrics.WS_SESSIONS_ACTIVE.inc()
+    log.info("frontend connected")
 
-    conversation_log = []  # 🧠 Maintain conversation turns
+    conversation_log = ConversationBuffer()  # 🧠 Maintain conversation turns
     session_state = {}     # 🧠 Store pending/confirmed fields across turns
-    print("🆕 New conversation log and session state initialized")
+    fast_cursor = {"turn": 0, "offset": 0}  # ⚡ How far the fast path has read
+    session_id = None
+    connection_id = new_session_id()  # 🔑 Owner of the stored session while this connection lasts
+    trace_id = None                   # Opaque id for traces and logs; session_id resumes the session
+    resumed_version = 0
+    extraction_scheduler = None
+    recorder = None
+
+    async def write_session():
+        if session_id is None:
+            return
+        try:
+            saved = await session_store.save(session_id, {
+                "conversation_log": conversation_log.to_list(),
+                "session_state": session_state,
+                "fast_cursor": fast_cursor,
+                "version": extraction_scheduler.version if extraction_scheduler is not None else resumed_version,
+                "trace_id": trace_id,
+            }, owner=connection_id)
+            if not saved:
+                log.info("session resumed elsewhere, save skipped", session=trace_id)
+        except Exception as e:
+            log.warning("session save failed", session=trace_id, error=str(e))
+
+    # 💾 Saves during the call are coalesced; the final one happens on close
+    session_saver = SessionSaver(write_session, spawn=supervisor.spawn)
+    save_session = session_saver.request
 
     try:
-        print("⏳ Waiting for config from frontend...")
+        log.debug("waiting for config")
         config_msg = await websocket.receive_text()
-        print(f"📨 Received config: {config_msg}")
-        
         cfg = json.loads(config_msg)
+        # The session id is the resume credential: it never goes to logs, traces or recordings
+        session_id = cfg.pop("session_id", None)
+        log.info("config received", config=cfg)
+
+        # 💾 Resume a stored session when the client sends back its id
+        record = await session_store.load(session_id, owner=connection_id) if valid_session_id(session_id) else None
+        if record is not None:
+            conversation_log.extend(record["conversation_log"])
+            session_state.update(record["session_state"])
+            fast_cursor.update(record["fast_cursor"])
+            resumed_version = record["version"]
+            trace_id = record.get("trace_id")
+        elif not valid_session_id(session_id):
+            session_id = new_session_id()
+        trace_id = trace_id or new_session_id()[:12]
+        if record is not None:
+            log.info("session resumed", session=trace_id, turns=len(conversation_log), version=resumed_version)
+        tracer = tracing.SessionTracer(trace_id)  # ⏱️ Per-turn latency timeline
+        # 📼 Opt-in binary log of everything this session sends and receives
+        recorder = open_recorder(trace_id)
+        if recorder is not None:
+            recorder.client_message({"text": json.dumps(cfg)})
+        supervisor.session_id = trace_id
+
+        audio_framer = DownstreamAudioFramer(negotiate_audio_framing(cfg))
+        try:
+            client_sample_rate, client_channels = client_audio_format(cfg)
+        except ValueError as e:
+            # Treated as the Realtime format; the audio itself is forwarded unchanged
+            log.warning("invalid client audio format", error=str(e))
+            client_sample_rate, client_channels = REALTIME_SAMPLE_RATE, 1
+        try:
+            # Converts whatever the client declared into 24 kHz mono PCM16
+            upstream_normaliser = build_normaliser(cfg)
+        except ValueError as e:
+            log.warning("forwarding client audio unchanged", error=str(e))
+            upstream_normaliser = None
+        if upstream_normaliser is not None:
+            log.info("normalising client audio", encoding=cfg.get("encoding"), sample_rate=upstream_normaliser.sample_rate, channels=upstream_normaliser.channels)
+
+        # 🤫 Optional silence gate; needs mono PCM16 (always true after normalising)
+        vad_cfg = cfg.get("vad") if isinstance(cfg.get("vad"), dict) else {}
+        try:
+            upstream_vad = build_vad(
+                cfg,
+                sample_rate=REALTIME_SAMPLE_RATE if upstream_normaliser is not None else client_sample_rate,
+            )
+        except ValueError as e:
+            log.warning("VAD disabled", error=str(e))
+            upstream_vad = None
+        if upstream_vad is not None and (
+            not upstream_vad.enabled or (upstream_normaliser is None and client_channels != 1)
+        ):
+            upstream_vad = None
+        vad_events = upstream_vad is not None and vad_cfg.get("events", True)
+        vad_commit = upstream_vad is not None and vad_cfg.get("commit_on_speech_end", False)
+        if upstream_vad is not None:
+            log.info("upstream VAD enabled", mode=upstream_vad.mode, events=vad_events, commit_on_speech_end=vad_commit)
         if cfg.get("type") == "config":
-            await websocket.send_json({"type": "config_ack"})
-            print("✅ Config acknowledged")
-
-        print("🔵 Connecting to OpenAI Realtime API...")
-        async with websockets.connect(
-            "wss://api.openai.com/v1/realtime?model=gpt-4o-realtime-preview",
-            additional_headers={
-                "Authorization": f"Bearer {OPENAI_API_KEY}",
-                "OpenAI-Beta": "realtime=v1",
-            },
-        ) as openai_ws:
-            print("🟢 Connected to OpenAI Realtime API")
-
-            session_update = {
-                "type": "session.update",
-                "session": {
-                    "model": "gpt-4o-realtime-preview",
-                    "voice": "cedar",
-                    "modalities": ["text", "audio"],
-                    "input_audio_format": "pcm16",
-                    "output_audio_format": "pcm16",
-                    "instructions": SYSTEM_PROMPT.strip(),
-                },
-            }
-            await openai_ws.send(json.dumps(session_update))
-            print("📤 Sent session update to OpenAI")
+            await outbound.send_json({
+                "type": "config_ack",
+                "audio_framing": audio_framer.framing,
+                "session_id": session_id,
+                "resumed": record is not None,
+            })
+            log.info("config acknowledged", audio_framing=audio_framer.framing, session=trace_id)
+
+        log.debug("connecting to Realtime API")
+        # 🔥 Usually a pre-warmed session that already has the shared config
+        async with realtime_pool.session() as openai_ws:
+            log.info("connected to Realtime API")
+            if recorder is not None:
+                openai_ws = recorder.wrap(openai_ws)
+
+            # Only what differs from base_session_config() for this client
+            session_overrides = {}
+            resume = resume_instructions(session_state)
+            if resume:
+                session_overrides["instructions"] = SYSTEM_PROMPT.strip() + resume
+            if vad_commit:
+                # Our VAD ends the turn, so the server must not do it a second time
+                session_overrides["turn_detection"] = None
+            if session_overrides:
+                await openai_ws.send(json.dumps({"type": "session.update", "session": session_overrides}))
+                log.debug("session update sent", keys=",".join(session_overrides))
+
+            # ------------------------------
+            # 📤 Publish merged field updates
+            # ------------------------------
+            async def publish_fields(changed, version):
+                for field_name, field_value in changed.items():
+                    log.debug("field sent", field=field_name, version=version)
+                    await outbound.send_json({
+                        "type": "field_extracted",
+                        "field": field_name,
+                        "value": field_value,
+                        "version": version
+                    })
+
+            async def publish_calculations(version):
+                calculations = await calculate_loan_details(session_state.get("fields", {}))
+                tracer.mark_version(version, "calculations")
+                await outbound.send_json({
+                    "type": "loan_calculations", 
+                    "data": calculations,
+                    "version": version
+                })
+                return calculations
+
+            # ------------------------------
+            # ⚡ Local fast-path extraction
+            # ------------------------------
+            async def run_fast_path(turns=None):
+                # Only the turns (or tail of a growing turn) not yet seen
+                if turns is None:
+                    turns = conversation_log.read_since(fast_cursor)
+                values, needs_llm = fast_extract(turns)
+                version = extraction_scheduler.trigger(schedule=needs_llm)
+                tracer.bind_version(version)
+                changed = merge_fields(session_state, values, version)
+                metrics.FAST_PATH.inc(outcome="llm" if needs_llm else "resolved")
+                if changed:
+                    log.info("fast path resolved fields", fields=",".join(changed), version=version)
+                    await publish_fields(changed, version)
+                    # Locally parsed values are shown as pending until the model sees a confirmation
+                    await handle_field_confirmation(
+                        {"fields": changed, "confirmed": {f: False for f in changed}}, outbound, session_state
+                    )
+                    if not needs_llm:
+                        await publish_calculations(version)
+                return version, needs_llm
 
             # ------------------------------
             # 🧠 Background field extraction
             # ------------------------------
-            async def run_field_extraction(conversation_text, websocket):
-                print("🎯 EXTRACTION TASK STARTED: run_field_extraction called")
-                print(f"📥 Input conversation length: {len(conversation_text)} chars")
-                
+            async def run_field_extraction(version):
+                # Snapshot this version: every turn not yet extracted plus recent
+                # context within the token budget; older turns are summarised by
+                # the fields already known
+                turns = len(conversation_log)
+                start = conversation_log.window_start(session_state.get("extracted_turns", 0), EXTRACTION_CONTEXT_TOKENS)
+                conversation_text = conversation_log.render(start)
+                known = known_fields_summary(session_state) if start > 0 else ""
+
+                # Same input as the result already applied: nothing new to
+                # extract, confirm, publish or email
+                input_key = extraction_cache_key(conversation_text, known)
+                if input_key == session_state.get("extraction_key"):
+                    metrics.CACHE_LOOKUPS.inc(cache="extraction", outcome="unchanged")
+                    log.info("extraction input unchanged, skipping", version=version)
+                    return
+
+                log.info("extraction started", version=version, chars=len(conversation_text), window_start=start, turns=turns)
+                tracer.mark_version(version, "extraction_start")
+
+                # Values were read back and await a yes/no on this turn: that
+                # answer goes ahead of routine extraction in the rate limiter
+                priority = PRIORITY_CONFIRMATION if session_state.get("pending_fields") else PRIORITY_EXTRACTION
+
                 try:
-                    print("🔄 Calling extract_user_fields...")
-                    fields = await extract_user_fields(conversation_text)
-                    print(f"✅ EXTRACTION COMPLETE: Got fields: {fields}")
+                    async with supervisor.side_call("extraction"):
+                        extraction = await extract_user_fields(conversation_text, known, priority=priority)
+                    tracer.mark_version(version, "extraction_end")
+                    fields = extraction["fields"]
+
+                    # A failed call (e.g. out of 429 retries) says nothing about
+                    # the fields; keep the version unclaimed for the next turn
+                    if extraction.get("failed"):
+                        log.warning("extraction failed, keeping current fields", version=version)
+                        return
+
+                    if not extraction_scheduler.claim(version):
+                        log.info("dropping stale extraction", version=version, published=extraction_scheduler.published_version)
+                        return
                     
-                    # Send extracted fields to frontend
-                    sent_count = 0
-                    for field_name, field_value in fields.items():
-                        if field_value is not None:
-                            print(f"📤 Sending field to frontend: {field_name} = {field_value}")
-                            await websocket.send_json({
-                                "type": "field_extracted",
-                                "field": field_name,
-                                "value": field_value
-                            })
-                            sent_count += 1
+                    # The last turn may still grow, so it stays in the next window
+                    session_state["extracted_turns"] = max(session_state.get("extracted_turns", 0), turns - 1)
+                    session_state["extraction_key"] = input_key
+
+                    # Send changed fields to frontend
+                    changed = merge_fields(session_state, fields, version)
+                    await publish_fields(changed, version)
+                    fields = session_state["fields"]
+
+                    # Pending/confirmed status comes from the same extraction call,
+                    # but only for values merge_fields accepted: a field the fast
+                    # path set at a newer version keeps its own status
+                    versions = session_state.get("field_versions", {})
+                    accepted = {f: v for f, v in extraction["fields"].items() if versions.get(f, 0) <= version}
+                    await handle_field_confirmation({
+                        "fields": accepted,
+                        "confirmed": {f: c for f, c in extraction["confirmed"].items() if f in accepted},
+                    }, outbound, session_state)
+                    log.debug("field confirmation applied", confirmed=len(session_state.get("confirmed_fields", {})), pending=len(session_state.get("pending_fields", {})))
                     
-                    print("🧮 Running loan calculations...")
-                    calculations = await calculate_loan_details(fields)
-                    await websocket.send_json({
-                        "type": "loan_calculations", 
-                        "data": calculations
-                    })
-                    print(f"✅ Sent {sent_count} fields + loan calculation results to frontend")
+                    calculations = await publish_calculations(version)
+                    log.info("extraction published", version=version, changed=len(changed))
+                    await save_session()
 
                     # ---------------------------------------------------------
                     # 📧 EMAIL REPORT SECTION (only if user consented)
                     # ---------------------------------------------------------
-                    # user_email = fields.get("email_address")  
-                    user_email = "ardrar777@gmail.com"  # Use extracted email, not hardcoded
+                    user_email = fields.get("email_address")
                     user_consent = fields.get("email_consent", False)
-                    print(f"📧 Preparing to send email. Email: {user_email}, Consent: {user_consent}")
+                    log.debug("email check", consent=user_consent)
                     
                     try:
-                        if user_email or user_consent:
-                            print(f"📨 Preparing email report for {user_email}")
+                        if user_email and user_consent:
                             
                             subject = "Your Home Loan Analysis Report"
                             body = (
                                 "Hello!\n\n"
                                 "Here's a summary of your home loan analysis:\n\n"
-                                f"Name: {fields.get('first_name', 'N/A')}\n"
-                                f"Loan Amount: ₹{fields.get('loan_amount', 0):,}\n"
-                                f"Monthly Salary: ₹{fields.get('monthly_salary', 0):,}\n"
-                                f"Tenure: {fields.get('loan_tenure_years', 'N/A')} years\n\n"
-                                f"Estimated EMI: ₹{calculations.get('emi_amount', 0):,}\n"
-                                f"Total Payable: ₹{calculations.get('total_payable', 0):,}\n"
-                                f"Total Interest: ₹{calculations.get('total_interest', 0):,}\n"
+                                f"Name: {fields.get('first_name') or 'N/A'}\n"
+                                f"Loan Amount: {format_inr(fields.get('loan_amount'))}\n"
+                                f"Monthly Salary: {format_inr(fields.get('monthly_salary'))}\n"
+                                f"Tenure: {fields.get('loan_tenure_years') or 'N/A'} years\n\n"
+                                f"Estimated EMI: {format_inr(calculations.get('emi_amount'))}\n"
+                                f"Total Payable: {format_inr(calculations.get('total_payable'))}\n"
+                                f"Total Interest: {format_inr(calculations.get('total_interest'))}\n"
                                 f"Eligibility Status: {'✅ Eligible' if calculations.get('eligible') else '❌ Not Eligible'}\n"
                                 f"Remarks: {calculations.get('reason', 'N/A')}\n\n"
                                 "Thank you for using our Home Loan Assistant!"
                             )
 
-                            print(f"📝 Email body prepared, calling send_email_report...")
-                            
-                            # Run email in a thread to avoid blocking
-                            try:
-                                success = await asyncio.wait_for(
-                                    asyncio.to_thread(send_email_report, user_email, subject, body),
-                                    timeout=10.0  # 10 second timeout
-                                )
-                            except asyncio.TimeoutError:
-                                print("⏰ Email sending timed out after 10 seconds")
-                                success = False
-                            
-                            if success:
-                                print(f"✅ Email report sent to {user_email}")
-                                await websocket.send_json({
-                                    "type": "email_status",
-                                    "status": "sent",
-                                    "to": user_email
-                                })
-                            else:
-                                print(f"❌ Failed to send email to {user_email}")
-                                await websocket.send_json({
+                            # The outbox retries durably, so queue each distinct report once
+                            report_key = content_key(user_email, body)
+                            if session_state.get("emailed_report") == report_key:
+                                log.debug("email not sent: report unchanged")
+                                return
+                            session_state["emailed_report"] = report_key
+
+                            # Queued for the SMTP outbox; delivery status is pushed back as it changes
+                            async def report_email_status(status, job):
+                                if status in ("sent", "failed"):
+                                    tracer.mark_version(version, "email_done")
+                                await outbound.send_json({
                                     "type": "email_status",
-                                    "status": "failed",
-                                    "to": user_email
+                                    "status": status,
+                                    "to": job.to
                                 })
+
+                            tracer.mark_version(version, "email_dispatch")
+                            await email_outbox.enqueue(user_email, subject, body, on_status=report_email_status)
                         else:
-                            print(f"⚠️ Email not sent: missing user email or consent. Email: {user_email}, Consent: {user_consent}")
+                            log.debug("email not sent: missing address or consent", consent=user_consent)
 
                     except Exception as e:
-                        print(f"Unexpected error in email handling: {e}")
-                        import traceback
-                        traceback.print_exc()
+                        log.exception("email handling failed", error=str(e))
 
                 except Exception as e:
-                    print(f"❌ EXTRACTION TASK FAILED: {e}")
-                    import traceback
-                    traceback.print_exc()
+                    log.exception("extraction task failed", version=version, error=str(e))
+
+            extraction_scheduler = ExtractionScheduler(
+                run_field_extraction, initial_version=resumed_version, spawn=supervisor.spawn
+            )
+
+            if record is not None and session_state.get("fields"):
+                # Refill the client's form from the stored state
+                await publish_fields(dict(session_state["fields"]), resumed_version)
+                for status, fields in (("field_confirmed", session_state.get("confirmed_fields", {})),
+                                       ("field_pending", session_state.get("pending_fields", {}))):
+                    for field_name in fields:
+                        await outbound.send_json({
+                            "type": status,
+                            "field": field_name,
+                            "value": session_state["fields"].get(field_name),
+                        })
+                await publish_calculations(resumed_version)
 
             # ------------------------------
-            # 🔄 Field confirmation handler
+            # 🎤 Frontend → OpenAI
             # ------------------------------
-            async def run_field_confirmation(conversation_segment, websocket):
-                print("🧩 FIELD CONFIRMATION: Checking for field updates...")
+            if upstream_normaliser is not None:
+                upstream_batcher = UpstreamAudioBatcher(openai_ws.send)
+            else:
+                upstream_batcher = UpstreamAudioBatcher(
+                    openai_ws.send,
+                    sample_rate=client_sample_rate,
+                    channels=client_channels,
+                )
+
+            def is_end_of_audio(msg):
+                if msg.get("bytes") is not None:
+                    return msg["bytes"] == b"end_of_audio"
+                text = msg.get("text") or ""
+                if text == "end_of_audio":
+                    return True
                 try:
-                    updated_state = await handle_field_confirmation(conversation_segment, websocket, session_state)
-                    # Update the session state with any changes
-                    session_state.update(updated_state)
-                    print(f"✅ Field confirmation completed. Confirmed: {len(session_state.get('confirmed_fields', {}))}, Pending: {len(session_state.get('pending_fields', {}))}")
-                except Exception as e:
-                    print(f"❌ FIELD CONFIRMATION ERROR: {e}")
-                    import traceback
-                    traceback.print_exc()
+                    return json.loads(text).get("type") == "end_of_audio"
+                except (ValueError, AttributeError):
+                    return False
+
+            committed = {"bytes": 0}
 
             # ------------------------------
-            # 🎤 Frontend → OpenAI
+            # 🛠️ Realtime function calls
             # ------------------------------
+            # Answered locally the moment the arguments are complete; the
+            # model continues with a new response once its own is done.
+            async def record_confirmed_field(args):
+                field = args.get("field")
+                value = realtime_tools.coerce_field_value(field, args.get("value"))
+                version = extraction_scheduler.trigger(schedule=False)
+                changed = merge_fields(session_state, {field: value}, version)
+                await publish_fields(changed, version)
+                if field != "email_consent":
+                    await handle_field_confirmation(
+                        {"fields": {field: value}, "confirmed": {field: True}}, outbound, session_state
+                    )
+                await publish_calculations(version)
+                await save_session()
+                return {"recorded": True, "field": field, "value": value}
+
+            async def run_tool_call(name, call_id, arguments):
+                started = time.perf_counter()
+                outcome = "ok"
+                try:
+                    args = json.loads(arguments or "{}")
+                    if name == realtime_tools.RECORD_CONFIRMED_FIELD:
+                        output = await record_confirmed_field(args)
+                    elif name in realtime_tools.CALCULATORS:
+                        output = realtime_tools.CALCULATORS[name](args, session_state.get("fields", {}))
+                    else:
+                        outcome = "unknown"
+                        output = {"error": f"unknown tool {name!r}"}
+                except (realtime_tools.ToolError, ValueError, AttributeError, ArithmeticError) as e:
+                    outcome = "invalid"
+                    output = {"error": str(e)}
+                log.info("tool call", tool=name, outcome=outcome)
+                await openai_ws.send(json.dumps({
+                    "type": "conversation.item.create",
+                    "item": {"type": "function_call_output", "call_id": call_id, "output": json.dumps(output)},
+                }))
+                metrics.TOOL_LATENCY.observe(time.perf_counter() - started, tool=name)
+                metrics.TOOL_CALLS.inc(tool=name, outcome=outcome)
+
+            # ------------------------------
+            # 🗣️ User transcripts
+            # ------------------------------
+            # A user turn starts as a placeholder when the upstream confirms a
+            # commit (ours or its own turn detection's); a commit that fails
+            # or finds the buffer already committed creates no turn. Once the
+            # transcription for its item arrives, the real text replaces it
+            # and goes straight to the fast path and extraction instead of
+            # waiting for the assistant's read-back.
+            transcript_turns = {}        # item_id -> turn index
+            transcript_deltas = {}       # item_id -> text so far
+
+            def bind_user_item(item_id):
+                conversation_log.add_turn("user", AUDIO_PLACEHOLDER)
+                transcript_turns[item_id] = len(conversation_log) - 1
+
+            def set_user_transcript(item_id, text):
+                turn = transcript_turns.get(item_id)
+                if turn is None:
+                    return None
+                conversation_log.set_text(turn, text)
+                # The fast path must not re-read this turn from a stale offset
+                if fast_cursor["turn"] == turn:
+                    fast_cursor["offset"] = len(text)
+                # Extraction has to see this turn again
+                if session_state.get("extracted_turns", 0) > turn:
+                    session_state["extracted_turns"] = turn
+                return turn
+
+            async def on_user_transcript(item_id, transcript):
+                transcript_deltas.pop(item_id, None)
+                text = transcript.strip()
+                turn = set_user_transcript(item_id, text or AUDIO_PLACEHOLDER)
+                transcript_turns.pop(item_id, None)
+                if turn is None or not text:
+                    return
+                tracer.mark("user_transcript")
+                log.debug("user transcript", turn=turn, chars=len(text))
+                await outbound.send_json({"type": "chat_message", "role": "user", "text": text})
+                version, needs_llm = await run_fast_path([{"role": "user", "text": text}])
+                await save_session()
+                if needs_llm:
+                    log.debug("extraction scheduled from user transcript", version=version)
+
+            async def commit_user_turn():
+                await upstream_batcher.flush()
+                # The user turn is tracked from input_audio_buffer.committed.
+                # Committing an empty buffer is an upstream error (e.g. everything was gated)
+                if upstream_batcher.bytes_out > committed["bytes"]:
+                    await openai_ws.send(json.dumps({
+                        "type": "input_audio_buffer.commit"
+                    }))
+                    committed["bytes"] = upstream_batcher.bytes_out
+                await openai_ws.send(json.dumps({
+                    "type": "response.create"
+                }))
+                tracer.mark("audio_commit")
+                log.info("user turn committed", turns=len(conversation_log), frames=upstream_batcher.frames_in, packets=upstream_batcher.packets_out)
+
             async def frontend_to_openai():
-                print("🔄 Starting frontend→OpenAI relay")
+                log.debug("frontend→openai relay started", packet_ms=upstream_batcher.packet_ms)
                 try:
-                    async for msg in websocket.iter_bytes():
-                        print(f"🎤 Received audio chunk: {len(msg)} bytes")
-                        
-                        if msg == b"end_of_audio":
-                            print("🎤 End of audio detected - committing buffer and triggering response")
-                            await openai_ws.send(json.dumps({
-                                "type": "input_audio_buffer.commit"
-                            }))
-                            await openai_ws.send(json.dumps({
-                                "type": "response.create"
-                            }))
-                            # Track user turn
-                            conversation_log.append({"role": "user", "text": "[user spoke audio]"})
-                            print(f"📝 Added user turn to conversation log. Total turns: {len(conversation_log)}")
-                            print("📤 Audio committed and response triggered")
+                    while True:
+                        msg = await websocket.receive()
+                        if msg["type"] == "websocket.disconnect":
+                            break
+                        if recorder is not None:
+                            recorder.client_message(msg)
+
+                        if is_end_of_audio(msg):
+                            log.debug("end of audio received")
+                            tracer.begin_turn().mark("end_of_audio")
+                            await commit_user_turn()
                             continue
 
-                        b64_audio = base64.b64encode(msg).decode("utf-8")
-                        await openai_ws.send(json.dumps({
-                            "type": "input_audio_buffer.append",
-                            "audio": b64_audio
-                        }))
+                        if msg.get("bytes"):
+                            pcm = msg["bytes"]
+                            metrics.UPSTREAM_AUDIO_FRAMES.inc()
+                            if upstream_normaliser is not None:
+                                pcm = upstream_normaliser.process(pcm)
+                            events = []
+                            if upstream_vad is not None:
+                                pcm, events = upstream_vad.process(pcm)
+                            if pcm:
+                                await upstream_batcher.add(pcm)
+
+                            for event in events:
+                                if vad_events:
+                                    await outbound.send_json({"type": "vad", "event": event})
+                                if event == "speech_end" and vad_commit:
+                                    log.info("local VAD end of speech, committing turn")
+                                    tracer.begin_turn().mark("end_of_audio")
+                                    await commit_user_turn()
                 except Exception as e:
-                    print(f"❌ frontend_to_openai error: {str(e)}")
+                    log.error("frontend_to_openai error", error=str(e))
                     raise
+                finally:
+                    await upstream_batcher.close()
+                    if upstream_vad is not None:
+                        log.info("VAD summary", dropped=upstream_vad.frames_dropped, frames=upstream_vad.frames_total)
 
             # ------------------------------
             # 🤖 OpenAI → Frontend
             # ------------------------------
             async def openai_to_frontend():
-                print("🔄 Starting OpenAI→frontend relay")
+                log.debug("openai→frontend relay started")
                 try:
                     async for msg in openai_ws:
                         data = json.loads(msg)
                         event_type = data.get("type")
-                        print(f"📊 Event type: {event_type}")
+                        metrics.REALTIME_EVENTS.inc(type=event_type)
+                        log.debug("realtime event", type=event_type)
 
                         if event_type == "response.audio_transcript.delta":
                             text = data.get("delta", "").strip()
                             if text:
-                                print(f"💬 Assistant transcript: '{text}'")
-                                await websocket.send_json({
+                                tracer.mark("first_transcript")
+                                log.debug("assistant transcript delta", text=text)
+                                await outbound.send_json({
                                     "type": "chat_message",
                                     "role": "assistant", 
                                     "text": text
                                 })
 
                                 # Append assistant text to conversation
-                                if conversation_log and conversation_log[-1]["role"] == "assistant":
-                                    conversation_log[-1]["text"] += " " + text
-                                    print(f"📝 Updated last assistant message: '{conversation_log[-1]['text']}'")
-                                else:
-                                    conversation_log.append({"role": "assistant", "text": text})
-                                    print(f"📝 Added new assistant message: '{text}'")
+                                conversation_log.append_text("assistant", text)
                                 
-                                print(f"📋 Conversation log now has {len(conversation_log)} turns")
 
                         elif event_type == "response.audio.delta":
-                            print("🎵 Sending audio chunk to frontend")
-                            await websocket.send_json({"type": "tts_start"})
                             try:
+                                tracer.mark("first_audio")
                                 audio_chunk = base64.b64decode(data["delta"])
-                                await websocket.send_bytes(audio_chunk)
-                                await websocket.send_json({"type": "tts_end"})
-                                print("✅ Audio chunk sent successfully")
+                                metrics.DOWNSTREAM_AUDIO_FRAMES.inc()
+                                metrics.DOWNSTREAM_AUDIO_BYTES.inc(len(audio_chunk))
+                                if audio_framer.framing == AUDIO_FRAMING_BINARY_V1:
+                                    # One frame per chunk: header + PCM
+                                    outbound.put_audio(
+                                        ("bytes", audio_framer.audio_chunk(data.get("response_id"), audio_chunk))
+                                    )
+                                else:
+                                    outbound.put_audio(
+                                        ("json", {"type": "tts_start"}),
+                                        ("bytes", audio_chunk),
+                                        ("json", {"type": "tts_end"}),
+                                    )
                             except Exception as e:
-                                print(f"❌ Audio processing error: {str(e)}")
+                                log.every(5.0, logging.WARNING, "audio processing error", error=str(e))
+
+                        elif event_type == "response.audio.done":
+                            if audio_framer.framing == AUDIO_FRAMING_BINARY_V1:
+                                outbound.put_audio(("bytes", audio_framer.audio_end(data.get("response_id"))))
+
+                        elif event_type == "input_audio_buffer.committed":
+                            bind_user_item(data.get("item_id"))
+
+                        elif event_type == "conversation.item.input_audio_transcription.delta":
+                            item_id = data.get("item_id")
+                            if item_id in transcript_turns:
+                                text = transcript_deltas.get(item_id, "") + data.get("delta", "")
+                                transcript_deltas[item_id] = text
+                                set_user_transcript(item_id, text.strip() or AUDIO_PLACEHOLDER)
+
+                        elif event_type == "conversation.item.input_audio_transcription.completed":
+                            await on_user_transcript(data.get("item_id"), data.get("transcript") or "")
+
+                        elif event_type == "conversation.item.input_audio_transcription.failed":
+                            item_id = data.get("item_id")
+                            transcript_deltas.pop(item_id, None)
+                            transcript_turns.pop(item_id, None)
+                            log.warning("user transcription failed", error=str(data.get("error")))
+
+                        elif event_type == "response.function_call_arguments.done":
+                            await run_tool_call(data.get("name"), data.get("call_id"), data.get("arguments"))
 
                         elif event_type == "response.created":
-                            print("🚀 Response created event")
+                            tracer.mark("response_created")
+                            log.debug("response created")
 
                         elif event_type == "response.done":
-                            print("✅ Response done event")
-                            
-                            # 🎯 COMPREHENSIVE LOGGING FOR EXTRACTION TRIGGER
-                            print("🎯 EXTRACTION TRIGGER: Response done received, preparing for field extraction")
-                            print(f"📊 Conversation log length: {len(conversation_log)} turns")
-                            
-                            # Collect text conversation so far
-                            conversation_text = "\n".join(
-                                [f"{m['role']}: {m['text']}" for m in conversation_log]
-                            )
-                            
-                            print("🧠 Full conversation text ready for extraction:")
-                            print(f"📏 Conversation text length: {len(conversation_text)} characters")
-                            
-                            # Run both extraction and confirmation in background
-                            print("🚀 Creating background extraction and confirmation tasks...")
-                            
-                            # Run field extraction (existing functionality)
-                            extraction_task = asyncio.create_task(run_field_extraction(conversation_text, websocket))
                             
-                            # Run field confirmation (new functionality) - use last few turns for confirmation
-                            if len(conversation_log) >= 2:
-                                recent_conversation = "\n".join(
-                                    [f"{m['role']}: {m['text']}" for m in conversation_log[-4:]]  # Last 4 turns
-                                )
-                                confirmation_task = asyncio.create_task(run_field_confirmation(recent_conversation, websocket))
+                            tracer.mark("response_done")
+                            log.debug("response done", turns=len(conversation_log))
+
+                            # Tool outputs are in; let the model speak the results
+                            output = (data.get("response") or {}).get("output") or []
+                            if any(item.get("type") == "function_call" for item in output):
+                                await openai_ws.send(json.dumps({"type": "response.create"}))
                             
-                            print("✅ Background tasks created")
+                            # Local rules run first; the debounced, single-flight LLM
+                            # extraction is only scheduled when they cannot settle the turn
+                            version, needs_llm = await run_fast_path()
+                            await save_session()
+                            if needs_llm:
+                                log.debug("extraction scheduled", version=version)
 
                         elif event_type == "session.updated":
-                            print("⚙️ Session updated event")
-
-                        else:
-                            print(f"📝 Other event type: {event_type}")
+                            log.debug("session updated")
 
                 except Exception as e:
-                    print(f"❌ openai_to_frontend error: {str(e)}")
+                    log.error("openai_to_frontend error", error=str(e))
                     raise
 
-            print("🔄 Starting bidirectional relay...")
-            await asyncio.gather(
-                frontend_to_openai(),
-                openai_to_frontend(),
-                return_exceptions=True
-            )
+            log.debug("bidirectional relay starting")
+            # Either direction ending (client hung up, upstream closed) ends the session
+            await supervisor.run_relay(frontend_to_openai(), openai_to_frontend())
 
     except websockets.exceptions.ConnectionClosed:
-        print("🔴 WebSocket connection closed by client")
+        log.info("client closed connection")
         
     except json.JSONDecodeError as e:
-        print(f"❌ JSON decode error: {str(e)}")
-        await websocket.send_json({"type": "error", "message": "Invalid JSON"})
+        log.warning("invalid JSON from client", error=str(e))
+        await outbound.send_json({"type": "error", "message": "Invalid JSON"})
         
     except Exception as e:
-        print(f"❌ WebSocket error: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        await websocket.send_json({"type": "error", "message": str(e)})
+        log.exception("websocket error", error=str(e))
+        await outbound.send_json({"type": "error", "message": str(e)})
 
     finally:
-        print("🔴 Connection closed")
-        print(f"📊 Final conversation log had {len(conversation_log)} turns")
-        print(f"📋 Final session state: {session_state}")
+        metrics.WS_SESSIONS_ACTIVE.dec()
+        if extraction_scheduler is not None:
+            await extraction_scheduler.close()
+        await supervisor.close()
+        await outbound.close()
+        await session_saver.flush()
+        if recorder is not None:
+            recorder.close()
+        log.info("connection closed", turns=len(conversation_log), confirmed=len(session_state.get("confirmed_fields", {})), pending=len(session_state.get("pending_fields", {})))
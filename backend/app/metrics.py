@@ -0,0 +1,214 @@
+import time
+import threading
+from contextlib import contextmanager
+
+
+# ------------------------------
+# 📈 Prometheus-style metrics
+# ------------------------------
+# A deliberately small in-process registry: counters, gauges and histograms
+# with labels, rendered in the Prometheus text exposition format by
+# GET /metrics. Updates are a dict lookup plus an add, cheap enough for the
+# audio hot path.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_INF_LABEL = 'le="+Inf"'
+
+_registry = []
+_lock = threading.Lock()  # the SMTP workers update metrics from threads
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(labels[n] for n in self.labelnames)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        with _lock:
+            items = list(self._values.items())
+        if not items and not self.labelnames:
+            items = [((), self._empty())]
+        for key, value in items:
+            yield from self._render_sample(key, value)
+
+    def _empty(self):
+        return 0
+
+    def _render_sample(self, key, value):
+        yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with _lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _empty(self):
+        return [[0] * len(self.buckets), 0, 0.0]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with _lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = self._empty()
+            counts = state[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            state[1] += 1
+            state[2] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render_sample(self, key, value):
+        counts, total, total_sum = value
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            le = f'le="{_format_value(float(bound))}"'
+            yield f"{self.name}_bucket{_format_labels(self.labelnames, key, [le])} {cumulative}"
+        yield f"{self.name}_bucket{_format_labels(self.labelnames, key, [_INF_LABEL])} {total}"
+        yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total_sum)}"
+        yield f"{self.name}_count{_format_labels(self.labelnames, key)} {total}"
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ------------------------------
+# Application metrics
+# ------------------------------
+
+WS_SESSIONS_ACTIVE = Gauge("loan_ws_sessions_active", "Open client WebSocket sessions")
+WS_SESSIONS_TOTAL = Counter("loan_ws_sessions_total", "Client WebSocket sessions accepted")
+
+UPSTREAM_AUDIO_BYTES = Counter("loan_upstream_audio_bytes_total", "Audio bytes sent to the Realtime API")
+UPSTREAM_AUDIO_FRAMES = Counter("loan_upstream_audio_frames_total", "Audio frames received from clients")
+UPSTREAM_AUDIO_PACKETS = Counter("loan_upstream_audio_packets_total", "Batched append events sent upstream")
+VAD_FRAMES_DROPPED = Counter("loan_vad_frames_dropped_total", "Silent frames dropped by the upstream VAD")
+DOWNSTREAM_AUDIO_BYTES = Counter("loan_downstream_audio_bytes_total", "TTS audio bytes sent to clients")
+DOWNSTREAM_AUDIO_FRAMES = Counter("loan_downstream_audio_frames_total", "TTS audio chunks sent to clients")
+REALTIME_EVENTS = Counter("loan_realtime_events_total", "Events received from the Realtime API", ["type"])
+REALTIME_POOL_IDLE = Gauge("loan_realtime_pool_idle", "Warm Realtime sessions waiting for a client")
+REALTIME_POOL_CHECKOUTS = Counter("loan_realtime_pool_checkouts_total", "Upstream sessions handed to clients", ["outcome"])
+REALTIME_POOL_EXPIRED = Counter("loan_realtime_pool_expired_total", "Warm sessions dropped as idle, closed or unhealthy")
+REALTIME_POOL_CONNECT_ERRORS = Counter("loan_realtime_pool_connect_errors_total", "Failed warm-up connections")
+OUTBOUND_COALESCED = Counter("loan_outbound_coalesced_total", "Queued field updates replaced by a newer one")
+OUTBOUND_DROPPED = Counter("loan_outbound_audio_dropped_total", "Audio frames dropped for slow clients")
+OUTBOUND_SLOW_DISCONNECTS = Counter("loan_outbound_slow_disconnects_total", "Clients disconnected for not keeping up")
+
+LLM_LATENCY = Histogram(
+    "loan_llm_request_duration_seconds", "Chat-completions latency by helper", ["helper"]
+)
+LLM_REQUESTS = Counter(
+    "loan_llm_requests_total", "Chat-completions requests by helper and outcome", ["helper", "outcome"]
+)
+LLM_QUEUE_WAIT = Histogram("loan_llm_queue_wait_seconds", "Time waiting for the rate limiter", ["priority"])
+LLM_RATE_LIMITED = Counter("loan_llm_rate_limited_total", "429 responses from chat-completions", ["helper"])
+LLM_RETRIES = Counter("loan_llm_retries_total", "Chat-completions retries", ["helper"])
+LLM_PROMPT_TOKENS = Counter("loan_llm_prompt_tokens_total", "Chat-completions prompt tokens", ["helper"])
+LLM_CACHED_TOKENS = Counter(
+    "loan_llm_cached_prompt_tokens_total", "Prompt tokens served from the provider's prompt cache", ["helper"]
+)
+CACHE_LOOKUPS = Counter("loan_cache_lookups_total", "Result cache lookups", ["cache", "outcome"])
+CACHE_ENTRIES = Gauge("loan_cache_entries", "Entries held by a result cache", ["cache"])
+TOOL_CALLS = Counter("loan_realtime_tool_calls_total", "Realtime function calls answered", ["tool", "outcome"])
+TOOL_LATENCY = Histogram("loan_realtime_tool_duration_seconds", "Time to answer a Realtime function call", ["tool"])
+FAST_PATH = Counter("loan_fast_path_total", "Fast-path extraction outcomes", ["outcome"])
+
+RECORDED_BYTES = Counter("loan_recorded_bytes_total", "Bytes written by the session recorder")
+BULK_ROWS = Counter("loan_bulk_rows_total", "Rows processed by bulk eligibility scoring", ["outcome"])
+
+SMTP_LATENCY = Histogram("loan_smtp_send_duration_seconds", "Time to deliver one email over SMTP")
+EMAILS = Counter("loan_emails_total", "Email reports by delivery status", ["status"])
+EMAIL_OUTBOX_DEPTH = Gauge("loan_email_outbox_depth", "Emails waiting for an SMTP worker")
+
+BACKGROUND_TASKS = Gauge("loan_background_tasks_in_flight", "Background tasks currently running", ["kind"])
+LEAKED_TASKS = Counter("loan_leaked_tasks_total", "Session tasks still running after the session closed")
+ORPHANED_TASKS = Gauge("loan_orphaned_tasks", "Leaked session tasks that are still running")
+SIDE_CALL_WAIT = Histogram("loan_side_call_wait_seconds", "Time spent waiting for a side-call slot", ["kind"])
+
+
+@contextmanager
+def track_task(kind: str):
+    """Count a background task as in flight for the duration of the block."""
+    BACKGROUND_TASKS.inc(kind=kind)
+    try:
+        yield
+    finally:
+        BACKGROUND_TASKS.dec(kind=kind)
@@ -0,0 +1,198 @@
+import os
+import asyncio
+import logging
+from collections import OrderedDict, deque
+
+from . import metrics
+from .logs import get_logger
+
+log = get_logger("outbound")
+
+
+# ------------------------------
+# 📬 Per-connection outbound queue
+# ------------------------------
+# Every message for a client goes through one bounded queue drained by a
+# single writer task, so concurrent producers (audio relay, extraction,
+# email status) never interleave sends on the socket. Audio frames have
+# priority, a field update that is superseded before it was sent is
+# replaced in place, and a client that cannot keep up is handled by
+# OUTBOUND_SLOW_CLIENT instead of buffering without limit:
+#   drop_oldest  drop the oldest queued audio and keep the session
+#   disconnect   close the socket with 1013 (try again later)
+# A send that blocks for OUTBOUND_SEND_TIMEOUT_SECONDS always disconnects.
+
+OUTBOUND_MAX_AUDIO = int(os.getenv("OUTBOUND_MAX_AUDIO", "400"))
+OUTBOUND_MAX_CONTROL = int(os.getenv("OUTBOUND_MAX_CONTROL", "500"))
+OUTBOUND_SLOW_CLIENT = os.getenv("OUTBOUND_SLOW_CLIENT", "drop_oldest")  # drop_oldest | disconnect
+OUTBOUND_SEND_TIMEOUT_SECONDS = float(os.getenv("OUTBOUND_SEND_TIMEOUT_SECONDS", "10"))
+
+# Audio items sent before a waiting control message gets its turn
+AUDIO_BURST = 8
+
+
+def _coalesce_key(message: dict):
+    kind = message.get("type")
+    if kind == "field_extracted":
+        return ("value", message.get("field"))
+    if kind in ("field_pending", "field_confirmed"):
+        return ("status", message.get("field"))
+    if kind == "loan_calculations":
+        return ("calculations",)
+    return None
+
+
+class OutboundQueue:
+    """
+    Drop-in for the `send_json` / `send_bytes` side of a WebSocket: both
+    enqueue and return immediately. Audio goes through `send_audio`, whose
+    messages are kept together and ahead of control messages.
+    """
+
+    def __init__(
+        self,
+        websocket,
+        max_audio: int = OUTBOUND_MAX_AUDIO,
+        max_control: int = OUTBOUND_MAX_CONTROL,
+        slow_client: str = OUTBOUND_SLOW_CLIENT,
+        send_timeout: float = OUTBOUND_SEND_TIMEOUT_SECONDS,
+    ):
+        self._ws = websocket
+        self.max_audio = max_audio
+        self.max_control = max_control
+        self.slow_client = slow_client
+        self.send_timeout = send_timeout
+
+        self._audio = deque()
+        self._control = OrderedDict()
+        self._seq = 0
+        self._wakeup = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._drained.set()
+        self.closed = False
+        self.dropped_audio = 0
+        self.coalesced = 0
+        self._closer = None
+        self._writer = asyncio.create_task(self._run())
+
+    # ------------------------------
+    # Producers
+    # ------------------------------
+    async def send_json(self, message: dict):
+        self.put_control(message)
+
+    async def send_bytes(self, data: bytes):
+        self.put_audio(("bytes", data))
+
+    async def send_audio(self, *items):
+        self.put_audio(*items)
+
+    def put_control(self, message: dict):
+        if self.closed:
+            return
+        key = _coalesce_key(message)
+        if key is None:
+            key = ("seq", self._seq)
+            self._seq += 1
+        elif key in self._control:
+            self.coalesced += 1
+            metrics.OUTBOUND_COALESCED.inc()
+        self._control[key] = message
+        if len(self._control) > self.max_control:
+            self._disconnect("control queue full")
+            return
+        self._notify()
+
+    def put_audio(self, *items):
+        """Queue ("json", dict) / ("bytes", data) items that must go out back to back."""
+        if self.closed:
+            return
+        self._audio.append(items)
+        if len(self._audio) > self.max_audio:
+            if self.slow_client == "drop_oldest":
+                self._audio.popleft()
+                self.dropped_audio += 1
+                metrics.OUTBOUND_DROPPED.inc()
+                log.every(5.0, logging.WARNING, "slow client, dropping audio", dropped=self.dropped_audio)
+            else:
+                self._disconnect("audio queue full")
+                return
+        self._notify()
+
+    def _notify(self):
+        self._drained.clear()
+        self._wakeup.set()
+
+    # ------------------------------
+    # Single writer
+    # ------------------------------
+    async def _send(self, kind, payload):
+        if kind == "bytes":
+            send = self._ws.send_bytes(payload)
+        else:
+            send = self._ws.send_json(payload)
+        await asyncio.wait_for(send, timeout=self.send_timeout)
+
+    async def _run(self):
+        audio_streak = 0
+        try:
+            while True:
+                if not self._audio and not self._control:
+                    self._drained.set()
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                if self._audio and (audio_streak < AUDIO_BURST or not self._control):
+                    items = self._audio.popleft()
+                    audio_streak += 1
+                    for kind, payload in items:
+                        await self._send(kind, payload)
+                else:
+                    _, message = self._control.popitem(last=False)
+                    audio_streak = 0
+                    await self._send("json", message)
+        except asyncio.TimeoutError:
+            self._disconnect("send timed out")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Client went away; drop whatever is still queued
+            log.debug("outbound writer stopped", error=str(e))
+            self._stop()
+
+    def _stop(self):
+        self.closed = True
+        self._audio.clear()
+        self._control.clear()
+        self._drained.set()
+
+    def _disconnect(self, reason: str):
+        if self.closed:
+            return
+        self._stop()
+        metrics.OUTBOUND_SLOW_DISCONNECTS.inc()
+        log.warning("disconnecting slow client", reason=reason)
+        self._closer = asyncio.create_task(self._close_socket())
+
+    async def _close_socket(self):
+        if asyncio.current_task() is not self._writer:
+            self._writer.cancel()
+            await asyncio.gather(self._writer, return_exceptions=True)
+        try:
+            await self._ws.close(code=1013, reason="client too slow")
+        except Exception:
+            pass
+
+    async def close(self, timeout: float = 2.0):
+        """Flush what is queued (up to `timeout`), then stop the writer."""
+        if not self.closed:
+            try:
+                await asyncio.wait_for(self._drained.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._stop()
+        if not self._writer.done():
+            self._writer.cancel()
+        await asyncio.gather(self._writer, return_exceptions=True)
+        if self._closer is not None:
+            await asyncio.gather(self._closer, return_exceptions=True)
@@ -0,0 +1,151 @@
+import os
+import time
+import random
+import asyncio
+import heapq
+import itertools
+from email.utils import parsedate_to_datetime
+
+from . import metrics
+from .logs import get_logger
+
+log = get_logger("ratelimit")
+
+
+# ------------------------------
+# 🚦 Process-wide chat-completions rate limiter
+# ------------------------------
+# Two token buckets, one for requests (LLM_RPM) and one for estimated
+# tokens (LLM_TPM), shared by every session. Callers wait in a priority
+# queue: lower numbers go first, so confirming the user's current turn is
+# not stuck behind background work. A 429 pauses dispatch for its
+# Retry-After, and the caller retries with jittered exponential backoff.
+
+LLM_RPM = float(os.getenv("LLM_RPM", "500"))
+LLM_TPM = float(os.getenv("LLM_TPM", "200000"))
+LLM_BURST_SECONDS = float(os.getenv("LLM_BURST_SECONDS", "10"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "20"))
+
+PRIORITY_CONFIRMATION = 0  # the user is confirming values read back on this turn
+PRIORITY_EXTRACTION = 1    # regular per-turn extraction
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float, burst_seconds: float = LLM_BURST_SECONDS):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` (capped at capacity) is available."""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return missing / self.rate if missing > 0 else 0.0
+
+    def take(self, amount: float):
+        # May go negative for requests larger than the bucket; later ones repay it
+        self.level -= amount
+
+    def give_back(self, amount: float):
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    def __init__(self, rpm: float = LLM_RPM, tpm: float = LLM_TPM):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._heap = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._dispatcher = None
+        self._paused_until = 0.0
+
+    async def acquire(self, tokens: int, priority: int = PRIORITY_EXTRACTION):
+        """Wait for a request slot and `tokens` estimated tokens."""
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (priority, next(self._seq), tokens, future))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        self._wakeup.set()
+        started = time.perf_counter()
+        await future  # a cancelled waiter is skipped by the dispatcher
+        metrics.LLM_QUEUE_WAIT.observe(time.perf_counter() - started, priority=str(priority))
+
+    def reconcile(self, estimated: int, actual: int):
+        """Correct the token bucket once the response reports real usage."""
+        if actual is not None:
+            self.tokens.give_back(estimated - actual)
+
+    def pause(self, seconds: float):
+        """Hold every queued request, e.g. for a 429's Retry-After."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def _dispatch(self):
+        while True:
+            while self._heap and self._heap[0][3].done():
+                heapq.heappop(self._heap)
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            _, _, tokens, future = self._heap[0]
+            now = time.monotonic()
+            wait = max(
+                self._paused_until - now,
+                self.requests.wait_time(1, now),
+                self.tokens.wait_time(tokens, now),
+            )
+            if wait > 0:
+                # Re-evaluate early if a higher-priority request arrives
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            future.set_result(None)
+
+
+def retry_after_seconds(headers) -> float:
+    """Parse Retry-After (seconds or HTTP date) / retry-after-ms; None if absent."""
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def backoff_delay(attempt: int, retry_after: float = None) -> float:
+    """Jittered exponential backoff, never shorter than the server asked for."""
+    delay = min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * 2 ** attempt)
+    delay = random.uniform(delay / 2, delay)
+    if retry_after:
+        # Spread the callers a shared Retry-After would otherwise release together
+        delay = max(delay, retry_after * random.uniform(1.0, 1.2))
+    return delay
+
+
+llm_limiter = RateLimiter()
@@ -0,0 +1,162 @@
+import os
+import time
+import asyncio
+from contextlib import asynccontextmanager
+
+from websockets.protocol import State
+
+from . import metrics
+from .logs import get_logger
+
+log = get_logger("realtime_pool")
+
+
+# ------------------------------
+# 🔥 Pre-warmed Realtime upstream pool
+# ------------------------------
+# Opening a Realtime session costs DNS, TLS, the WebSocket upgrade and a
+# session.update round trip before the first greeting can be generated.
+# The pool keeps REALTIME_POOL_SIZE sessions open and already configured
+# with the shared prompt and tools, and hands one to each new client.
+# Upstream sessions carry conversation state, so a connection is used by
+# exactly one client and closed afterwards; a background task refills the
+# pool, pings idle connections and replaces the ones older than
+# REALTIME_POOL_IDLE_SECONDS. With an empty pool a client gets a cold
+# connection, as before. REALTIME_POOL_SIZE=0 disables warming.
+
+REALTIME_POOL_SIZE = int(os.getenv("REALTIME_POOL_SIZE", "2"))
+REALTIME_POOL_IDLE_SECONDS = float(os.getenv("REALTIME_POOL_IDLE_SECONDS", "600"))
+REALTIME_POOL_HEALTH_SECONDS = float(os.getenv("REALTIME_POOL_HEALTH_SECONDS", "30"))
+REALTIME_POOL_CONNECT_TIMEOUT_SECONDS = float(os.getenv("REALTIME_POOL_CONNECT_TIMEOUT_SECONDS", "10"))
+REALTIME_POOL_RETRY_MAX_SECONDS = 60.0
+
+
+class _Warm:
+    __slots__ = ("ws", "opened_at", "checked_at")
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.opened_at = time.monotonic()
+        self.checked_at = self.opened_at
+
+
+class RealtimePool:
+    """
+    `connect(warm)` is an async factory returning an open, configured
+    upstream WebSocket; with warm=True it waits until the session
+    configuration was acknowledged.
+    """
+
+    def __init__(
+        self,
+        size: int = REALTIME_POOL_SIZE,
+        idle: float = REALTIME_POOL_IDLE_SECONDS,
+        health_interval: float = REALTIME_POOL_HEALTH_SECONDS,
+        connect_timeout: float = REALTIME_POOL_CONNECT_TIMEOUT_SECONDS,
+    ):
+        self.size = max(0, size)
+        self.idle = idle
+        self.health_interval = health_interval
+        self.connect_timeout = connect_timeout
+        self._connect = None
+        self._idle = []  # _Warm, oldest first
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._failures = 0
+        self._closing = set()
+
+    async def start(self, connect):
+        self._connect = connect
+        if self.size and self._task is None:
+            self._task = asyncio.create_task(self._maintain())
+            log.info("realtime pool started", size=self.size, idle_s=self.idle)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        idle, self._idle = self._idle, []
+        await asyncio.gather(*(w.ws.close() for w in idle), return_exceptions=True)
+        metrics.REALTIME_POOL_IDLE.set(0)
+
+    @asynccontextmanager
+    async def session(self):
+        """An upstream session for one client, warm when possible; closed on exit."""
+        ws = self._checkout()
+        if ws is None:
+            metrics.REALTIME_POOL_CHECKOUTS.inc(outcome="cold")
+            ws = await self._connect(warm=False)
+        else:
+            metrics.REALTIME_POOL_CHECKOUTS.inc(outcome="warm")
+        try:
+            yield ws
+        finally:
+            await ws.close()
+
+    def _checkout(self):
+        now = time.monotonic()
+        while self._idle:
+            warm = self._idle.pop()  # newest first: furthest from idle expiry
+            if warm.ws.state is State.OPEN and now - warm.opened_at < self.idle:
+                self._refill()
+                return warm.ws
+            closing = asyncio.create_task(warm.ws.close())
+            self._closing.add(closing)
+            closing.add_done_callback(self._closing.discard)
+        self._refill()
+        return None
+
+    def _refill(self):
+        metrics.REALTIME_POOL_IDLE.set(len(self._idle))
+        self._wakeup.set()
+
+    async def _open_one(self):
+        try:
+            ws = await asyncio.wait_for(self._connect(warm=True), timeout=self.connect_timeout)
+        except Exception as e:
+            self._failures += 1
+            metrics.REALTIME_POOL_CONNECT_ERRORS.inc()
+            log.warning("warm realtime connect failed", error=str(e), failures=self._failures)
+            return False
+        self._failures = 0
+        self._idle.append(_Warm(ws))
+        metrics.REALTIME_POOL_IDLE.set(len(self._idle))
+        return True
+
+    async def _check_health(self):
+        """Drop expired, closed or unresponsive idle connections."""
+        now = time.monotonic()
+        for warm in list(self._idle):
+            healthy = warm.ws.state is State.OPEN and now - warm.opened_at < self.idle
+            if healthy and now - warm.checked_at >= self.health_interval:
+                try:
+                    pong = await warm.ws.ping()
+                    await asyncio.wait_for(pong, timeout=5)
+                    warm.checked_at = time.monotonic()
+                except Exception:
+                    healthy = False
+            if not healthy and warm in self._idle:
+                self._idle.remove(warm)
+                metrics.REALTIME_POOL_EXPIRED.inc()
+                await asyncio.gather(warm.ws.close(), return_exceptions=True)
+        metrics.REALTIME_POOL_IDLE.set(len(self._idle))
+
+    async def _maintain(self):
+        while True:
+            await self._check_health()
+            while len(self._idle) < self.size:
+                if not await self._open_one():
+                    break
+            if self._failures:
+                # Keep retrying a failing upstream, but not in a tight loop
+                await asyncio.sleep(min(REALTIME_POOL_RETRY_MAX_SECONDS, 2 ** self._failures))
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=min(self.health_interval, self.idle / 4))
+            except asyncio.TimeoutError:
+                pass
+
+
+realtime_pool = RealtimePool()
@@ -0,0 +1,216 @@
+import re
+import math
+
+from . import loan_math
+from .extraction import FIELD_TYPES
+
+
+# ------------------------------
+# 🛠️ Realtime function-calling tools
+# ------------------------------
+# Declared on the Realtime session so the voice model asks the relay for
+# numbers instead of doing the arithmetic itself. The relay answers a call
+# as soon as its arguments are complete, from the same loan_math the UI
+# panel uses, so the spoken EMI and the panel always agree.
+# record_confirmed_field needs the session state and is handled in main.
+
+CALCULATE_EMI = "calculate_emi"
+CHECK_ELIGIBILITY = "check_eligibility"
+RECORD_CONFIRMED_FIELD = "record_confirmed_field"
+
+TOOLS = [
+    {
+        "type": "function",
+        "name": CALCULATE_EMI,
+        "description": "Monthly EMI, total payable and total interest for a home loan. "
+                       "Always use this instead of calculating the EMI yourself.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "loan_amount": {"type": "number", "description": "Principal in INR"},
+                "loan_tenure_years": {"type": "number", "description": "Tenure in years"},
+                "annual_rate": {"type": "number", "description": "Annual interest rate in %, default 9"},
+            },
+            "required": ["loan_amount", "loan_tenure_years"],
+        },
+    },
+    {
+        "type": "function",
+        "name": CHECK_ELIGIBILITY,
+        "description": "Check the loan rules: amount at most 5 times the annual salary, and age plus "
+                       "tenure at most 65 years. Returns every rule that fails; eligible is null "
+                       "while the date of birth is unknown.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "monthly_salary": {"type": "number", "description": "Monthly salary in INR"},
+                "loan_amount": {"type": "number", "description": "Principal in INR"},
+                "loan_tenure_years": {"type": "number", "description": "Tenure in years"},
+                "date_of_birth": {"type": "string", "description": "DD-MM-YYYY"},
+            },
+            "required": ["monthly_salary", "loan_amount", "loan_tenure_years"],
+        },
+    },
+    {
+        "type": "function",
+        "name": RECORD_CONFIRMED_FIELD,
+        "description": "Record a field value right after the user explicitly confirmed it.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "field": {"type": "string", "enum": list(FIELD_TYPES) + ["email_consent"]},
+                "value": {"type": ["string", "number", "boolean"]},
+            },
+            "required": ["field", "value"],
+        },
+    },
+]
+
+_PHONE_DIGITS_RE = re.compile(r"^(?:91)?([6-9]\d{9})$")
+
+# Upper bounds per argument; beyond them the loan math overflows long before
+_LIMITS = {
+    "loan_amount": loan_math.MAX_AMOUNT,
+    "monthly_salary": loan_math.MAX_AMOUNT,
+    "loan_tenure_years": loan_math.MAX_TENURE_YEARS,
+    "annual_rate": loan_math.MAX_ANNUAL_RATE,
+}
+
+
+class ToolError(ValueError):
+    """Invalid tool arguments; the message is returned to the model."""
+
+
+def _number(args: dict, name: str, required: bool = True, positive: bool = True):
+    value = args.get(name)
+    if value is None or value == "":
+        if required:
+            raise ToolError(f"{name} is required")
+        return None
+    try:
+        value = float(str(value).replace(",", ""))
+    except ValueError:
+        raise ToolError(f"{name} must be a number") from None
+    if not math.isfinite(value):
+        raise ToolError(f"{name} must be a finite number")
+    if positive and value <= 0:
+        raise ToolError(f"{name} must be positive")
+    if value < 0:
+        raise ToolError(f"{name} must not be negative")
+    limit = _LIMITS.get(name)
+    if limit is not None and value > limit:
+        raise ToolError(f"{name} must be at most {limit:g}")
+    if name == "loan_tenure_years" and loan_math.tenure_months(value) < 1:
+        raise ToolError("loan_tenure_years must be at least one month")
+    return value
+
+
+def _age(date_of_birth) -> int:
+    age = loan_math.age_from_dob(date_of_birth)
+    if age is None:
+        raise ToolError("date_of_birth must be DD-MM-YYYY")
+    if age < 0:
+        raise ToolError("date_of_birth is in the future")
+    return age
+
+
+def _whole(value: float):
+    return int(value) if float(value).is_integer() else value
+
+
+def calculate_emi(args: dict, known: dict = None) -> dict:
+    amount = _number(args, "loan_amount")
+    tenure = _number(args, "loan_tenure_years")
+    rate = _number(args, "annual_rate", required=False, positive=False)
+    rate = loan_math.DEFAULT_ANNUAL_RATE if rate is None else rate
+    summary = loan_math.loan_summary(amount, rate, tenure)
+    return {
+        "loan_amount": _whole(amount),
+        "loan_tenure_years": _whole(tenure),
+        "annual_rate": rate,
+        "emi": round(float(summary["emi"])),
+        "total_payable": round(float(summary["total_payable"])),
+        "total_interest": round(float(summary["total_interest"])),
+    }
+
+
+def check_eligibility(args: dict, known: dict = None) -> dict:
+    """
+    `known` holds the session's fields; its date_of_birth is used when the
+    model leaves it out. Without any date of birth the age rule cannot be
+    checked and `eligible` is None unless another rule already fails.
+    """
+    salary = _number(args, "monthly_salary")
+    amount = _number(args, "loan_amount")
+    tenure = _number(args, "loan_tenure_years")
+    max_amount = float(loan_math.max_eligible_amount(salary))
+
+    reasons = []
+    if amount > max_amount:
+        reasons.append(f"Loan amount exceeds the maximum eligible amount of ₹{max_amount:,.0f}")
+
+    age = None
+    date_of_birth = args.get("date_of_birth") or (known or {}).get("date_of_birth")
+    if date_of_birth:
+        age = _age(date_of_birth)
+        if age + tenure > loan_math.MAX_AGE_AT_MATURITY:
+            reasons.append(
+                f"Age {age} plus a {_whole(tenure)}-year tenure exceeds {loan_math.MAX_AGE_AT_MATURITY}; "
+                f"the longest possible tenure is {max(0, loan_math.MAX_AGE_AT_MATURITY - age)} years"
+            )
+
+    if reasons:
+        eligible = False
+    elif age is None:
+        eligible = None
+        reasons.append("Date of birth needed to check that age plus tenure is at most "
+                       f"{loan_math.MAX_AGE_AT_MATURITY} years")
+    else:
+        eligible = True
+
+    return {
+        "eligible": eligible,
+        "reasons": reasons,
+        "max_eligible_amount": round(max_amount),
+        "age_years": age,
+        "age_checked": age is not None,
+    }
+
+
+def coerce_field_value(field: str, value):
+    """Validate and normalise a value for record_confirmed_field."""
+    if value is None:
+        raise ToolError(f"{field} needs a value")
+    if field == "email_consent":
+        if isinstance(value, str):
+            return value.strip().lower() in ("true", "yes", "1")
+        return bool(value)
+    if field not in FIELD_TYPES:
+        raise ToolError(f"unknown field {field!r}")
+    if FIELD_TYPES[field] == "integer":
+        value = int(round(_number({field: value}, field)))
+        if value < 1:
+            raise ToolError(f"{field} must be at least 1")
+        return value
+
+    value = str(value).strip()
+    if not value:
+        raise ToolError(f"{field} must not be empty")
+    if field == "date_of_birth":
+        _age(value)
+    if field == "email_address":
+        value = value.lower()
+        if "@" not in value:
+            raise ToolError("email_address is not a valid email")
+    if field == "phone_number":
+        match = _PHONE_DIGITS_RE.match(re.sub(r"\D", "", value))
+        if not match:
+            raise ToolError("phone_number must be a 10-digit Indian mobile number")
+        value = match.group(1)
+    return value
+
+
+CALCULATORS = {
+    CALCULATE_EMI: calculate_emi,
+    CHECK_ELIGIBILITY: check_eligibility,
+}
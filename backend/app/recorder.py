@@ -0,0 +1,211 @@
+import os
+import mmap
+import time
+import json
+import base64
+import struct
+
+from . import metrics
+from .logs import get_logger
+
+log = get_logger("recorder")
+
+
+# ------------------------------
+# 📼 Session recorder
+# ------------------------------
+# Opt-in (SESSION_RECORD_DIR): every message a session exchanges with the
+# client and the Realtime API is appended to one binary file per session,
+# to reproduce latency spikes and to benchmark the relay against real
+# traffic with bench/replay.py. Audio is stored as raw PCM instead of
+# base64 JSON. Layout, all integers little-endian:
+#
+#   header  b"LREC" | u16 version | u64 start (unix ns) | u16 n | session id (n bytes)
+#   frame   u8 kind | u64 t (ns since start) | u32 n | payload (n bytes)
+#
+# Frames are only ever appended, so a file cut short by a crash is read up
+# to its last complete frame.
+
+SESSION_RECORD_DIR = os.getenv("SESSION_RECORD_DIR", "")  # "" disables recording
+
+MAGIC = b"LREC"
+VERSION = 1
+FILE_HEADER = struct.Struct("<4sHQH")
+FRAME_HEADER = struct.Struct("<BQI")
+
+CLIENT_TEXT = 1      # text message from the client (config, end_of_audio, ...)
+CLIENT_AUDIO = 2     # binary audio frame from the client, as received
+UPSTREAM_EVENT = 3   # JSON event sent to the Realtime API
+UPSTREAM_AUDIO = 4   # PCM of one input_audio_buffer.append
+REALTIME_EVENT = 5   # JSON event received from the Realtime API
+REALTIME_AUDIO = 6   # u16 n | response id (n bytes) | PCM of one response.audio.delta
+
+KIND_NAMES = {
+    CLIENT_TEXT: "client_text",
+    CLIENT_AUDIO: "client_audio",
+    UPSTREAM_EVENT: "upstream_event",
+    UPSTREAM_AUDIO: "upstream_audio",
+    REALTIME_EVENT: "realtime_event",
+    REALTIME_AUDIO: "realtime_audio",
+}
+
+
+def _audio_event(message, event_type: str, field: str):
+    """The parsed event if `message` is an `event_type` carrying base64 audio in `field`."""
+    # Cheap check first: most messages are not audio and need no parsing
+    if not isinstance(message, str) or f'"{event_type}"' not in message[:160]:
+        return None
+    event = json.loads(message)
+    return event if event.get("type") == event_type and field in event else None
+
+
+class SessionRecorder:
+    def __init__(self, path: str, session_id: str):
+        self.path = path
+        # "x": never append a second header to another connection's file
+        self._file = open(path, "xb", buffering=1 << 16)
+        self._t0 = time.monotonic_ns()
+        sid = session_id.encode()
+        self._file.write(FILE_HEADER.pack(MAGIC, VERSION, time.time_ns(), len(sid)) + sid)
+        self.bytes_written = 0
+
+    def _write(self, kind: int, payload: bytes):
+        if self._file is None:
+            return
+        try:
+            self._file.write(FRAME_HEADER.pack(kind, time.monotonic_ns() - self._t0, len(payload)))
+            self._file.write(payload)
+        except OSError as e:
+            # A full disk must not end the call; stop recording instead
+            log.error("recording stopped", path=self.path, error=str(e))
+            self.close()
+            return
+        self.bytes_written += FRAME_HEADER.size + len(payload)
+        metrics.RECORDED_BYTES.inc(FRAME_HEADER.size + len(payload))
+
+    def client_message(self, msg: dict):
+        """A message from websocket.receive()."""
+        if msg.get("bytes") is not None:
+            self._write(CLIENT_AUDIO, msg["bytes"])
+        elif msg.get("text") is not None:
+            self._write(CLIENT_TEXT, msg["text"].encode())
+
+    def upstream(self, message: str):
+        event = _audio_event(message, "input_audio_buffer.append", "audio")
+        if event is not None:
+            self._write(UPSTREAM_AUDIO, base64.b64decode(event["audio"]))
+        else:
+            self._write(UPSTREAM_EVENT, message.encode())
+
+    def realtime(self, message):
+        event = _audio_event(message, "response.audio.delta", "delta")
+        if event is not None:
+            response_id = (event.get("response_id") or "").encode()
+            self._write(
+                REALTIME_AUDIO,
+                struct.pack("<H", len(response_id)) + response_id + base64.b64decode(event["delta"]),
+            )
+        else:
+            self._write(REALTIME_EVENT, message.encode() if isinstance(message, str) else message)
+
+    def wrap(self, upstream):
+        return RecordedUpstream(upstream, self)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            log.info("recording closed", path=self.path, bytes=self.bytes_written)
+
+
+class RecordedUpstream:
+    """Realtime WebSocket stand-in that records what passes through it."""
+
+    def __init__(self, ws, recorder: SessionRecorder):
+        self._ws = ws
+        self._recorder = recorder
+
+    async def send(self, message):
+        self._recorder.upstream(message)
+        await self._ws.send(message)
+
+    async def __aiter__(self):
+        async for message in self._ws:
+            self._recorder.realtime(message)
+            yield message
+
+    def __getattr__(self, name):
+        return getattr(self._ws, name)
+
+
+def open_recorder(session_id: str, directory: str = SESSION_RECORD_DIR):
+    """A recorder for this session, or None when recording is off or the file cannot be created."""
+    if not directory:
+        return None
+    stem = os.path.join(directory, f"{session_id}-{time.strftime('%Y%m%dT%H%M%S')}")
+    path = f"{stem}.lrec"
+    try:
+        os.makedirs(directory, exist_ok=True)
+        # A resumed session can reconnect within the same second
+        for attempt in range(1, 100):
+            try:
+                recorder = SessionRecorder(path, session_id)
+                break
+            except FileExistsError:
+                path = f"{stem}-{attempt}.lrec"
+        else:
+            raise FileExistsError(f"no free file name for {stem}")
+    except OSError as e:
+        log.error("cannot record session", path=path, error=str(e))
+        return None
+    log.info("recording session", path=path)
+    return recorder
+
+
+# ------------------------------
+# Reading
+# ------------------------------
+class Recording:
+    """Memory-mapped read access to one recorded session."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, started_ns, sid_len = FILE_HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {VERSION} session recording")
+        self.started_ns = started_ns
+        self.session_id = self._map[FILE_HEADER.size:FILE_HEADER.size + sid_len].decode()
+        self._start = FILE_HEADER.size + sid_len
+
+    def frames(self):
+        """Yield (kind, t_ns, payload memoryview) up to the last complete frame."""
+        view = memoryview(self._map)
+        offset, end = self._start, len(self._map)
+        try:
+            while offset + FRAME_HEADER.size <= end:
+                kind, t_ns, size = FRAME_HEADER.unpack_from(view, offset)
+                offset += FRAME_HEADER.size
+                if offset + size > end:
+                    break
+                yield kind, t_ns, view[offset:offset + size]
+                offset += size
+        finally:
+            view.release()
+
+    def close(self):
+        self._map.close()
+
+
+def realtime_message(kind: int, payload) -> str:
+    """Rebuild the Realtime API message a REALTIME_EVENT / REALTIME_AUDIO frame was recorded from."""
+    if kind == REALTIME_AUDIO:
+        (n,) = struct.unpack_from("<H", payload, 0)
+        return json.dumps({
+            "type": "response.audio.delta",
+            "response_id": bytes(payload[2:2 + n]).decode(),
+            "delta": base64.b64encode(payload[2 + n:]).decode("ascii"),
+        })
+    return bytes(payload).decode()
@@ -0,0 +1,88 @@
+import os
+import re
+import json
+import time
+import hashlib
+from collections import OrderedDict
+
+from . import metrics
+
+
+# ------------------------------
+# 🗃️ Content-addressed result cache
+# ------------------------------
+# Extraction is re-run whenever a turn ends, even when the transcript did
+# not change in a way the model could see (a "[user spoke audio]"
+# placeholder, a response without transcript text). Results are cached by
+# a hash of the normalised input, so identical input costs one call.
+# Entries expire after a TTL and the least recently used one is evicted
+# first. Every lookup is counted as a hit or a miss per cache.
+
+EXTRACTION_CACHE_SIZE = int(os.getenv("EXTRACTION_CACHE_SIZE", "1024"))
+EXTRACTION_CACHE_TTL_SECONDS = float(os.getenv("EXTRACTION_CACHE_TTL_SECONDS", "900"))
+CALCULATION_CACHE_SIZE = int(os.getenv("CALCULATION_CACHE_SIZE", "4096"))
+CALCULATION_CACHE_TTL_SECONDS = float(os.getenv("CALCULATION_CACHE_TTL_SECONDS", "3600"))
+
+# Transcript placeholder for a user turn whose audio has no transcript
+AUDIO_PLACEHOLDER = "[user spoke audio]"
+
+_EMPTY_TURN_RE = re.compile(r"^\w+:$")
+
+
+def normalise_conversation(text: str) -> str:
+    """
+    Canonical form of a rendered conversation for cache keys: whitespace is
+    collapsed, and placeholder and empty turns are dropped.
+    """
+    lines = []
+    for line in text.splitlines():
+        line = " ".join(line.split())
+        if not line or _EMPTY_TURN_RE.match(line) or line.endswith(": " + AUDIO_PLACEHOLDER):
+            continue
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def content_key(*parts) -> str:
+    """sha256 over the JSON encoding of `parts`."""
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, name: str, max_entries: int, ttl: float):
+        self.name = name
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._items = OrderedDict()  # key -> (expires_at, value)
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key: str):
+        """Cached value or None; counts the lookup."""
+        item = self._items.get(key)
+        if item is not None and item[0] < time.monotonic():
+            del self._items[key]
+            item = None
+        if item is None:
+            metrics.CACHE_LOOKUPS.inc(cache=self.name, outcome="miss")
+            return None
+        self._items.move_to_end(key)
+        metrics.CACHE_LOOKUPS.inc(cache=self.name, outcome="hit")
+        return item[1]
+
+    def put(self, key: str, value):
+        self._items[key] = (time.monotonic() + self.ttl, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+        metrics.CACHE_ENTRIES.set(len(self._items), cache=self.name)
+
+    def clear(self):
+        self._items.clear()
+        metrics.CACHE_ENTRIES.set(0, cache=self.name)
+
+
+extraction_cache = ResultCache("extraction", EXTRACTION_CACHE_SIZE, EXTRACTION_CACHE_TTL_SECONDS)
+calculation_cache = ResultCache("calculations", CALCULATION_CACHE_SIZE, CALCULATION_CACHE_TTL_SECONDS)
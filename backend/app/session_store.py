@@ -0,0 +1,229 @@
+import os
+import re
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .logs import get_logger
+
+log = get_logger("sessions")
+
+
+# ------------------------------
+# 💾 Session store
+# ------------------------------
+# Conversation turns and field state are saved under a client-supplied
+# session id so a dropped connection can resume where it left off. Records
+# are stored as JSON snapshots: "memory" keeps them in a per-process LRU with
+# a TTL, "sqlite" writes them to a file that several uvicorn workers on the
+# same host can share. A live session's saves are coalesced by SessionSaver,
+# so a long call writes its snapshot at most once per
+# SESSION_SAVE_DEBOUNCE_SECONDS plus once when it ends.
+#
+# Every record has an owner: the connection that last loaded or created it.
+# Loading with an owner takes the session over, and a save from any other
+# owner is refused, so the final flush of a dropped connection cannot
+# overwrite a session that has since been resumed elsewhere.
+
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")  # memory | sqlite
+SESSION_STORE_PATH = os.getenv("SESSION_STORE_PATH", "sessions.db")
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", str(6 * 3600)))
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "1000"))
+SESSION_SAVE_DEBOUNCE_SECONDS = float(os.getenv("SESSION_SAVE_DEBOUNCE_SECONDS", "2"))  # 0 = save every time
+
+_SESSION_ID_RE = re.compile(r"^[A-Za-z0-9_-]{8,128}$")
+
+
+def new_session_id() -> str:
+    return uuid.uuid4().hex
+
+
+def valid_session_id(session_id) -> bool:
+    return isinstance(session_id, str) and bool(_SESSION_ID_RE.match(session_id))
+
+
+class SessionStore:
+    """
+    Base class: subclasses implement `_get`, `_put` and `_delete` on JSON
+    strings. Snapshots are serialised on the caller's side, so later changes
+    to the live session never leak into a stored record.
+    """
+
+    def __init__(self, ttl: float = SESSION_TTL_SECONDS):
+        self.ttl = ttl
+
+    async def load(self, session_id: str, owner: str = None):
+        """The stored record or None; with `owner`, that owner takes the session over."""
+        raw = await self._get(session_id, owner)
+        return json.loads(raw) if raw is not None else None
+
+    async def save(self, session_id: str, record: dict, owner: str = None) -> bool:
+        """
+        Store `record` unless the session now belongs to another owner.
+        Returns False when the save was refused; without `owner` it always
+        writes.
+        """
+        return await self._put(session_id, json.dumps(record, ensure_ascii=False), owner)
+
+    async def delete(self, session_id: str):
+        await self._delete(session_id)
+
+    async def close(self):
+        pass
+
+
+class MemorySessionStore(SessionStore):
+    def __init__(self, ttl: float = SESSION_TTL_SECONDS, max_sessions: int = SESSION_CACHE_SIZE):
+        super().__init__(ttl)
+        self.max_sessions = max(1, max_sessions)
+        self._items = OrderedDict()  # session_id -> (expires_at, json, owner)
+
+    async def _get(self, session_id, owner=None):
+        item = self._items.get(session_id)
+        if item is None:
+            return None
+        expires_at, raw, _ = item
+        if expires_at < time.monotonic():
+            del self._items[session_id]
+            return None
+        if owner is not None:
+            self._items[session_id] = (expires_at, raw, owner)
+        self._items.move_to_end(session_id)
+        return raw
+
+    async def _put(self, session_id, raw, owner=None):
+        item = self._items.get(session_id)
+        if (
+            owner is not None and item is not None and item[2] not in (None, owner)
+            and item[0] >= time.monotonic()
+        ):
+            return False
+        self._items[session_id] = (time.monotonic() + self.ttl, raw, owner)
+        self._items.move_to_end(session_id)
+        while len(self._items) > self.max_sessions:
+            self._items.popitem(last=False)
+        return True
+
+    async def _delete(self, session_id):
+        self._items.pop(session_id, None)
+
+
+class SQLiteSessionStore(SessionStore):
+    """File-backed store; queries run on one dedicated thread."""
+
+    def __init__(self, path: str = SESSION_STORE_PATH, ttl: float = SESSION_TTL_SECONDS):
+        super().__init__(ttl)
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-store")
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, data TEXT, expires_at REAL, owner TEXT)"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(sessions)")}
+        if "owner" not in columns:
+            # Files written before records had owners
+            self._db.execute("ALTER TABLE sessions ADD COLUMN owner TEXT")
+        self._db.execute("CREATE INDEX IF NOT EXISTS sessions_expiry ON sessions (expires_at)")
+        self._writes = 0
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _get_sync(self, session_id, owner):
+        now = time.time()
+        with self._lock:
+            if owner is not None:
+                # Claim before reading: another worker's stale flush either
+                # lands first and is read back, or is refused
+                self._db.execute(
+                    "UPDATE sessions SET owner = ? WHERE id = ? AND expires_at >= ?", (owner, session_id, now)
+                )
+            row = self._db.execute(
+                "SELECT data FROM sessions WHERE id = ? AND expires_at >= ?", (session_id, now)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _put_sync(self, session_id, raw, owner):
+        now = time.time()
+        with self._lock:
+            # One statement, so the owner check holds across workers sharing the file
+            written = self._db.execute(
+                "INSERT INTO sessions (id, data, expires_at, owner) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET "
+                "data = excluded.data, expires_at = excluded.expires_at, owner = excluded.owner "
+                "WHERE excluded.owner IS NULL OR sessions.owner IS NULL "
+                "OR sessions.owner = excluded.owner OR sessions.expires_at < ?",
+                (session_id, raw, now + self.ttl, owner, now),
+            ).rowcount > 0
+            self._writes += 1
+            if self._writes % 500 == 0:
+                self._db.execute("DELETE FROM sessions WHERE expires_at < ?", (now,))
+        return written
+
+    def _delete_sync(self, session_id):
+        with self._lock:
+            self._db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    async def _get(self, session_id, owner=None):
+        return await self._run(self._get_sync, session_id, owner)
+
+    async def _put(self, session_id, raw, owner=None):
+        return await self._run(self._put_sync, session_id, raw, owner)
+
+    async def _delete(self, session_id):
+        await self._run(self._delete_sync, session_id)
+
+    async def close(self):
+        await self._run(self._db.close)
+        self._executor.shutdown(wait=False)
+
+
+class SessionSaver:
+    """
+    Debounces one session's saves. `save` is an async callable that builds
+    and stores the snapshot when it runs, so a delayed save always writes
+    the latest state. request() schedules a save unless one is already
+    pending; flush() writes now and cancels the pending one.
+    """
+
+    def __init__(self, save, delay: float = SESSION_SAVE_DEBOUNCE_SECONDS, spawn=None):
+        self._save = save
+        self.delay = delay
+        self._spawn = spawn or (lambda coro, kind: asyncio.create_task(coro))
+        self._pending = None
+
+    async def request(self):
+        if self.delay <= 0:
+            await self._save()
+        elif self._pending is None or self._pending.done():
+            self._pending = self._spawn(self._save_later(), "session_save")
+
+    async def _save_later(self):
+        await asyncio.sleep(self.delay)
+        await self._save()
+
+    async def flush(self):
+        if self._pending is not None and not self._pending.done():
+            self._pending.cancel()
+        self._pending = None
+        await self._save()
+
+
+def build_session_store(kind: str = SESSION_STORE) -> SessionStore:
+    if kind == "sqlite":
+        log.info("session store ready", backend="sqlite", path=SESSION_STORE_PATH)
+        return SQLiteSessionStore()
+    if kind != "memory":
+        log.warning("unknown SESSION_STORE, using memory", value=kind)
+    return MemorySessionStore()
+
+
+session_store = build_session_store()
@@ -0,0 +1,114 @@
+import os
+import time
+import asyncio
+from contextlib import asynccontextmanager
+
+from . import metrics
+from .logs import get_logger
+
+log = get_logger("supervisor")
+
+
+# ------------------------------
+# 🧯 Per-session task supervision
+# ------------------------------
+# Every background task of a connection is spawned through its
+# SessionSupervisor, so nothing outlives the session: when either relay
+# direction ends the other is cancelled, and close() cancels whatever is
+# left. Tasks that ignore cancellation past the grace period are counted as
+# leaked. Chat-completions side-calls go through side_call(), which caps
+# them per session and across the process.
+
+SESSION_MAX_SIDE_CALLS = int(os.getenv("SESSION_MAX_SIDE_CALLS", "2"))
+GLOBAL_MAX_SIDE_CALLS = int(os.getenv("GLOBAL_MAX_SIDE_CALLS", "64"))
+SESSION_CLOSE_GRACE_SECONDS = float(os.getenv("SESSION_CLOSE_GRACE_SECONDS", "2"))
+
+_global_side_calls = None
+_orphans = set()  # tasks still running after their session closed
+
+
+def _global_semaphore() -> asyncio.Semaphore:
+    global _global_side_calls
+    if _global_side_calls is None:
+        _global_side_calls = asyncio.Semaphore(GLOBAL_MAX_SIDE_CALLS)
+    return _global_side_calls
+
+
+def _orphan_done(task: asyncio.Task):
+    _orphans.discard(task)
+    metrics.ORPHANED_TASKS.dec()
+
+
+class SessionSupervisor:
+    def __init__(self, session_id: str = None, max_side_calls: int = SESSION_MAX_SIDE_CALLS):
+        self.session_id = session_id
+        self._tasks = {}  # task -> kind
+        self._side_calls = asyncio.Semaphore(max_side_calls)
+        self.closed = False
+
+    def spawn(self, coro, kind: str = "task") -> asyncio.Task:
+        """Start `coro` as a task owned by this session."""
+        if self.closed:
+            coro.close()
+            raise RuntimeError("session supervisor is closed")
+        task = asyncio.create_task(coro)
+        self._tasks[task] = kind
+        metrics.BACKGROUND_TASKS.inc(kind=kind)
+        task.add_done_callback(self._task_done)
+        return task
+
+    def _task_done(self, task: asyncio.Task):
+        kind = self._tasks.pop(task, None)
+        if kind is None:
+            return
+        metrics.BACKGROUND_TASKS.dec(kind=kind)
+        # Relay directions log their own errors
+        if kind != "relay" and not task.cancelled() and task.exception() is not None:
+            exc = task.exception()
+            log.error("session task failed", session=self.session_id, kind=kind,
+                      error=f"{type(exc).__name__}: {exc}")
+
+    @asynccontextmanager
+    async def side_call(self, kind: str):
+        """Hold a per-session and a global slot for one upstream side-call."""
+        waited = time.perf_counter()
+        async with self._side_calls:
+            async with _global_semaphore():
+                metrics.SIDE_CALL_WAIT.observe(time.perf_counter() - waited, kind=kind)
+                yield
+
+    async def run_relay(self, *coros):
+        """
+        Run the relay directions until the first one finishes or fails, then
+        cancel the rest so neither side outlives the other.
+        """
+        tasks = [self.spawn(c, kind="relay") for c in coros]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        for task in done:
+            if not task.cancelled() and task.exception() is not None:
+                log.debug("relay direction ended with error", session=self.session_id,
+                          error=str(task.exception()))
+
+    async def close(self, grace: float = SESSION_CLOSE_GRACE_SECONDS):
+        """Cancel every task of the session; count the ones that will not stop."""
+        self.closed = True
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if not tasks:
+            return
+        _, still_running = await asyncio.wait(tasks, timeout=grace)
+        if still_running:
+            metrics.LEAKED_TASKS.inc(len(still_running))
+            log.warning("tasks survived session close", session=self.session_id,
+                        count=len(still_running),
+                        kinds=",".join(sorted({self._tasks.get(t, "?") for t in still_running})))
+            for task in still_running:
+                _orphans.add(task)
+                metrics.ORPHANED_TASKS.inc()
+                task.add_done_callback(_orphan_done)
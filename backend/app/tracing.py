@@ -0,0 +1,157 @@
+import os
+import time
+import uuid
+from collections import deque
+
+
+# ------------------------------
+# ⏱️ Per-turn latency tracing
+# ------------------------------
+# Each conversational turn gets a TurnTrace that stamps its phases with
+# monotonic time (perf_counter). Finished and in-progress turns live in a
+# bounded ring buffer and are exported by GET /admin/traces either as plain
+# JSON or in Chrome trace-event format (load it in chrome://tracing or
+# Perfetto) to see whether a slow turn was spent upstream, in our relay or in
+# the extraction side-calls. Traces carry the session's opaque trace id,
+# never its session id, which is the credential that resumes the session.
+
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "500"))
+
+# Phases in the order they normally happen within a turn
+PHASES = (
+    "end_of_audio",        # client marker (or local VAD end of speech)
+    "audio_commit",        # input_audio_buffer.commit sent upstream
+    "user_transcript",     # input audio transcription completed
+    "response_created",
+    "first_transcript",
+    "first_audio",
+    "response_done",
+    "extraction_start",
+    "extraction_end",
+    "calculations",
+    "email_dispatch",
+    "email_done",
+)
+
+# Named intervals derived from the phase marks: (name, category, start, end)
+SPANS = (
+    ("relay: end_of_audio → commit", "relay", "end_of_audio", "audio_commit"),
+    ("upstream: commit → response.created", "upstream", "audio_commit", "response_created"),
+    ("upstream: commit → first audio", "upstream", "audio_commit", "first_audio"),
+    ("upstream: commit → user transcript", "upstream", "audio_commit", "user_transcript"),
+    ("upstream: response", "upstream", "response_created", "response_done"),
+    ("queue: response.done → extraction", "extraction", "response_done", "extraction_start"),
+    ("extraction", "extraction", "extraction_start", "extraction_end"),
+    ("email", "email", "email_dispatch", "email_done"),
+)
+
+_buffer = deque(maxlen=TRACE_BUFFER_SIZE)
+
+
+class TurnTrace:
+    __slots__ = ("trace_id", "turn", "started_at", "_t0", "marks")
+
+    def __init__(self, trace_id: str, turn: int):
+        self.trace_id = trace_id
+        self.turn = turn
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self.marks = {}
+
+    def mark(self, phase: str):
+        """Record the first occurrence of `phase`, in ms since the turn began."""
+        if phase not in self.marks:
+            self.marks[phase] = (time.perf_counter() - self._t0) * 1000.0
+
+    def spans(self):
+        for name, category, start, end in SPANS:
+            if start in self.marks and end in self.marks:
+                yield name, category, self.marks[start], self.marks[end] - self.marks[start]
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "turn": self.turn,
+            "started_at": self.started_at,
+            "phases_ms": {p: round(self.marks[p], 3) for p in PHASES if p in self.marks},
+            "spans_ms": {name: round(dur, 3) for name, _, _, dur in self.spans()},
+        }
+
+
+class SessionTracer:
+    """
+    Owns the turns of one WebSocket session. A turn starts at the client's
+    end_of_audio; a response that arrives without one (server-side VAD)
+    starts its own turn. Extraction phases are attached through the
+    scheduler version that the turn's response.done produced, since the
+    debounced extraction may run after later turns have begun.
+    """
+
+    def __init__(self, trace_id: str = None, buffer: deque = None):
+        self.trace_id = trace_id or uuid.uuid4().hex[:12]
+        self._buffer = _buffer if buffer is None else buffer
+        self._turns = 0
+        self._by_version = {}
+        self.current = None
+
+    def begin_turn(self) -> TurnTrace:
+        self._turns += 1
+        self.current = TurnTrace(self.trace_id, self._turns)
+        self._buffer.append(self.current)
+        return self.current
+
+    def mark(self, phase: str):
+        if self.current is None or (phase == "response_created" and phase in self.current.marks):
+            self.begin_turn()
+        self.current.mark(phase)
+
+    def bind_version(self, version: int):
+        """Attach the extraction scheduled at `version` to the current turn."""
+        if self.current is not None:
+            self._by_version[version] = self.current
+            # Only the newest handful can still be claimed by the scheduler
+            while len(self._by_version) > 8:
+                self._by_version.pop(next(iter(self._by_version)))
+
+    def mark_version(self, version: int, phase: str):
+        trace = self._by_version.get(version)
+        if trace is not None:
+            trace.mark(phase)
+
+
+def recent_traces(trace_id: str = None, limit: int = None) -> list:
+    traces = [t for t in _buffer if trace_id is None or t.trace_id == trace_id]
+    if limit is not None:
+        traces = traces[-limit:]
+    return traces
+
+
+def to_json(traces) -> list:
+    return [t.to_dict() for t in traces]
+
+
+def to_chrome_trace(traces) -> dict:
+    """
+    Chrome trace-event format: one process per session, one thread per
+    turn, complete ("X") events for the derived spans and instant ("i")
+    events for every phase mark. Timestamps are microseconds.
+    """
+    events = []
+    pids = {}
+    for trace in traces:
+        pid = pids.get(trace.trace_id)
+        if pid is None:
+            pid = pids[trace.trace_id] = len(pids) + 1
+            events.append({"name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+                           "args": {"name": f"session {trace.trace_id}"}})
+        tid = trace.turn
+        base_us = trace.started_at * 1e6
+        events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                       "args": {"name": f"turn {trace.turn}"}})
+        for name, category, start_ms, dur_ms in trace.spans():
+            events.append({"name": name, "cat": category, "ph": "X", "pid": pid, "tid": tid,
+                           "ts": base_us + start_ms * 1000.0, "dur": dur_ms * 1000.0})
+        for phase, at_ms in trace.marks.items():
+            events.append({"name": phase, "cat": "phase", "ph": "i", "s": "t", "pid": pid, "tid": tid,
+                           "ts": base_us + at_ms * 1000.0})
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
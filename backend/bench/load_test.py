@@ -0,0 +1,355 @@
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+import numpy as np
+import aiohttp
+import websockets
+
+from .mock_realtime import MockRealtimeServer
+from .mock_chat import MockChatServer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+from app.audio_pipeline import FRAME_HEADER, FRAME_AUDIO_CHUNK, FRAME_AUDIO_END  # noqa: E402
+
+
+# ------------------------------
+# 🏋️ Load test
+# ------------------------------
+# Starts the mock Realtime and chat-completions servers, launches the app
+# under uvicorn pointed at them, then opens N concurrent client sessions
+# that stream 24 kHz PCM in real time and take several turns each. Reports
+# relay latency per TTS chunk, end_of_audio → first audio per turn, server
+# CPU per session and memory growth. Run from backend/:
+#
+#   python -m bench.load_test --sessions 50 --turns 4 --workers 1
+#
+# CPU and RSS are read from /proc (Linux) for uvicorn and its workers.
+
+FRAME_MS = 20
+FRAME_BYTES = 24000 * 2 * FRAME_MS // 1000
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class ProcessSampler:
+    """CPU seconds and RSS of a process tree, from /proc."""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self._tick = os.sysconf("SC_CLK_TCK")
+        self._page = os.sysconf("SC_PAGE_SIZE")
+        self.rss_samples = []
+
+    def _tree(self):
+        pids = {self.pid}
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            if ppid in pids:
+                pids.add(int(entry))
+        return pids
+
+    def cpu_seconds(self) -> float:
+        total = 0
+        for pid in self._tree():
+            try:
+                with open(f"/proc/{pid}/stat") as f:
+                    fields = f.read().rsplit(")", 1)[1].split()
+                total += int(fields[11]) + int(fields[12])  # utime + stime
+            except (OSError, IndexError, ValueError):
+                pass
+        return total / self._tick
+
+    def rss_bytes(self) -> int:
+        total = 0
+        for pid in self._tree():
+            try:
+                with open(f"/proc/{pid}/statm") as f:
+                    total += int(f.read().split()[1]) * self._page
+            except (OSError, IndexError, ValueError):
+                pass
+        return total
+
+    async def sample_forever(self, interval: float = 0.5):
+        while True:
+            self.rss_samples.append(self.rss_bytes())
+            await asyncio.sleep(interval)
+
+
+class SessionStats:
+    def __init__(self):
+        self.relay_ms = []       # mock send → client receive, per audio chunk
+        self.first_audio_ms = []  # end_of_audio → first audio chunk, per turn
+        self.turns_ok = 0
+        self.turns_failed = 0
+        self.sessions_ok = 0
+        self.sessions_failed = 0
+        self.errors = {}
+
+    def error(self, e: Exception):
+        key = type(e).__name__
+        self.errors[key] = self.errors.get(key, 0) + 1
+
+
+async def run_session(url: str, args, stats: SessionStats):
+    pcm_frame = bytes(FRAME_BYTES)
+    try:
+        async with websockets.connect(url, max_size=None) as ws:
+            await ws.send(json.dumps({
+                "type": "config",
+                "audio_framing": "binary_v1",
+                "encoding": "pcm16",
+                "sample_rate": 24000,
+                "channels": 1,
+            }))
+            turn_done = asyncio.Event()
+            turn_started = {"at": None, "first": None}
+
+            async def reader():
+                async for msg in ws:
+                    if isinstance(msg, str):
+                        continue
+                    now_ns = time.time_ns()
+                    _, frame_type, _, _ = FRAME_HEADER.unpack_from(msg)
+                    if frame_type == FRAME_AUDIO_CHUNK:
+                        payload = msg[FRAME_HEADER.size:]
+                        if len(payload) >= 8:
+                            stats.relay_ms.append((now_ns - int.from_bytes(payload[:8], "little")) / 1e6)
+                        if turn_started["at"] is not None and turn_started["first"] is None:
+                            turn_started["first"] = time.perf_counter()
+                            stats.first_audio_ms.append((turn_started["first"] - turn_started["at"]) * 1000)
+                    elif frame_type == FRAME_AUDIO_END:
+                        turn_done.set()
+
+            reader_task = asyncio.create_task(reader())
+            try:
+                for _ in range(args.turns):
+                    # Speak in real time, then hand the turn over
+                    frames = int(args.utterance_s * 1000 / FRAME_MS)
+                    start = time.perf_counter()
+                    for i in range(frames):
+                        await ws.send(pcm_frame)
+                        delay = start + (i + 1) * FRAME_MS / 1000 - time.perf_counter()
+                        if delay > 0:
+                            await asyncio.sleep(delay)
+
+                    turn_done.clear()
+                    turn_started["at"], turn_started["first"] = time.perf_counter(), None
+                    await ws.send(b"end_of_audio")
+                    try:
+                        await asyncio.wait_for(turn_done.wait(), timeout=args.turn_timeout)
+                        stats.turns_ok += 1
+                    except asyncio.TimeoutError as e:
+                        stats.turns_failed += 1
+                        stats.error(e)
+                    await asyncio.sleep(args.think_s)
+            finally:
+                reader_task.cancel()
+        stats.sessions_ok += 1
+    except Exception as e:
+        stats.sessions_failed += 1
+        stats.error(e)
+
+
+def _percentiles(values, qs=(50, 99)):
+    if not values:
+        return {f"p{q}": None for q in qs} | {"max": None}
+    arr = np.asarray(values)
+    out = {f"p{q}": round(float(np.percentile(arr, q)), 2) for q in qs}
+    out["max"] = round(float(arr.max()), 2)
+    return out
+
+
+async def wait_until_up(base_url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(f"{base_url}/metrics") as resp:
+                    if resp.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"server at {base_url} did not come up in {timeout}s")
+
+
+async def server_gauges(base_url: str) -> dict:
+    """Session and task gauges from /metrics; non-zero after the run means leaks."""
+    wanted = {"loan_ws_sessions_active", "loan_orphaned_tasks", "loan_leaked_tasks_total"}
+    out = {}
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{base_url}/metrics") as resp:
+            for line in (await resp.text()).splitlines():
+                name, _, value = line.partition(" ")
+                if name in wanted:
+                    out[name.removeprefix("loan_")] = float(value)
+    return out
+
+
+async def run(args) -> dict:
+    realtime = MockRealtimeServer(args.first_audio_ms, args.chunk_ms, args.audio_rate,
+                                  speech_seconds=args.speech_s)
+    chat = MockChatServer(args.chat_latency_ms, args.chat_jitter_ms)
+    rt_port, chat_port = args.realtime_port or _free_port(), args.chat_port or _free_port()
+    rt_server = await realtime.serve(port=rt_port)
+    chat_runner = await chat.serve(port=chat_port)
+
+    proc = None
+    if args.server_url:
+        ws_url = args.server_url
+        base_url = ws_url.replace("ws", "http", 1).split("/realtime")[0]
+        pid = args.pid
+    else:
+        port = _free_port()
+        env = {
+            **os.environ,
+            "OPENAI_API_KEY": "bench",
+            "OPENAI_REALTIME_URL": f"ws://127.0.0.1:{rt_port}",
+            "OPENAI_CHAT_URL": f"http://127.0.0.1:{chat_port}/v1/chat/completions",
+            "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+            "EMAIL_OUTBOX_PATH": "",
+            "EMAIL_MAX_ATTEMPTS": "1",
+            "SMTP_HOST": "127.0.0.1",
+            "SMTP_PORT": "9",
+            "SMTP_SECURITY": "none",
+        }
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+             "--workers", str(args.workers), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=env,
+        )
+        ws_url = f"ws://127.0.0.1:{port}/realtime/ws/realtime"
+        base_url = f"http://127.0.0.1:{port}"
+        pid = proc.pid
+
+    try:
+        await wait_until_up(base_url)
+        sampler = ProcessSampler(pid) if pid else None
+        sampler_task = asyncio.create_task(sampler.sample_forever()) if sampler else None
+        await asyncio.sleep(0.5)
+        rss_start = sampler.rss_bytes() if sampler else None
+        cpu_start = sampler.cpu_seconds() if sampler else None
+
+        stats = SessionStats()
+        started = time.perf_counter()
+        tasks = []
+        for i in range(args.sessions):
+            tasks.append(asyncio.create_task(run_session(ws_url, args, stats)))
+            if args.ramp_s:
+                await asyncio.sleep(args.ramp_s / args.sessions)
+        await asyncio.gather(*tasks)
+        wall = time.perf_counter() - started
+
+        await asyncio.sleep(args.settle_s)
+        gauges = await server_gauges(base_url)
+        cpu_used = sampler.cpu_seconds() - cpu_start if sampler else None
+        rss_end = sampler.rss_bytes() if sampler else None
+        if sampler_task:
+            sampler_task.cancel()
+
+        workers = args.workers if not args.server_url else None
+        report = {
+            "sessions": args.sessions,
+            "workers": workers,
+            "sessions_per_worker": round(args.sessions / workers, 1) if workers else None,
+            "sessions_ok": stats.sessions_ok,
+            "sessions_failed": stats.sessions_failed,
+            "turns_ok": stats.turns_ok,
+            "turns_failed": stats.turns_failed,
+            "errors": stats.errors,
+            "wall_s": round(wall, 2),
+            "relay_chunk_latency_ms": _percentiles(stats.relay_ms),
+            "first_audio_latency_ms": _percentiles(stats.first_audio_ms),
+            "mock_first_audio_ms": args.first_audio_ms,
+            "after_run": gauges,
+            "chat_requests": chat.requests,
+            "chat_prompt_chars_avg": round(chat.prompt_chars / chat.requests) if chat.requests else 0,
+            "chat_cached_tokens": chat.cached_tokens,
+        }
+        if sampler:
+            session_seconds = args.sessions * wall
+            report.update({
+                "server_cpu_s": round(cpu_used, 2),
+                "server_cpu_pct_of_core": round(100 * cpu_used / wall, 1),
+                "cpu_ms_per_session_second": round(1000 * cpu_used / session_seconds, 3),
+                "est_sessions_per_core": round(session_seconds / cpu_used) if cpu_used else None,
+                "rss_start_mb": round(rss_start / 2**20, 1),
+                "rss_peak_mb": round(max(sampler.rss_samples + [rss_end]) / 2**20, 1),
+                "rss_end_mb": round(rss_end / 2**20, 1),
+                "rss_growth_kb_per_session": round((rss_end - rss_start) / 1024 / args.sessions, 1),
+            })
+        return report
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        rt_server.close()
+        await chat_runner.cleanup()
+
+
+def print_report(report: dict):
+    width = max(len(k) for k in report)
+    for key, value in report.items():
+        if isinstance(value, dict):
+            value = "  ".join(f"{k}={v}" for k, v in value.items()) or "-"
+        print(f"{key:<{width}}  {value}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for the realtime relay")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers to launch")
+    parser.add_argument("--utterance-s", type=float, default=2.0, help="client speech per turn")
+    parser.add_argument("--think-s", type=float, default=0.5, help="pause between turns")
+    parser.add_argument("--ramp-s", type=float, default=2.0, help="spread session starts over this long")
+    parser.add_argument("--settle-s", type=float, default=2.0, help="wait before the final memory sample")
+    parser.add_argument("--turn-timeout", type=float, default=30.0)
+    parser.add_argument("--first-audio-ms", type=float, default=300, help="mock model latency")
+    parser.add_argument("--speech-s", type=float, default=3.0, help="mock TTS length per response")
+    parser.add_argument("--chunk-ms", type=float, default=100)
+    parser.add_argument("--audio-rate", type=float, default=2.0, help="mock TTS speed vs real time")
+    parser.add_argument("--chat-latency-ms", type=float, default=600)
+    parser.add_argument("--chat-jitter-ms", type=float, default=200)
+    parser.add_argument("--realtime-port", type=int, default=0, help="mock Realtime port (0 = any free)")
+    parser.add_argument("--chat-port", type=int, default=0, help="mock chat-completions port (0 = any free)")
+    parser.add_argument("--server-url", help="drive an already running server (started with "
+                        "OPENAI_REALTIME_URL/OPENAI_CHAT_URL pointing at the mock ports) instead of launching one")
+    parser.add_argument("--pid", type=int, help="process to sample when using --server-url")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--max-relay-p99-ms", type=float, help="exit 1 if relay p99 exceeds this")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    p99 = report["relay_chunk_latency_ms"]["p99"]
+    if args.max_relay_p99_ms is not None and (p99 is None or p99 > args.max_relay_p99_ms):
+        print(f"relay p99 {p99} ms exceeds {args.max_relay_p99_ms} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import json
+import random
+import asyncio
+import argparse
+from aiohttp import web
+
+
+# ------------------------------
+# 🎭 Mock chat-completions API
+# ------------------------------
+# POST /v1/chat/completions with a configurable latency (plus jitter). It
+# returns a structured-output message in the extraction schema, filling in
+# values whose cue words appear in the conversation (the last message), and
+# a usage block. Like the real API it reports cached prompt tokens: the
+# messages before the last two count as cached once the same prefix of at
+# least 1024 tokens has been seen, in 128-token steps.
+
+FIELD_TYPES = (
+    "first_name", "date_of_birth", "monthly_salary", "phone_number",
+    "email_address", "loan_amount", "loan_tenure_years",
+)
+
+_CANNED = {
+    "first_name": ("name", "Ardra"),
+    "monthly_salary": ("salary", 75000),
+    "loan_amount": ("lakh", 3000000),
+    "loan_tenure_years": ("years", 20),
+    "email_address": ("gmail", "ardra@gmail.com"),
+}
+
+
+class MockChatServer:
+    def __init__(self, latency_ms: float = 600, jitter_ms: float = 200):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.requests = 0
+        self.prompt_chars = 0
+        self.cached_tokens = 0
+        self._prefixes = set()
+
+    async def completions(self, request):
+        body = await request.json()
+        self.requests += 1
+        messages = body.get("messages", [])
+        prompt = " ".join(m.get("content", "") for m in messages)
+        self.prompt_chars += len(prompt)
+        prefix = json.dumps(messages[:-2]) + json.dumps(body.get("response_format"))
+        prefix_tokens = len(prefix) // 4
+        cached = 0
+        if prefix_tokens >= 1024 and prefix in self._prefixes:
+            cached = prefix_tokens // 128 * 128
+        self._prefixes.add(prefix)
+        self.cached_tokens += cached
+        await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+
+        content = {name: {"value": None, "confirmed": False} for name in FIELD_TYPES}
+        lowered = (messages[-1].get("content", "") if messages else "").lower()
+        for name, (cue, value) in _CANNED.items():
+            if cue in lowered:
+                content[name] = {"value": value, "confirmed": False}
+        content["email_consent"] = False
+        return web.json_response({
+            "choices": [{"message": {"role": "assistant", "content": json.dumps(content)}}],
+            "usage": {
+                "prompt_tokens": (len(prefix) + len(json.dumps(messages[-2:]))) // 4,
+                "completion_tokens": 120,
+                "prompt_tokens_details": {"cached_tokens": cached},
+            },
+        })
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 9102):
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.completions)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI chat-completions endpoint")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9102)
+    parser.add_argument("--latency-ms", type=float, default=600)
+    parser.add_argument("--jitter-ms", type=float, default=200)
+    args = parser.parse_args()
+
+    async def run():
+        await MockChatServer(args.latency_ms, args.jitter_ms).serve(args.host, args.port)
+        print(f"mock chat-completions on http://{args.host}:{args.port}/v1/chat/completions")
+        await asyncio.Future()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import json
+import time
+import base64
+import asyncio
+import argparse
+import websockets
+
+
+# ------------------------------
+# 🎭 Mock Realtime API
+# ------------------------------
+# Answers every response.create with a scripted response streamed at a
+# realistic pace: response.created, word-by-word transcript deltas and
+# 24 kHz PCM16 audio deltas, then response.audio.done / response.done.
+# The first 8 bytes of every audio chunk carry the wall-clock send time
+# (ns) so the load driver can measure how long the relay held each chunk.
+# When the session enables input audio transcription, every committed
+# buffer is answered with a scripted user transcript.
+
+SCRIPT = [
+    "Hello! I'm your Home Loan EMI Assistant. May I know your name?",
+    "Thanks. What is your monthly salary?",
+    "Got it, a monthly salary of 75000 rupees. How much would you like to borrow?",
+    "A loan of 30 lakh. And for how many years?",
+    "20 years, noted. Could you share your email address for the report?",
+    "So your email is ardra at gmail dot com. Shall I email you the report?",
+]
+
+USER_SCRIPT = [
+    "Hi, my name is Ardra.",
+    "I earn 75000 a month.",
+    "I'd like to borrow 30 lakh.",
+    "For 20 years.",
+    "It's ardra at gmail dot com.",
+    "Yes, please email it.",
+]
+
+SAMPLE_RATE = 24000
+BYTES_PER_SECOND = SAMPLE_RATE * 2
+
+
+class MockRealtimeServer:
+    def __init__(
+        self,
+        first_audio_ms: float = 300,
+        chunk_ms: float = 100,
+        audio_rate: float = 2.0,
+        words_per_second: float = 12.0,
+        speech_seconds: float = 3.0,
+        transcription_ms: float = 200,
+    ):
+        self.first_audio = first_audio_ms / 1000
+        self.chunk_ms = chunk_ms
+        self.audio_rate = audio_rate  # >1 streams faster than real time, like the real API
+        self.word_gap = 1 / words_per_second
+        self.speech_seconds = speech_seconds
+        self.transcription_delay = transcription_ms / 1000
+        self.sessions = 0
+        self.appended_bytes = 0
+        self.responses = 0
+
+    async def handler(self, ws):
+        self.sessions += 1
+        turn = 0
+        commits = 0
+        transcribe = False
+        streams = set()
+        try:
+            async for msg in ws:
+                event = json.loads(msg)
+                kind = event.get("type")
+                if kind == "session.update":
+                    transcribe = bool(event.get("session", {}).get("input_audio_transcription"))
+                    await ws.send(json.dumps({"type": "session.updated"}))
+                elif kind == "input_audio_buffer.append":
+                    self.appended_bytes += len(event.get("audio", "")) * 3 // 4
+                elif kind == "input_audio_buffer.commit":
+                    item_id = f"item_{commits}"
+                    await ws.send(json.dumps({"type": "input_audio_buffer.committed", "item_id": item_id}))
+                    if transcribe:
+                        task = asyncio.create_task(self._transcribe(ws, item_id, commits))
+                        streams.add(task)
+                        task.add_done_callback(streams.discard)
+                    commits += 1
+                elif kind == "response.create":
+                    turn += 1
+                    task = asyncio.create_task(self._respond(ws, turn))
+                    streams.add(task)
+                    task.add_done_callback(streams.discard)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            for task in streams:
+                task.cancel()
+
+    async def _transcribe(self, ws, item_id: str, index: int):
+        await asyncio.sleep(self.transcription_delay)
+        await ws.send(json.dumps({
+            "type": "conversation.item.input_audio_transcription.completed",
+            "item_id": item_id,
+            "transcript": USER_SCRIPT[index % len(USER_SCRIPT)],
+        }))
+
+    async def _respond(self, ws, turn: int):
+        response_id = f"resp_{turn}"
+        text = SCRIPT[(turn - 1) % len(SCRIPT)]
+        await ws.send(json.dumps({"type": "response.created", "response": {"id": response_id}}))
+        await asyncio.sleep(self.first_audio)
+
+        chunk_bytes = int(BYTES_PER_SECOND * self.chunk_ms / 1000) & ~1
+        n_chunks = max(1, int(self.speech_seconds * 1000 / self.chunk_ms))
+        words = text.split(" ")
+        chunk_gap = self.chunk_ms / 1000 / self.audio_rate
+        next_word = 0
+        started = time.perf_counter()
+        for i in range(n_chunks):
+            # Interleave transcript words with audio at their own pace
+            elapsed = time.perf_counter() - started
+            while next_word < len(words) and next_word * self.word_gap <= elapsed:
+                await ws.send(json.dumps({"type": "response.audio_transcript.delta", "delta": words[next_word]}))
+                next_word += 1
+            pcm = time.time_ns().to_bytes(8, "little") + bytes(chunk_bytes - 8)
+            await ws.send(json.dumps({
+                "type": "response.audio.delta",
+                "response_id": response_id,
+                "delta": base64.b64encode(pcm).decode("ascii"),
+            }))
+            await asyncio.sleep(chunk_gap)
+        for word in words[next_word:]:
+            await ws.send(json.dumps({"type": "response.audio_transcript.delta", "delta": word}))
+
+        await ws.send(json.dumps({"type": "response.audio.done", "response_id": response_id}))
+        await ws.send(json.dumps({"type": "response.done", "response": {"id": response_id, "output": []}}))
+        self.responses += 1
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 9101):
+        return await websockets.serve(self.handler, host, port, max_size=None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI Realtime WebSocket")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9101)
+    parser.add_argument("--first-audio-ms", type=float, default=300)
+    parser.add_argument("--chunk-ms", type=float, default=100)
+    parser.add_argument("--audio-rate", type=float, default=2.0)
+    parser.add_argument("--speech-seconds", type=float, default=3.0)
+    parser.add_argument("--transcription-ms", type=float, default=200)
+    args = parser.parse_args()
+
+    async def run():
+        server = MockRealtimeServer(args.first_audio_ms, args.chunk_ms, args.audio_rate,
+                                    speech_seconds=args.speech_seconds, transcription_ms=args.transcription_ms)
+        await server.serve(args.host, args.port)
+        print(f"mock realtime on ws://{args.host}:{args.port}")
+        await asyncio.Future()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
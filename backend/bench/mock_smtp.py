@@ -0,0 +1,120 @@
+import asyncio
+import argparse
+
+
+# ------------------------------
+# 🎭 Mock SMTP server
+# ------------------------------
+# Enough of SMTP (EHLO/HELO, MAIL, RCPT, DATA, NOOP, RSET, QUIT) for the
+# email outbox, without TLS; AUTH PLAIN accepts any credentials unless
+# `reject_auth` is set. Accepted messages are kept in memory. Recipients listed in `reject` are refused with a permanent
+# 550 error. `fail_next` refuses that many messages with a transient 451,
+# and `drop_next` closes that many connections before MAIL, so retries and
+# reconnects can be exercised too.
+
+
+class MockSMTPServer:
+    def __init__(self, reject=(), fail_next: int = 0, drop_next: int = 0, reject_auth: bool = False):
+        self.reject = set(reject)
+        self.reject_auth = reject_auth
+        self.fail_next = fail_next
+        self.drop_next = drop_next
+        self.messages = []  # (mail_from, [rcpt], data)
+        self.connections = 0
+        self.closed = 0  # connections that have ended, by either side
+        self._received = asyncio.Event()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+
+        async def reply(line: str):
+            writer.write(line.encode() + b"\r\n")
+            await writer.drain()
+
+        mail_from, rcpts = None, []
+        await reply("220 mock-smtp ready")
+        try:
+            while True:
+                raw = await reader.readline()
+                if not raw:
+                    return
+                line = raw.decode(errors="replace").rstrip("\r\n")
+                verb = line[:4].upper()
+                if verb == "EHLO":
+                    await reply("250-mock-smtp")
+                    await reply("250 AUTH PLAIN")
+                elif verb == "HELO":
+                    await reply("250 mock-smtp")
+                elif verb == "AUTH":
+                    await reply("535 Authentication failed" if self.reject_auth else "235 Authenticated")
+                elif verb == "MAIL":
+                    if self.drop_next:
+                        self.drop_next -= 1
+                        return
+                    mail_from, rcpts = line[10:].strip(), []
+                    await reply("250 OK")
+                elif verb == "RCPT":
+                    rcpt = line[8:].strip().strip("<>")
+                    if rcpt in self.reject:
+                        await reply("550 No such user")
+                    else:
+                        rcpts.append(rcpt)
+                        await reply("250 OK")
+                elif verb == "DATA":
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    lines = []
+                    while True:
+                        data_line = await reader.readline()
+                        if not data_line or data_line in (b".\r\n", b".\n"):
+                            break
+                        lines.append(data_line)
+                    if self.fail_next:
+                        self.fail_next -= 1
+                        await reply("451 Try again later")
+                    else:
+                        self.messages.append((mail_from, rcpts, b"".join(lines).decode(errors="replace")))
+                        self._received.set()
+                        await reply("250 OK queued")
+                elif verb in ("NOOP", "RSET"):
+                    await reply("250 OK")
+                elif verb == "QUIT":
+                    await reply("221 Bye")
+                    return
+                else:
+                    await reply("502 Command not implemented")
+        except ConnectionError:
+            pass
+        finally:
+            self.closed += 1
+            writer.close()
+
+    async def wait_for(self, count: int, timeout: float = 5.0):
+        """Wait until `count` messages were accepted."""
+        async def wait():
+            while len(self.messages) < count:
+                self._received.clear()
+                await self._received.wait()
+        await asyncio.wait_for(wait(), timeout)
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 1025):
+        return await asyncio.start_server(self._handle, host, port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock SMTP server for the email outbox")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    parser.add_argument("--reject", action="append", default=[], help="recipient to refuse with 550")
+    args = parser.parse_args()
+
+    async def run():
+        server = MockSMTPServer(reject=args.reject)
+        await server.serve(args.host, args.port)
+        print(f"mock SMTP on {args.host}:{args.port}")
+        await asyncio.Future()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
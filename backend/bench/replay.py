@@ -0,0 +1,273 @@
+import os
+import sys
+import json
+import base64
+import time
+import asyncio
+import argparse
+import subprocess
+import websockets
+
+from .mock_chat import MockChatServer
+from .load_test import (
+    BACKEND_DIR, ProcessSampler, _free_port, _percentiles, print_report, server_gauges, wait_until_up,
+)
+
+sys.path.insert(0, BACKEND_DIR)
+from app import recorder as rec  # noqa: E402
+
+
+# ------------------------------
+# 🔁 Session replay
+# ------------------------------
+# Feeds a session recorded with SESSION_RECORD_DIR back through the relay,
+# extraction and calculation pipeline. The app runs under uvicorn against
+# local stubs:
+#   - the Realtime stub answers the relay with the recorded Realtime events;
+#   - the chat-completions mock answers extraction.
+# The client side is replayed from the recorded client messages. Realtime
+# events are grouped by the relay message that preceded them (commit,
+# response.create, function output), and each group is only released when
+# the relay sends that message again, so causality holds at any speed.
+# Run from backend/:
+#
+#   python -m bench.replay recordings/<session>.lrec              # 1× speed
+#   python -m bench.replay recordings/<session>.lrec --speed 0    # as fast as possible
+#   python -m bench.replay recordings/<session>.lrec --dump       # list the frames
+
+# Relay messages that start a new group of Realtime events
+TRIGGERS = {"input_audio_buffer.commit", "response.create", "conversation.item.create"}
+
+
+def _event_type(payload) -> str:
+    try:
+        return json.loads(bytes(payload)).get("type", "?")
+    except ValueError:
+        return "?"
+
+
+def _is_end_of_audio(kind: int, payload: bytes) -> bool:
+    if kind == rec.CLIENT_AUDIO:
+        return payload == b"end_of_audio"
+    text = payload.decode(errors="replace")
+    return text == "end_of_audio" or (text.startswith("{") and _event_type(payload) == "end_of_audio")
+
+
+class Script:
+    """A recording split into the client's messages and the Realtime groups."""
+
+    def __init__(self, path: str):
+        recording = rec.Recording(path)
+        self.session_id = recording.session_id
+        self.client = []               # (t_s, kind, payload)
+        self.groups = [[]]             # per trigger: [(t_s, message)]
+        self.trigger_times = [0.0]
+        self.recorded_first_audio_ms = []
+        self.upstream_audio_bytes = 0
+        pending_turn = None
+        for kind, t_ns, payload in recording.frames():
+            t = t_ns / 1e9
+            if kind in (rec.CLIENT_TEXT, rec.CLIENT_AUDIO):
+                data = bytes(payload)
+                self.client.append((t, kind, data))
+                if _is_end_of_audio(kind, data):
+                    pending_turn = t
+            elif kind == rec.UPSTREAM_AUDIO:
+                self.upstream_audio_bytes += len(payload)
+            elif kind == rec.UPSTREAM_EVENT and _event_type(payload) in TRIGGERS:
+                self.groups.append([])
+                self.trigger_times.append(t)
+            elif kind in (rec.REALTIME_EVENT, rec.REALTIME_AUDIO):
+                self.groups[-1].append((t, rec.realtime_message(kind, payload)))
+                if kind == rec.REALTIME_AUDIO and pending_turn is not None:
+                    self.recorded_first_audio_ms.append((t - pending_turn) * 1000)
+                    pending_turn = None
+            del payload
+        recording.close()
+
+
+class ReplayRealtimeServer:
+    def __init__(self, script: Script, speed: float):
+        self.script = script
+        self.speed = speed
+        self.triggers = 0
+        self.sent = 0
+        self.upstream_audio_bytes = 0
+        self._tasks = set()
+
+    def _release(self, ws, index: int):
+        if index >= len(self.script.groups):
+            return
+        task = asyncio.create_task(self._send_group(ws, index))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send_group(self, ws, index: int):
+        started = time.perf_counter()
+        base = self.script.trigger_times[index]
+        for t, message in self.script.groups[index]:
+            if self.speed > 0:
+                delay = started + (t - base) / self.speed - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await ws.send(message)
+            self.sent += 1
+
+    async def handler(self, ws):
+        self._release(ws, 0)
+        try:
+            async for msg in ws:
+                event = json.loads(msg)
+                kind = event.get("type")
+                if kind == "session.update":
+                    await ws.send(json.dumps({"type": "session.updated"}))
+                elif kind == "input_audio_buffer.append":
+                    self.upstream_audio_bytes += len(base64.b64decode(event.get("audio", "")))
+                if kind in TRIGGERS:
+                    self.triggers += 1
+                    self._release(ws, self.triggers)
+        except websockets.ConnectionClosed:
+            pass
+
+
+async def replay_client(url: str, script: Script, speed: float, settle: float) -> dict:
+    first_audio_ms = []
+    received = {"audio": 0, "json": 0}
+    last_activity = {"at": time.perf_counter()}
+    turn = {"at": None}
+
+    async with websockets.connect(url, max_size=None) as ws:
+        async def reader():
+            async for msg in ws:
+                last_activity["at"] = time.perf_counter()
+                if isinstance(msg, bytes):
+                    received["audio"] += 1
+                    if turn["at"] is not None:
+                        first_audio_ms.append((time.perf_counter() - turn["at"]) * 1000)
+                        turn["at"] = None
+                else:
+                    received["json"] += 1
+
+        reader_task = asyncio.create_task(reader())
+        started = time.perf_counter()
+        first_t = script.client[0][0] if script.client else 0.0
+        for i, (t, kind, data) in enumerate(script.client):
+            if speed > 0:
+                delay = started + (t - first_t) / speed - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            if i == 0 and kind == rec.CLIENT_TEXT:
+                # A fresh session, not a resume of the recorded one
+                config = json.loads(data)
+                config.pop("session_id", None)
+                await ws.send(json.dumps(config))
+                continue
+            if _is_end_of_audio(kind, data):
+                turn["at"] = time.perf_counter()
+            await ws.send(data if kind == rec.CLIENT_AUDIO else data.decode())
+        # Let the remaining responses and extraction finish
+        while time.perf_counter() - last_activity["at"] < settle:
+            await asyncio.sleep(0.05)
+        reader_task.cancel()
+
+    return {"first_audio_ms": first_audio_ms, "received": received}
+
+
+async def run(args) -> dict:
+    script = Script(args.recording)
+    realtime = ReplayRealtimeServer(script, args.speed)
+    chat = MockChatServer(args.chat_latency_ms, args.chat_jitter_ms)
+    rt_port, chat_port, port = _free_port(), _free_port(), _free_port()
+    rt_server = await websockets.serve(realtime.handler, "127.0.0.1", rt_port, max_size=None)
+    chat_runner = await chat.serve(port=chat_port)
+
+    env = {
+        **os.environ,
+        "OPENAI_API_KEY": "replay",
+        "OPENAI_REALTIME_URL": f"ws://127.0.0.1:{rt_port}",
+        "OPENAI_CHAT_URL": f"http://127.0.0.1:{chat_port}/v1/chat/completions",
+        "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+        # One upstream connection per replayed session
+        "REALTIME_POOL_SIZE": "0",
+        "SESSION_RECORD_DIR": "",
+        "EMAIL_OUTBOX_PATH": "",
+        "EMAIL_MAX_ATTEMPTS": "1",
+        "SMTP_HOST": "127.0.0.1",
+        "SMTP_PORT": "9",
+        "SMTP_SECURITY": "none",
+    }
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        await wait_until_up(base_url)
+        sampler = ProcessSampler(proc.pid)
+        cpu_start = sampler.cpu_seconds()
+        started = time.perf_counter()
+        result = await replay_client(f"ws://127.0.0.1:{port}/realtime/ws/realtime", script, args.speed, args.settle_s)
+        wall = time.perf_counter() - started
+        cpu_used = sampler.cpu_seconds() - cpu_start
+        return {
+            "recording": os.path.basename(args.recording),
+            "speed": args.speed or "max",
+            "client_messages": len(script.client),
+            "realtime_groups": f"{realtime.triggers + 1}/{len(script.groups)} released",
+            "realtime_events_sent": realtime.sent,
+            "upstream_audio_bytes": f"{realtime.upstream_audio_bytes} (recorded {script.upstream_audio_bytes})",
+            "wall_s": round(wall, 2),
+            "recorded_first_audio_ms": _percentiles(script.recorded_first_audio_ms),
+            "replay_first_audio_ms": _percentiles(result["first_audio_ms"]),
+            "client_received": result["received"],
+            "chat_requests": chat.requests,
+            "server_cpu_s": round(cpu_used, 2),
+            "after_run": await server_gauges(base_url),
+        }
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        rt_server.close()
+        await chat_runner.cleanup()
+
+
+def dump(path: str):
+    recording = rec.Recording(path)
+    print(f"session {recording.session_id}  started {time.ctime(recording.started_ns / 1e9)}")
+    for kind, t_ns, payload in recording.frames():
+        name = rec.KIND_NAMES.get(kind, str(kind))
+        detail = _event_type(payload) if kind in (rec.UPSTREAM_EVENT, rec.REALTIME_EVENT) else ""
+        if kind == rec.CLIENT_TEXT:
+            detail = bytes(payload[:60]).decode(errors="replace")
+        print(f"{t_ns / 1e6:10.1f} ms  {name:<15} {len(payload):>7} B  {detail}")
+        del payload
+    recording.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded session through the relay")
+    parser.add_argument("recording", help=".lrec file written with SESSION_RECORD_DIR")
+    parser.add_argument("--speed", type=float, default=1.0, help="1 = recorded pace, 0 = as fast as possible")
+    parser.add_argument("--chat-latency-ms", type=float, default=600)
+    parser.add_argument("--chat-jitter-ms", type=float, default=0)
+    parser.add_argument("--settle-s", type=float, default=2.0, help="quiet time that ends the replay")
+    parser.add_argument("--dump", action="store_true", help="list the recorded frames and exit")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    if args.dump:
+        dump(args.recording)
+        return
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+def test_admin_endpoints_are_closed_without_a_token(client, monkeypatch):
+    monkeypatch.setattr(main, "ADMIN_TOKEN", None)
+    assert client.get("/admin/traces").status_code == 403
+    assert client.post("/loan/score", content=b"name,salary\n").status_code == 403
+
+
+def test_admin_endpoints_check_the_token(client, monkeypatch):
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+    assert client.get("/admin/traces").status_code == 401
+    assert client.get("/admin/traces", headers={"x-admin-token": "wrong"}).status_code == 401
+    response = client.get("/admin/traces", headers={"x-admin-token": "secret"})
+    assert response.status_code == 200
+    assert "traces" in response.json()
@@ -0,0 +1,144 @@
+import json
+import base64
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.audio_pipeline import (
+    AUDIO_FRAMING_BINARY_V1, REALTIME_SAMPLE_RATE, DownstreamAudioFramer, PolyphaseResampler,
+    UpstreamAudioBatcher, VoiceActivityDetector, build_normaliser, client_audio_format, negotiate_audio_framing,
+)
+
+
+def test_default_format():
+    assert client_audio_format({}) == (REALTIME_SAMPLE_RATE, 1)
+    assert client_audio_format({"sample_rate": "16000", "channels": 2}) == (16000, 2)
+
+
+@pytest.mark.parametrize("cfg", [
+    {"sample_rate": 0},
+    {"channels": 0},
+    {"sample_rate": -16000},
+    {"sample_rate": None},
+    {"sample_rate": 16000.5},
+    {"channels": "two"},
+    {"channels": True},
+])
+def test_invalid_format_is_a_value_error(cfg):
+    with pytest.raises(ValueError):
+        client_audio_format(cfg)
+    with pytest.raises(ValueError):
+        build_normaliser(cfg)
+
+
+def _tone(freq: float, seconds: float, rate: int, amplitude: float = 0.5) -> np.ndarray:
+    t = np.arange(int(seconds * rate)) / rate
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def _rms(x: np.ndarray) -> float:
+    return float(np.sqrt(np.mean(x.astype(np.float64) ** 2)))
+
+
+def test_resampler_chunks_match_one_shot():
+    signal = _tone(440, 0.5, 48000) + _tone(3000, 0.5, 48000, 0.2)
+    whole = PolyphaseResampler(48000, 24000).process(signal)
+
+    chunked = PolyphaseResampler(48000, 24000)
+    rng = np.random.default_rng(0)
+    pieces, start = [], 0
+    while start < signal.size:
+        size = int(rng.integers(1, 1500))
+        pieces.append(chunked.process(signal[start:start + size]))
+        start += size
+    assert np.allclose(np.concatenate(pieces), whole, atol=1e-5)
+    assert whole.size == signal.size // 2
+
+
+def test_resampler_suppresses_content_above_the_new_nyquist():
+    resampler = PolyphaseResampler(48000, 24000)
+    passed = resampler.process(_tone(1000, 0.5, 48000))
+    aliased = PolyphaseResampler(48000, 24000).process(_tone(14000, 0.5, 48000))
+    # Skip the filter's start-up transient
+    assert _rms(passed[200:]) == pytest.approx(0.5 / np.sqrt(2), rel=0.05)
+    assert _rms(aliased[200:]) < 0.01 * _rms(passed[200:])
+
+
+def _pcm(samples: np.ndarray) -> bytes:
+    return np.clip(samples, -32768, 32767).astype("<i2").tobytes()
+
+
+def test_vad_speech_start_end_and_hangover():
+    rate, frame_ms, hangover_ms = 24000, 20, 200
+    vad = VoiceActivityDetector(mode="detect", sample_rate=rate, frame_ms=frame_ms, hangover_ms=hangover_ms)
+    rng = np.random.default_rng(1)
+    noise = lambda seconds: rng.normal(0, 20, int(seconds * rate))  # noqa: E731
+    audio = np.concatenate([noise(0.4), _tone(300, 0.4, rate, 8000), noise(0.6)])
+
+    events = []
+    frame = vad.frame_bytes
+    pcm = _pcm(audio)
+    for i in range(len(pcm) // frame):
+        forwarded, new_events = vad.process(pcm[i * frame:(i + 1) * frame])
+        assert forwarded == pcm[i * frame:(i + 1) * frame]  # "detect" never drops audio
+        events.extend((event, i) for event in new_events)
+
+    speech_frames = range(20, 40)  # 0.4 s of noise, then 0.4 s of tone, in 20 ms frames
+    assert [event for event, _ in events] == ["speech_start", "speech_end"]
+    start_frame, end_frame = events[0][1], events[1][1]
+    assert start_frame == speech_frames.start + vad.onset_frames - 1
+    # Speech ends after exactly the hangover of silence, not at the first quiet frame
+    assert end_frame == speech_frames.stop + hangover_ms // frame_ms - 1
+
+
+def test_vad_gate_keeps_only_preroll_before_speech():
+    rate = 24000
+    vad = VoiceActivityDetector(mode="gate", sample_rate=rate, frame_ms=20, preroll_ms=100)
+    rng = np.random.default_rng(2)
+    silence = _pcm(rng.normal(0, 20, rate))
+    forwarded, events = vad.process(silence)
+    assert forwarded == b"" and events == []
+    forwarded, events = vad.process(_pcm(_tone(300, 0.2, rate, 8000)))
+    assert events == ["speech_start"]
+    # 5 preroll frames plus the speech frames from the onset on
+    assert len(forwarded) == (5 + 10 - vad.onset_frames + 1) * vad.frame_bytes
+
+
+def test_batcher_timer_flushes_a_partial_packet():
+    async def run():
+        sent = []
+
+        async def send(message):
+            sent.append(json.loads(message))
+
+        batcher = UpstreamAudioBatcher(send, packet_ms=20, sample_rate=24000)
+        await batcher.add(b"\x01\x00" * 50)
+        assert sent == []
+        await asyncio.sleep(0.08)
+        await batcher.add(b"\x02\x00" * 480)  # exactly one full packet
+        await batcher.close()
+        return batcher, sent
+
+    batcher, sent = asyncio.run(run())
+    assert [event["type"] for event in sent] == ["input_audio_buffer.append"] * 2
+    assert base64.b64decode(sent[0]["audio"]) == b"\x01\x00" * 50
+    assert base64.b64decode(sent[1]["audio"]) == b"\x02\x00" * 480
+    assert batcher.packet_bytes == 960
+
+
+def test_binary_framer_header_layout():
+    assert negotiate_audio_framing({"audio_framing": ["binary_v1", "json"]}) == AUDIO_FRAMING_BINARY_V1
+    assert negotiate_audio_framing({}) == "json"
+
+    framer = DownstreamAudioFramer(AUDIO_FRAMING_BINARY_V1)
+    first = framer.audio_chunk("resp_a", b"\x10\x20")
+    second = framer.audio_chunk("resp_a", b"\x30\x40")
+    other = framer.audio_chunk("resp_b", b"")
+    end = framer.audio_end("resp_a")
+
+    # version, type, response index (uint16 BE), sequence (uint32 BE), payload
+    assert first == bytes([1, 1, 0, 0, 0, 0, 0, 0, 0x10, 0x20])
+    assert second == bytes([1, 1, 0, 0, 0, 0, 0, 1, 0x30, 0x40])
+    assert other[:8] == bytes([1, 1, 0, 1, 0, 0, 0, 0])
+    assert end == bytes([1, 2, 0, 0, 0, 0, 0, 2])
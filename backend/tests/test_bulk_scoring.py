@@ -0,0 +1,41 @@
+import asyncio
+
+from app.bulk_scoring import read_records, score_records
+
+
+def _score_csv(text: str) -> list:
+    async def chunks():
+        yield text.encode()
+
+    async def run():
+        rows = []
+        async for records in read_records(chunks(), "csv"):
+            rows.extend(score_records(records, len(rows) + 1))
+        return rows
+
+    return asyncio.run(run())
+
+
+def test_unpriceable_rows_are_reported_inline():
+    rows = _score_csv(
+        "id,monthly_salary,loan_amount,loan_tenure_years\n"
+        "bad,100000,3000000,0.01\n"
+        "huge,1e300,500000,5\n"
+        "small,100000,500000,5\n"
+        "ok,100000,3000000,10\n"
+    )
+    assert [row["id"] for row in rows] == ["bad", "huge", "small", "ok"]
+    assert rows[0]["reason"] == "Invalid row: loan_tenure_years must be at least one month"
+    assert rows[1]["reason"].startswith("Invalid row: monthly_salary")
+    for row in rows[:2]:
+        assert row["interest_rate"] is None and row["emi_amount"] is None
+    assert rows[3]["eligible"] is True
+    assert rows[3]["emi_amount"] == 38003
+
+
+def test_out_of_range_rate_is_invalid():
+    rows = score_records([
+        {"monthly_salary": "100000", "loan_amount": "500000", "loan_tenure_years": "5", "interest_rate": "1e308"},
+    ])
+    assert rows[0]["interest_rate"] is None
+    assert rows[0]["reason"].startswith("Invalid row: interest_rate")
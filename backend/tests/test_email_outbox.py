@@ -0,0 +1,128 @@
+import asyncio
+import smtplib
+
+from app.email_outbox import EmailJob, EmailOutbox, SMTPConnection
+from bench.mock_smtp import MockSMTPServer
+
+
+async def start_outbox(server: MockSMTPServer, path: str = "", **kwargs):
+    listener = await server.serve(port=0)
+    port = listener.sockets[0].getsockname()[1]
+    outbox = EmailOutbox(
+        workers=1, path=path, retry_base=0.01, retry_max=0.05,
+        connection_factory=lambda: SMTPConnection("127.0.0.1", port, "none", username="", password=""),
+        **kwargs,
+    )
+    await outbox.start()
+    return outbox, listener
+
+
+async def collect(outbox, to, statuses):
+    async def on_status(status, job):
+        statuses.append(status)
+    return await outbox.enqueue(to, "Report", "Hello", on_status=on_status)
+
+
+def test_sends_over_one_connection(tmp_path):
+    async def run():
+        server = MockSMTPServer()
+        outbox, listener = await start_outbox(server, str(tmp_path / "outbox.db"))
+        statuses = []
+        for i in range(3):
+            await collect(outbox, f"user{i}@example.com", statuses)
+        await server.wait_for(3)
+        await outbox.stop()
+        listener.close()
+        return server, statuses
+
+    server, statuses = asyncio.run(run())
+    assert [rcpts for _, rcpts, _ in server.messages] == [[f"user{i}@example.com"] for i in range(3)]
+    assert server.connections == 1
+    assert statuses.count("sent") == 3
+
+
+def test_transient_failure_is_retried():
+    async def run():
+        server = MockSMTPServer(fail_next=1)
+        outbox, listener = await start_outbox(server)
+        statuses = []
+        await collect(outbox, "user@example.com", statuses)
+        await server.wait_for(1)
+        await outbox.stop()
+        listener.close()
+        return statuses
+
+    assert asyncio.run(run()) == ["queued", "retrying", "sent"]
+
+
+def test_dropped_connection_reconnects():
+    async def run():
+        server = MockSMTPServer(drop_next=1)
+        outbox, listener = await start_outbox(server)
+        await collect(outbox, "user@example.com", [])
+        await server.wait_for(1)
+        await outbox.stop()
+        listener.close()
+        return server
+
+    assert asyncio.run(run()).connections == 2
+
+
+def test_permanent_failure_is_not_retried():
+    async def run():
+        server = MockSMTPServer(reject=["gone@example.com"])
+        outbox, listener = await start_outbox(server)
+        statuses = []
+        await collect(outbox, "gone@example.com", statuses)
+        await outbox.stop()
+        listener.close()
+        return server, statuses
+
+    server, statuses = asyncio.run(run())
+    assert statuses == ["queued", "failed"]
+    assert server.messages == []
+
+
+def test_undelivered_mail_is_resumed(tmp_path):
+    path = str(tmp_path / "outbox.db")
+
+    async def queue_while_down():
+        # Nothing listens on the port: every attempt fails and the job stays stored
+        outbox = EmailOutbox(
+            workers=1, path=path, retry_base=60, max_attempts=5,
+            connection_factory=lambda: SMTPConnection("127.0.0.1", 9, "none", username="", password=""),
+        )
+        await outbox.start()
+        await outbox.enqueue("later@example.com", "Report", "Hello")
+        await outbox.stop(drain_timeout=0.5)
+
+    async def resume():
+        server = MockSMTPServer()
+        outbox, listener = await start_outbox(server, path)
+        await server.wait_for(1)
+        await outbox.stop()
+        listener.close()
+        return server
+
+    asyncio.run(queue_while_down())
+    server = asyncio.run(resume())
+    assert server.messages[0][1] == ["later@example.com"]
+
+
+def test_rejected_login_fails_the_batch_without_leaking_connections():
+    async def run():
+        server = MockSMTPServer(reject_auth=True)
+        listener = await server.serve(port=0)
+        port = listener.sockets[0].getsockname()[1]
+        connection = SMTPConnection("127.0.0.1", port, "none", username="user", password="wrong")
+        jobs = [EmailJob(f"user{i}@example.com", "Report", "Hello") for i in range(3)]
+        results = await asyncio.to_thread(connection.send_batch, jobs)
+        await asyncio.sleep(0.1)
+        listener.close()
+        return server, results
+
+    server, results = asyncio.run(run())
+    assert all(isinstance(error, smtplib.SMTPAuthenticationError) for error, _ in results)
+    assert len(results) == 3
+    assert server.connections == 1
+    assert server.closed == 1
@@ -0,0 +1,99 @@
+import asyncio
+
+from app.extraction_scheduler import ExtractionScheduler
+
+
+class Runs:
+    """Records extraction runs and how many overlapped."""
+
+    def __init__(self, duration: float = 0.0):
+        self.duration = duration
+        self.versions = []
+        self.active = 0
+        self.max_active = 0
+
+    async def __call__(self, version):
+        self.versions.append(version)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.duration)
+        finally:
+            self.active -= 1
+
+
+def test_triggers_inside_the_debounce_window_are_coalesced():
+    async def run():
+        runs = Runs()
+        scheduler = ExtractionScheduler(runs, debounce=0.05, max_delay=1.0)
+        for _ in range(3):
+            scheduler.trigger()
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.15)
+        await scheduler.close()
+        return runs
+
+    assert asyncio.run(run()).versions == [3]
+
+
+def test_max_delay_bounds_the_wait_under_constant_triggers():
+    async def run():
+        runs = Runs()
+        scheduler = ExtractionScheduler(runs, debounce=0.05, max_delay=0.15)
+        for _ in range(15):
+            scheduler.trigger()
+            await asyncio.sleep(0.03)
+        first_run = list(runs.versions)
+        await scheduler.close()
+        return first_run
+
+    first_run = asyncio.run(run())
+    assert first_run and first_run[0] < 15
+
+
+def test_single_flight_runs_the_latest_version_next():
+    async def run():
+        runs = Runs(duration=0.1)
+        scheduler = ExtractionScheduler(runs, debounce=0.01, max_delay=0.05)
+        scheduler.trigger()
+        await asyncio.sleep(0.03)  # first run in flight
+        scheduler.trigger()
+        scheduler.trigger()
+        await asyncio.sleep(0.3)
+        await scheduler.close()
+        return runs
+
+    runs = asyncio.run(run())
+    assert runs.versions == [1, 3]
+    assert runs.max_active == 1
+
+
+def test_superseded_run_is_cancelled_when_enabled():
+    async def run():
+        runs = Runs(duration=0.2)
+        scheduler = ExtractionScheduler(runs, debounce=0.01, max_delay=0.05, cancel_superseded=True)
+        scheduler.trigger()
+        await asyncio.sleep(0.05)
+        scheduler.trigger()
+        await asyncio.sleep(0.35)
+        await scheduler.close()
+        return runs, scheduler
+
+    runs, scheduler = asyncio.run(run())
+    assert runs.versions == [1, 2]
+    assert scheduler.superseded_runs == 1
+
+
+def test_claim_keeps_results_monotonic():
+    async def run():
+        scheduler = ExtractionScheduler(Runs(), initial_version=4)
+        scheduler.trigger(schedule=False)  # the fast path handled it: no run
+        version = scheduler.version
+        claims = [scheduler.claim(6), scheduler.claim(5), scheduler.claim(6)]
+        await scheduler.close()
+        return version, claims, scheduler
+
+    version, claims, scheduler = asyncio.run(run())
+    assert version == 5
+    assert claims == [True, False, True]
+    assert scheduler.superseded_runs == 1
@@ -0,0 +1,83 @@
+import pytest
+
+from app.fast_extract import fast_extract
+from app.result_cache import AUDIO_PLACEHOLDER
+
+
+def user(text):
+    return [{"role": "user", "text": text}]
+
+
+def assistant(text):
+    return [{"role": "assistant", "text": text}]
+
+
+def test_amounts_and_tenure_from_user_turn():
+    values, needs_llm = fast_extract(user("I earn 75k per month and want a loan of 30 lakh for 20 years"))
+    assert values == {"monthly_salary": 75000, "loan_amount": 3000000, "loan_tenure_years": 20}
+    assert not needs_llm
+
+
+def test_contact_details():
+    values, _ = fast_extract(user("my number is 98450 12345 and email is ardra at gmail dot com"))
+    assert values["phone_number"] == "9845012345"
+    assert values["email_address"] == "ardra@gmail.com"
+
+
+@pytest.mark.parametrize("text", [
+    "your monthly EMI is 26,992",
+    "loan EMI of 26,992",
+    "total interest on the loan is 34,78,000",
+    "maximum eligible loan amount is 45 lakh",
+    "the total payable on this loan is 60 lakh",
+])
+def test_repayment_and_eligibility_figures_are_not_field_values(text):
+    values, _ = fast_extract(user(text))
+    assert "monthly_salary" not in values
+    assert "loan_amount" not in values
+
+
+@pytest.mark.parametrize("text", [
+    "my salary is 1.2 crore per year",
+    "annual salary of 14 lakh",
+    "I earn 18 lpa",
+])
+def test_yearly_salary_goes_to_the_model(text):
+    values, needs_llm = fast_extract(user(text))
+    assert "monthly_salary" not in values
+    assert needs_llm
+
+
+def test_assistant_read_back_does_not_set_amounts():
+    values, needs_llm = fast_extract(assistant("So that is a loan of 35 lakh over 20 years and a salary of 90,000?"))
+    assert values == {}
+    assert needs_llm
+
+
+def test_audio_placeholder_is_ignored():
+    assert fast_extract(user(AUDIO_PLACEHOLDER)) == ({}, False)
+
+
+def test_confirmation_needs_the_model():
+    _, needs_llm = fast_extract(user("yes, that's correct"))
+    assert needs_llm
+
+
+def test_date_of_birth_needs_a_birth_cue():
+    values, _ = fast_extract(user("I was born on 15-08-1990"))
+    assert values == {"date_of_birth": "15-08-1990"}
+    values, needs_llm = fast_extract(user("I joined my company on 01-04-2015"))
+    assert "date_of_birth" not in values
+    assert needs_llm
+
+
+@pytest.mark.parametrize("text", [
+    "Hi, my name is Asha, your loan assistant.",
+    "I have your email as ardra@gmail.com, is that right?",
+    "Your number is 98450 12345?",
+    "Your date of birth is 15-08-1990, correct?",
+])
+def test_assistant_turns_do_not_set_contact_details(text):
+    values, needs_llm = fast_extract(assistant(text))
+    assert values == {}
+    assert needs_llm
@@ -0,0 +1,39 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+@pytest.mark.parametrize("path, body", [
+    ("/loan/scenarios", {"amounts": [3000000], "tenures": [0.01, 20]}),
+    ("/loan/schedule", {"amount": 3000000, "tenure_years": 0.01}),
+    ("/loan/scenarios", {"amounts": [1e308]}),
+    ("/loan/scenarios", {"amounts": [3000000], "rates": [1e308]}),
+    ("/loan/scenarios", {"amounts": [3000000], "date_of_birth": "1990-08-15"}),
+    ("/loan/scenarios", {"amounts": [3000000], "date_of_birth": "01-01-2999"}),
+])
+def test_unpriceable_requests_are_rejected(client, path, body):
+    assert client.post(path, json=body).status_code == 422
+
+
+def test_scenarios_apply_the_age_rule(client):
+    response = client.post("/loan/scenarios", json={
+        "amounts": [3000000], "rates": [9], "tenures": [20, 30],
+        "monthly_salary": 100000, "date_of_birth": "01-01-1970",
+    })
+    assert response.status_code == 200
+    data = response.json()
+    assert data["emi"][0][0] == [26992]
+    assert data["eligible"][0] == [[False], [False]]
+    assert data["age_years"] >= 55
+
+
+def test_one_month_schedule(client):
+    response = client.post("/loan/schedule", json={"amount": 120000, "rate": 0, "tenure_years": 1 / 12})
+    assert response.status_code == 200
+    assert response.json()["months"] == [1]
@@ -0,0 +1,104 @@
+import asyncio
+
+from app.outbound import AUDIO_BURST, OutboundQueue
+
+
+class FakeWebSocket:
+    def __init__(self, blocked: bool = False):
+        self.sent = []
+        self.closed_with = None
+        self.unblocked = asyncio.Event()
+        if not blocked:
+            self.unblocked.set()
+
+    async def send_json(self, message):
+        await self.unblocked.wait()
+        self.sent.append(message)
+
+    async def send_bytes(self, data):
+        await self.unblocked.wait()
+        self.sent.append(data)
+
+    async def close(self, code=1000, reason=""):
+        self.closed_with = code
+
+
+def test_superseded_field_updates_are_coalesced():
+    async def run():
+        ws = FakeWebSocket()
+        outbound = OutboundQueue(ws)
+        for value in (1, 2, 3):
+            await outbound.send_json({"type": "field_extracted", "field": "loan_amount", "value": value})
+        await outbound.send_json({"type": "chat_message", "text": "hi"})
+        await outbound.close()
+        return ws, outbound
+
+    ws, outbound = asyncio.run(run())
+    assert ws.sent == [
+        {"type": "field_extracted", "field": "loan_amount", "value": 3},
+        {"type": "chat_message", "text": "hi"},
+    ]
+    assert outbound.coalesced == 2
+
+
+def test_audio_goes_first_in_bursts():
+    async def run():
+        ws = FakeWebSocket()
+        outbound = OutboundQueue(ws)
+        await outbound.send_json({"type": "chat_message", "text": "hi"})
+        for i in range(AUDIO_BURST + 2):
+            await outbound.send_bytes(bytes([i]))
+        await outbound.close()
+        return ws
+
+    sent = asyncio.run(run()).sent
+    assert sent[AUDIO_BURST] == {"type": "chat_message", "text": "hi"}
+    assert sent[:AUDIO_BURST] + sent[AUDIO_BURST + 1:] == [bytes([i]) for i in range(AUDIO_BURST + 2)]
+
+
+def test_slow_client_drops_oldest_audio():
+    async def run():
+        ws = FakeWebSocket(blocked=True)
+        outbound = OutboundQueue(ws, max_audio=3, slow_client="drop_oldest")
+        for i in range(6):
+            await outbound.send_bytes(bytes([i]))
+        ws.unblocked.set()
+        await outbound.close()
+        return ws, outbound
+
+    ws, outbound = asyncio.run(run())
+    assert outbound.dropped_audio == 3
+    assert ws.sent == [bytes([3]), bytes([4]), bytes([5])]
+    assert ws.closed_with is None
+
+
+def test_slow_client_is_disconnected():
+    async def run():
+        ws = FakeWebSocket(blocked=True)
+        outbound = OutboundQueue(ws, max_audio=2, slow_client="disconnect")
+        for i in range(3):
+            await outbound.send_bytes(bytes([i]))
+        closed = outbound.closed
+        await outbound.send_json({"type": "chat_message", "text": "ignored"})
+        await outbound.close()
+        return ws, closed
+
+    ws, closed = asyncio.run(run())
+    assert closed
+    assert ws.sent == []
+    assert ws.closed_with == 1013
+
+
+def test_blocked_send_times_out_and_disconnects():
+    async def run():
+        ws = FakeWebSocket(blocked=True)
+        outbound = OutboundQueue(ws, send_timeout=0.05)
+        await outbound.send_json({"type": "chat_message", "text": "hi"})
+        await asyncio.sleep(0.2)
+        closed = outbound.closed
+        await outbound.close()
+        return ws, closed
+
+    ws, closed = asyncio.run(run())
+    assert closed
+    assert ws.closed_with == 1013
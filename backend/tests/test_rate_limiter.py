@@ -0,0 +1,81 @@
+import time
+import asyncio
+
+import pytest
+
+from app.rate_limiter import (
+    PRIORITY_CONFIRMATION, PRIORITY_EXTRACTION, RateLimiter, TokenBucket, backoff_delay, retry_after_seconds,
+)
+
+
+def test_token_bucket_wait_time():
+    bucket = TokenBucket(per_minute=600, burst_seconds=1)  # 10 per second, capacity 10
+    now = time.monotonic()
+    assert bucket.wait_time(10, now) == 0
+    bucket.take(10)
+    assert bucket.wait_time(5, now) == pytest.approx(0.5, abs=0.01)
+    # Larger than the bucket: only waits for a full bucket, then goes negative
+    assert bucket.wait_time(50, now) == pytest.approx(1.0, abs=0.01)
+    bucket.give_back(4)
+    assert bucket.level == pytest.approx(4, abs=0.1)
+
+
+def test_confirmations_jump_the_queue():
+    async def run():
+        limiter = RateLimiter(rpm=600, tpm=1_000_000)
+        limiter.requests.take(limiter.requests.level)  # empty: one request per 0.1 s
+        order = []
+
+        async def call(name, priority):
+            await limiter.acquire(10, priority)
+            order.append(name)
+
+        tasks = [asyncio.create_task(call(f"extract-{i}", PRIORITY_EXTRACTION)) for i in range(2)]
+        await asyncio.sleep(0.01)
+        tasks.append(asyncio.create_task(call("confirm", PRIORITY_CONFIRMATION)))
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(run()) == ["confirm", "extract-0", "extract-1"]
+
+
+def test_pause_holds_requests_and_cancelled_waiters_are_skipped():
+    async def run():
+        limiter = RateLimiter(rpm=600, tpm=1_000_000)
+        limiter.pause(0.2)
+        started = time.monotonic()
+        cancelled = asyncio.create_task(limiter.acquire(10))
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        await limiter.acquire(10)
+        return time.monotonic() - started, limiter.requests.level
+
+    waited, level = asyncio.run(run())
+    assert waited >= 0.19
+    # Only the request that was actually granted took a slot
+    assert level == pytest.approx(TokenBucket(600).capacity - 1, abs=0.1)
+
+
+def test_token_estimate_is_reconciled():
+    async def run():
+        limiter = RateLimiter(rpm=600, tpm=6000)
+        await limiter.acquire(500)
+        after_acquire = limiter.tokens.level
+        limiter.reconcile(estimated=500, actual=200)
+        return after_acquire, limiter.tokens.level
+
+    after_acquire, reconciled = asyncio.run(run())
+    assert reconciled == pytest.approx(after_acquire + 300, abs=1)
+
+
+def test_retry_after_parsing():
+    assert retry_after_seconds({"retry-after-ms": "1500"}) == 1.5
+    assert retry_after_seconds({"Retry-After": "3"}) == 3.0
+    assert retry_after_seconds({}) is None
+    assert retry_after_seconds({"Retry-After": "soon"}) is None
+
+
+def test_backoff_respects_retry_after():
+    for attempt in range(5):
+        assert backoff_delay(attempt) > 0
+        assert backoff_delay(attempt, retry_after=4.0) >= 4.0
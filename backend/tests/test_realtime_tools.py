@@ -0,0 +1,75 @@
+import pytest
+
+from app.realtime_tools import ToolError, calculate_emi, check_eligibility, coerce_field_value
+
+
+def test_calculate_emi():
+    result = calculate_emi({"loan_amount": "30,00,000", "loan_tenure_years": 20})
+    assert result["loan_amount"] == 3000000
+    assert result["annual_rate"] == 9
+    assert result["emi"] == 26992
+
+
+@pytest.mark.parametrize("value", ["inf", "-inf", "nan", "1e400", float("inf")])
+def test_non_finite_numbers_are_tool_errors(value):
+    with pytest.raises(ToolError):
+        calculate_emi({"loan_amount": value, "loan_tenure_years": 20})
+    with pytest.raises(ToolError):
+        coerce_field_value("loan_amount", value)
+
+
+def test_eligibility_uses_known_date_of_birth():
+    args = {"monthly_salary": 100000, "loan_amount": 3000000, "loan_tenure_years": 30}
+    result = check_eligibility(args, {"date_of_birth": "01-01-1970"})
+    assert result["eligible"] is False
+    assert result["age_checked"]
+
+
+def test_eligibility_unknown_without_date_of_birth():
+    result = check_eligibility({"monthly_salary": 100000, "loan_amount": 3000000, "loan_tenure_years": 20})
+    assert result["eligible"] is None
+    assert not result["age_checked"]
+    assert "Date of birth needed" in result["reasons"][0]
+
+
+def test_failing_rule_is_definite_without_date_of_birth():
+    result = check_eligibility({"monthly_salary": 10000, "loan_amount": 3000000, "loan_tenure_years": 20})
+    assert result["eligible"] is False
+
+
+def test_coerce_phone_number():
+    assert coerce_field_value("phone_number", "+91 98450-12345") == "9845012345"
+    with pytest.raises(ToolError):
+        coerce_field_value("phone_number", "12345")
+
+
+@pytest.mark.parametrize("args", [
+    {"loan_amount": 1e308, "loan_tenure_years": 20},
+    {"loan_amount": 3000000, "loan_tenure_years": 1e6},
+    {"loan_amount": 3000000, "loan_tenure_years": 0.01},
+    {"loan_amount": 3000000, "loan_tenure_years": 20, "annual_rate": -5},
+    {"loan_amount": 3000000, "loan_tenure_years": 20, "annual_rate": 1e308},
+])
+def test_out_of_range_arguments_are_tool_errors(args):
+    with pytest.raises(ToolError):
+        calculate_emi(args)
+
+
+def test_zero_rate_is_allowed():
+    assert calculate_emi({"loan_amount": 1200000, "loan_tenure_years": 10, "annual_rate": 0})["emi"] == 10000
+
+
+def test_coerce_rejects_missing_and_implausible_values():
+    with pytest.raises(ToolError):
+        coerce_field_value("first_name", None)
+    with pytest.raises(ToolError):
+        coerce_field_value("date_of_birth", "01-01-2999")
+    with pytest.raises(ToolError):
+        coerce_field_value("loan_tenure_years", 0.4)
+    assert coerce_field_value("date_of_birth", "15-08-1990") == "15-08-1990"
+
+
+def test_future_date_of_birth_is_a_tool_error():
+    args = {"monthly_salary": 100000, "loan_amount": 3000000, "loan_tenure_years": 20, "date_of_birth": "01-01-2999"}
+    with pytest.raises(ToolError):
+        check_eligibility(args)
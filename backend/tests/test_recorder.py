@@ -0,0 +1,45 @@
+import json
+
+from app import recorder as rec
+
+
+def test_round_trip(tmp_path):
+    r = rec.open_recorder("abc", str(tmp_path))
+    r.client_message({"text": '{"type": "config"}'})
+    r.client_message({"bytes": b"\x01\x02"})
+    r.upstream(json.dumps({"type": "input_audio_buffer.append", "audio": "AQI="}))
+    r.realtime(json.dumps({"type": "response.audio.delta", "response_id": "resp_1", "delta": "AwQ="}))
+    r.close()
+
+    recording = rec.Recording(r.path)
+    frames = [(kind, bytes(payload)) for kind, _, payload in recording.frames()]
+    recording.close()
+    assert [kind for kind, _ in frames] == [rec.CLIENT_TEXT, rec.CLIENT_AUDIO, rec.UPSTREAM_AUDIO, rec.REALTIME_AUDIO]
+    assert frames[2][1] == b"\x01\x02"
+    event = json.loads(rec.realtime_message(rec.REALTIME_AUDIO, frames[3][1]))
+    assert event == {"type": "response.audio.delta", "response_id": "resp_1", "delta": "AwQ="}
+
+
+def test_reconnect_within_a_second_gets_its_own_file(tmp_path):
+    first = rec.open_recorder("abc", str(tmp_path))
+    second = rec.open_recorder("abc", str(tmp_path))
+    assert first.path != second.path
+    for r in (first, second):
+        r.client_message({"text": "end_of_audio"})
+        r.close()
+        recording = rec.Recording(r.path)
+        assert recording.session_id == "abc"
+        assert [kind for kind, _, _ in recording.frames()] == [rec.CLIENT_TEXT]
+        recording.close()
+
+
+def test_truncated_frame_is_ignored(tmp_path):
+    r = rec.open_recorder("abc", str(tmp_path))
+    r.client_message({"bytes": b"x" * 100})
+    r.client_message({"bytes": b"y" * 100})
+    r.close()
+    with open(r.path, "r+b") as f:
+        f.truncate(f.seek(0, 2) - 10)
+    recording = rec.Recording(r.path)
+    assert [bytes(p) for _, _, p in recording.frames()] == [b"x" * 100]
+    recording.close()
@@ -0,0 +1,82 @@
+import time
+import sqlite3
+import asyncio
+
+from app.session_store import MemorySessionStore, SQLiteSessionStore, SessionSaver
+
+
+def test_saves_are_coalesced_and_flushed():
+    async def run():
+        store = MemorySessionStore()
+        state = {"turns": 0}
+        writes = []
+
+        async def write():
+            writes.append(state["turns"])
+            await store.save("session-1", dict(state))
+
+        saver = SessionSaver(write, delay=0.05)
+        for turn in range(1, 6):
+            state["turns"] = turn
+            await saver.request()
+        await asyncio.sleep(0.1)
+        state["turns"] = 6
+        await saver.request()
+        await saver.flush()
+        await asyncio.sleep(0.1)
+        return writes, await store.load("session-1")
+
+    writes, record = asyncio.run(run())
+    # One delayed write with the latest state, then the final flush
+    assert writes == [5, 6]
+    assert record == {"turns": 6}
+
+
+def test_zero_delay_saves_every_time():
+    async def run():
+        writes = []
+
+        async def write():
+            writes.append(1)
+
+        saver = SessionSaver(write, delay=0)
+        await saver.request()
+        await saver.request()
+        return writes
+
+    assert asyncio.run(run()) == [1, 1]
+
+
+def test_stale_owner_cannot_overwrite_resumed_session(tmp_path):
+    async def run(store):
+        assert await store.save("session-1", {"turns": 1}, owner="first")
+        # A second connection resumes while the first one is still closing
+        assert await store.load("session-1", owner="second") == {"turns": 1}
+        assert await store.save("session-1", {"turns": 2}, owner="second")
+        refused = await store.save("session-1", {"turns": 1, "stale": True}, owner="first")
+        record = await store.load("session-1")
+        await store.close()
+        return refused, record
+
+    for store in (MemorySessionStore(), SQLiteSessionStore(str(tmp_path / "sessions.db"))):
+        refused, record = asyncio.run(run(store))
+        assert refused is False
+        assert record == {"turns": 2}
+
+
+def test_sqlite_store_adds_owner_column_to_old_files(tmp_path):
+    path = str(tmp_path / "old.db")
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE sessions (id TEXT PRIMARY KEY, data TEXT, expires_at REAL)")
+    db.execute("INSERT INTO sessions VALUES (?, ?, ?)", ("session-1", '{"turns": 1}', time.time() + 60))
+    db.commit()
+    db.close()
+
+    async def run():
+        store = SQLiteSessionStore(path)
+        record = await store.load("session-1", owner="new")
+        saved = await store.save("session-1", {"turns": 2}, owner="new")
+        await store.close()
+        return record, saved
+
+    assert asyncio.run(run()) == ({"turns": 1}, True)